@@ -1,44 +1,339 @@
 # app/api/routes.py
-from fastapi import APIRouter, BackgroundTasks
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+import asyncio
+import functools
+from typing import Annotated, Dict, List, Literal, Optional
 
-from app.llm.openai_client import generate_spatial_layout
-from app.core.scene_compiler import compile_scene
-from app.core.job_manager import create_job, update_job, JOBS, cancel
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from app.llm.openai_client import blueprint_cache
+from app.core.intent_parser import parse_edit, parse_intent, stream_intent, INTENT_SOURCES
+from app.core.scene_compiler import MAX_FOREST_EXTENT, iter_scene_batches, resolve_seed, scene_envelope
+from app.core.scene_encoder import SceneResponse
+from app.core.executor import executor, compile_to_cbx, compile_to_json, BATCH, INTERACTIVE
+from app.api.streaming import stream_compile, stream_scene, stream_events, stream_tiles
+from app.core.job_manager import (
+    create_job, update_job, update_job_nowait, get_job, get_result, get_tiled_result, log, watch,
+    create_scene, load_scene, save_scene,
+)
+from app.core.scene_tiles import find_tile, select_tiles
+from app.core.scene_state import SceneState, merge_blueprint
+from app.llm.blueprint_dsl import MAX_BUILDINGS, MAX_FLOORS, MAX_ROAD_PIECES, DSLError, validate_blueprint
+from app.core import metrics
+from app.settings import settings
 from app.middleware.sanitization import sanitize_text
+from app.middleware.admission import admission, admit, estimate_batch_cost, estimate_cost, estimate_edit_cost
+from app.middleware.rate_limit import generate_limit
 
 router = APIRouter(prefix="/ai")
 
 class CommandRequest(BaseModel):
     text: str
 
+# Blueprint delta, see scene_state.merge_blueprint
+Floors = Annotated[int, Field(ge=1, le=MAX_FLOORS)]
+RoadPieces = Annotated[List[str], Field(max_length=MAX_ROAD_PIECES)]
+
+class LayoutDelta(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    buildings: Optional[Annotated[List[Floors], Field(max_length=MAX_BUILDINGS)]] = None
+    road_sequence: Optional[RoadPieces] = None
+    forest_density: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    forest_extent: Optional[int] = Field(default=None, ge=0, le=MAX_FOREST_EXTENT)
+
+class EnvironmentDelta(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    time: Optional[float] = Field(default=None, ge=0.0, le=24.0)
+    brightness: Optional[float] = Field(default=None, ge=0.0, le=10.0)
+
+class AppendDelta(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    buildings: Optional[Annotated[List[Floors], Field(max_length=MAX_BUILDINGS)]] = None
+    road_sequence: Optional[RoadPieces] = None
+
+class SceneDelta(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    layout: Optional[LayoutDelta] = None
+    environment: Optional[EnvironmentDelta] = None
+    append: Optional[AppendDelta] = None
+    remove_buildings: Optional[int] = Field(default=None, ge=0)
+
+class EditRequest(BaseModel):
+    text: Optional[str] = None
+    delta: Optional[SceneDelta] = None
+
+class BatchRequest(BaseModel):
+    prompts: List[str] = Field(min_length=1, max_length=settings.BATCH_MAX_PROMPTS)
+    llm_concurrency: Optional[int] = Field(default=None, ge=1, le=settings.LLM_MAX_CONCURRENCY)
+
 async def generate_task(job_id: str, text: str):
+    job = await get_job(job_id)
+    if job is None or job["cancelled"]:
+        return
     try:
-        update_job(job_id, status="running")
+        await update_job(job_id, status="running")
         # 1. Get High-Level Plan (JSON)
-        blueprint = generate_spatial_layout(sanitize_text(text))
-        # 2. Execute Grid Math (Python)
-        scene = compile_scene(blueprint)
-        update_job(job_id, status="done", result=scene)
+        await log(job_id, "Parsing intent")
+        with metrics.stage("sanitize"):
+            text = sanitize_text(text)
+        with metrics.stage("intent"):
+            blueprint, source = await parse_intent(text)
+        await update_job(job_id, intent_source=source)
+        await log(job_id, f"Intent parsed ({source})")
+        # 2. Execute Grid Math (Python) in the compile process pool
+        await log(job_id, "Compiling scene")
+        payload = await executor.run_cpu(compile_to_cbx, blueprint)
+        await log(job_id, "Scene compiled")
+        await update_job(job_id, status="done", result=payload)
     except Exception as e:
-        update_job(job_id, status="error")
+        await log(job_id, f"Failed: {type(e).__name__}")
+        await update_job(job_id, status="error")
+
+async def batch_item(job_id: str, text: str, slots: asyncio.Semaphore):
+    # one queued job per batch prompt; the batch's LLM calls stay under its `slots`
+    async with slots:
+        await generate_task(job_id, text)
+
+StreamFormat = Optional[Literal["ndjson", "json"]]
 
 @router.post("/instant")
-async def instant(req: CommandRequest):
-    # Synchronous flow for local testing
-    blueprint = generate_spatial_layout(sanitize_text(req.text))
-    scene = compile_scene(blueprint)
-    return JSONResponse(content=scene)
+@generate_limit
+async def instant(req: CommandRequest, request: Request, stream: StreamFormat = None):
+    with metrics.stage("sanitize"):
+        text = sanitize_text(req.text)
+    # 429 before any work when the worker or this client is over budget
+    with admit(request, estimate_cost(text)) as lease:
+        if stream and settings.LLM_STREAM_COMPILE:
+            # Actors are compiled from each blueprint element as the model writes it;
+            # the body is the executor's work here, so the queue is not involved
+            events, source = stream_intent(text)
+            return lease.release_after_body(stream_compile(events, resolve_seed({}), stream, {"X-Intent-Source": source}))
+
+        # Interactive lane: jumps ahead of queued /command jobs
+        async def pipeline():
+            with metrics.stage("intent"):
+                blueprint, source = await parse_intent(text)
+            body = None if stream else await executor.run_cpu(compile_to_json, blueprint)
+            return blueprint, source, body
+
+        queue = {}
+        blueprint, source, body = await executor.run(pipeline, INTERACTIVE, queue.update)
+        headers = {
+            "X-Intent-Source": source,
+            "X-Queue-Wait-Ms": str(queue.get("queue_wait_ms", 0)),
+            "X-Run-Ms": str(queue.get("run_ms", 0)),
+        }
+        if stream:
+            # Actors are compiled while the body is being written
+            seed = resolve_seed(blueprint)
+            response = stream_scene(iter_scene_batches(blueprint, seed), scene_envelope(blueprint, seed), stream, headers)
+            return lease.release_after_body(response)
+        return SceneResponse(content=body, headers=headers)
 
 @router.post("/command")
-async def command(req: CommandRequest, bt: BackgroundTasks):
-    job_id = create_job()
-    bt.add_task(generate_task, job_id, req.text)
+@generate_limit
+async def command(req: CommandRequest, request: Request):
+    executor.ensure_capacity()  # 429 before a job is created
+    lease = admit(request, estimate_cost(sanitize_text(req.text)))  # held until the job finishes
+    try:
+        job_id = await create_job()
+        job = executor.submit(functools.partial(generate_task, job_id, req.text), BATCH, lambda m: update_job_nowait(job_id, **m))
+        lease.release_when_done(job)  # also when the job is cancelled before it starts
+    except BaseException:
+        lease.release()  # the job never took it
+        raise
     return {"job_id": job_id}
 
+@router.post("/batch")
+@generate_limit
+async def batch(req: BatchRequest, request: Request):
+    # Identical prompts (after sanitizing) share one job, and are priced once
+    texts = list(dict.fromkeys(sanitize_text(p) for p in req.prompts))
+    executor.ensure_capacity(len(texts))  # every prompt is a queued job
+    lease = admit(request, estimate_batch_cost(texts))
+    try:
+        unique: Dict[str, str] = {text: await create_job() for text in texts}
+        batch_id = await create_job()
+        items = [unique[sanitize_text(p)] for p in req.prompts]
+        await update_job(batch_id, kind="batch", items=items, status="running")
+        slots = asyncio.Semaphore(req.llm_concurrency or settings.BATCH_LLM_CONCURRENCY)
+        executor.ensure_capacity(len(texts))  # again: the queue may have filled while the jobs were created
+        jobs = asyncio.gather(*(
+            executor.submit(
+                functools.partial(batch_item, job_id, text, slots), BATCH, lambda m, job_id=job_id: update_job_nowait(job_id, **m)
+            )
+            for text, job_id in unique.items()
+        ), return_exceptions=True)
+    except BaseException:
+        lease.release()
+        raise
+
+    def finished(_):
+        # the lease is held until the last prompt's job finishes
+        lease.release()
+        update_job_nowait(batch_id, status="done")
+
+    jobs.add_done_callback(finished)
+    return {"batch_id": batch_id, "items": len(items), "unique": len(unique)}
+
+@router.get("/batch/{batch_id}")
+async def batch_status(batch_id: str):
+    job = await get_job(batch_id)
+    if job is None or job.get("kind") != "batch":
+        return {"status": "unknown"}
+    statuses = {}
+    for job_id in set(job["items"]):
+        item = await get_job(job_id)
+        statuses[job_id] = item["status"] if item else "unknown"
+    items = [
+        {"index": i, "job_id": job_id, "status": statuses[job_id], "result": f"/ai/result/{job_id}"}
+        for i, job_id in enumerate(job["items"])
+    ]
+    counts: Dict[str, int] = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    return {"batch_id": batch_id, "status": job["status"], "counts": counts, "items": items}
+
+# ------------------------------------------------------------------
+# EDITABLE SCENES: create once, then send follow-ups and get actor diffs
+# ------------------------------------------------------------------
+def _scene_body(scene_id: str, state: SceneState) -> SceneResponse:
+    scene = state.scene()
+    scene["ActorIds"] = state.actor_ids()
+    return SceneResponse(content=scene, headers={"X-Scene-Id": scene_id, "X-Scene-Version": str(state.version)})
+
+@router.post("/scenes")
+@generate_limit
+async def create_editable_scene(req: CommandRequest, request: Request):
+    text = sanitize_text(req.text)
+    with admit(request, estimate_cost(text)):
+        blueprint, source = await parse_intent(text)
+        state = await asyncio.to_thread(SceneState, blueprint, resolve_seed(blueprint))
+    return _scene_body(await create_scene(state), state)
+
+@router.get("/scenes/{scene_id}")
+async def get_editable_scene(scene_id: str):
+    state = await load_scene(scene_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown scene")
+    return await asyncio.to_thread(_scene_body, scene_id, state)  # encodes the whole scene
+
+@router.post("/scenes/{scene_id}/edit")
+@generate_limit
+async def edit_scene(scene_id: str, req: EditRequest, request: Request):
+    state = await load_scene(scene_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown scene")
+    delta = req.delta.model_dump(exclude_none=True) if req.delta is not None else None
+    if delta is None and req.text:
+        text = sanitize_text(req.text)
+        delta = parse_edit(text)
+        if delta is not None:
+            # same limits as a delta sent as JSON
+            try:
+                delta = SceneDelta.model_validate(delta).model_dump(exclude_none=True)
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"Edit out of range: {e.error_count()} errors")
+        else:
+            # Not a recognised follow-up: take a full blueprint and let the diff keep what is unchanged
+            with admit(request, estimate_cost(text)):
+                blueprint, _ = await parse_intent(text)
+            delta = {"layout": blueprint.get("layout", {}), "environment": blueprint.get("environment", {})}
+    if delta is None:
+        raise HTTPException(status_code=422, detail="Provide text or delta")
+    try:
+        # appends accumulate: the edited scene has to stay within the blueprint limits too
+        validate_blueprint(merge_blueprint(state.blueprint, delta))
+    except DSLError as e:
+        raise HTTPException(status_code=422, detail=f"Edited scene out of range: {e}")
+    # priced on the blueprint after the edit: a changed forest is redrawn in full
+    with admit(request, estimate_edit_cost(state.blueprint, delta)):
+        edited, diff = await asyncio.to_thread(state.edited, delta)
+    if not await save_scene(scene_id, edited, expected=state.version):
+        raise HTTPException(status_code=409, detail="Scene changed by another edit; reload it and retry")
+    return {"scene_id": scene_id, **diff}
+
 # Keep existing status/result endpoints...
+@router.get("/status/{job_id}")
+async def status(job_id: str):
+    job = await get_job(job_id)
+    if job is None:
+        return {"status": "unknown"}
+    return job
+
+@router.get("/events/{job_id}")
+async def events(job_id: str):
+    # Server-Sent Events: log / status frames, then the result link; replaces polling /result
+    async def job_events():
+        async for event in watch(job_id, settings.JOB_EVENTS_POLL):
+            yield event
+            if event.get("status") == "done":
+                yield {"event": "result", "url": f"/ai/result/{job_id}"}
+    return stream_events(job_events())
+
 @router.get("/result/{job_id}")
-def result(job_id: str):
-    job = JOBS.get(job_id)
-    return JSONResponse(content=job["result"]) if job and job["status"] == "done" else {"status": "processing"}
\ No newline at end of file
+def result(job_id: str, stream: StreamFormat = None):
+    scene = get_result(job_id)
+    if scene is None:
+        return {"status": "processing"}
+    if stream:
+        envelope = {k: v for k, v in scene.items() if k != "PlaceableAssets"}
+        return stream_scene([scene["PlaceableAssets"]], envelope, stream)
+    return SceneResponse(content=scene)
+
+# ------------------------------------------------------------------
+# TILED RESULTS: manifest first, then the tiles near the camera
+# ------------------------------------------------------------------
+def _tiled(job_id: str):
+    found = get_tiled_result(job_id)
+    if found is None:
+        return None, None
+    manifest, scene = found
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Result is not tiled")
+    return manifest, scene
+
+@router.get("/result/{job_id}/tiles")
+def result_tiles(job_id: str):
+    manifest, _ = _tiled(job_id)
+    if manifest is None:
+        return {"status": "processing"}
+    return manifest
+
+@router.get("/result/{job_id}/tiles/range")
+def result_tile_range(
+    job_id: str,
+    x0: Optional[int] = None, y0: Optional[int] = None, x1: Optional[int] = None, y1: Optional[int] = None,
+    cx: Optional[float] = None, cy: Optional[float] = None,
+    stream: StreamFormat = None,
+):
+    # Tiles in [x0, x1] x [y0, y1] (tile coordinates, open sides unbounded), nearest to (cx, cy) first
+    manifest, scene = _tiled(job_id)
+    if manifest is None:
+        return {"status": "processing"}
+    inf = float("inf")
+    rect = (-inf if x0 is None else x0, -inf if y0 is None else y0, inf if x1 is None else x1, inf if y1 is None else y1)
+    near = (cx, cy) if cx is not None and cy is not None else None
+    return stream_tiles(scene, select_tiles(manifest, rect, near), stream or "json")
+
+@router.get("/result/{job_id}/tiles/{x}/{y}")
+def result_tile(job_id: str, x: int, y: int, stream: StreamFormat = None):
+    manifest, scene = _tiled(job_id)
+    if manifest is None:
+        return {"status": "processing"}
+    tile = find_tile(manifest, x, y)
+    if tile is None:
+        raise HTTPException(status_code=404, detail="Empty or unknown tile")
+    batch = scene.batch(tile["offset"], tile["offset"] + tile["actors"])
+    if stream:
+        return stream_scene([batch], {}, stream)
+    return SceneResponse(content={"PlaceableAssets": batch, "Tile": tile})
+
+@router.get("/stats")
+def stats():
+    return {
+        "blueprint_cache": blueprint_cache.stats(),
+        "intent_sources": dict(INTENT_SOURCES),
+        "executor": executor.stats(),
+        "admission": admission.stats(),
+    }
@@ -0,0 +1,192 @@
+# app/api/streaming.py
+"""
+Streaming scene bodies.
+
+ndjson: one JSON object per line —
+    {"type": "header", "DefaultProperties": {...}, "Seed": ...}
+    {"type": "actor", "stage": "buildings" | "roads" | "forest", "actor": {...}}
+    {"type": "end", "count": N}
+json:   the regular scene document, written as a chunked JSON array so the
+        importer can start parsing PlaceableAssets before the last actor exists.
+
+stream_compile() compiles while the LLM is still writing the blueprint
+(StreamCompiler). The json body is the same document. In ndjson the
+environment is not known when the first actors go out, so the header then
+carries only the Seed and DefaultProperties follow as
+    {"type": "properties", "DefaultProperties": {...}}
+before "end"; a failure after the first actor ends the stream with
+    {"type": "error", "detail": "..."}
+
+Tile ranges of a job result (stream_tiles), tiles in the order asked for:
+ndjson: {"type": "tile", <manifest entry>} before each tile's actor lines,
+        then {"type": "end", "count": N}
+json:   {"Tiles": [{<manifest entry>, "PlaceableAssets": [...]}, ...]}
+
+Job progress is pushed as Server-Sent Events (stream_job_events).
+"""
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Iterable, Iterator
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.core import metrics
+from app.core.actor_batch import ActorBatch
+from app.core.scene_compiler import StreamCompiler, scene_envelope
+from app.core.scene_encoder import encode_array_close, encode_batch, iter_encoded_batches
+
+logger = logging.getLogger("cobox-ai.streaming")
+
+STREAM_FORMATS = ("ndjson", "json")
+CHUNK_ACTORS = 256  # actors per network write
+
+
+def rechunk(batches: Iterable[ActorBatch], size: int = CHUNK_ACTORS) -> Iterator[ActorBatch]:
+    """Splits batches into network-sized pieces."""
+    for batch in batches:
+        for start in range(0, len(batch), size):
+            yield batch[start:start + size]
+
+
+def iter_ndjson(batches: Iterable[ActorBatch], envelope: dict) -> Iterator[bytes]:
+    header = {"type": "header", **{k: v for k, v in envelope.items() if k in ("DefaultProperties", "Seed")}}
+    yield orjson.dumps(header) + b"\n"
+
+    count = 0
+    for batch in rechunk(batches):
+        yield encode_batch(batch, ndjson=True)
+        count += len(batch)
+    yield orjson.dumps({"type": "end", "count": count}) + b"\n"
+
+
+def stream_scene(batches: Iterable[ActorBatch], envelope: dict, fmt: str, headers=None) -> StreamingResponse:
+    if fmt == "ndjson":
+        return StreamingResponse(iter_ndjson(batches, envelope), media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(
+        iter_encoded_batches(rechunk(batches), envelope), media_type="application/json", headers=headers
+    )
+
+
+def iter_tiles(scene, tiles, fmt: str) -> Iterator[bytes]:
+    """`scene` is a BinaryScene stored tiled; `tiles` are its manifest entries."""
+    ndjson = fmt == "ndjson"
+    count = 0
+    if not ndjson:
+        yield b'{"Tiles":['
+    for n, tile in enumerate(tiles):
+        batch = scene.batch(tile["offset"], tile["offset"] + tile["actors"])
+        if ndjson:
+            yield orjson.dumps({"type": "tile", **tile}) + b"\n"
+            for part in rechunk([batch]):
+                yield encode_batch(part, ndjson=True)
+        else:
+            yield (b"," if n else b"") + orjson.dumps(tile)[:-1] + b',"PlaceableAssets":['
+            for i, part in enumerate(rechunk([batch])):
+                yield (b"," if i else b"") + encode_batch(part)
+            yield b"]}"
+        count += len(batch)
+    yield orjson.dumps({"type": "end", "count": count}) + b"\n" if ndjson else b"]}"
+
+
+def stream_tiles(scene, tiles, fmt: str) -> StreamingResponse:
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return StreamingResponse(iter_tiles(scene, tiles, fmt), media_type=media_type)
+
+
+# ==============================================================================
+# STREAMING COMPILE
+# ==============================================================================
+async def iter_compiled(events: AsyncIterator[tuple], seed: int, fmt: str, start: float) -> AsyncIterator[bytes]:
+    """stream_parser events -> scene body, actors written as each element settles."""
+    compiler = StreamCompiler(seed)
+    feed = {"building": compiler.building, "buildings": compiler.end_buildings, "road": compiler.road}
+    ndjson = fmt == "ndjson"
+    header = props = False  # ndjson header / DefaultProperties written
+    envelope = None
+    count = 0
+    if not ndjson:
+        yield b'{"PlaceableAssets":['
+    try:
+        async for name, value in events:
+            if name == "blueprint":
+                envelope = scene_envelope(value, seed)
+                batches = await asyncio.to_thread(compiler.finish, value)  # the forest is the bulk
+            elif name in feed:
+                batches = feed[name](value)
+            else:
+                continue
+            if ndjson and not header:
+                # a whole blueprint up front (local / cached) keeps the usual header
+                props = envelope is not None
+                extra = {"DefaultProperties": envelope["DefaultProperties"]} if props else {}
+                yield orjson.dumps({"type": "header", **extra, "Seed": seed}) + b"\n"
+                header = True
+            for batch in rechunk(batches):
+                if count == 0 and metrics.ENABLED:
+                    metrics.FIRST_ACTOR_SECONDS.observe(time.perf_counter() - start)
+                yield encode_batch(batch, ndjson=True) if ndjson else (b"," if count else b"") + encode_batch(batch)
+                count += len(batch)
+    except Exception as e:
+        if not ndjson:
+            raise  # a json body can only be cut short
+        logger.error(f"Streaming compile failed: {e}")
+        yield orjson.dumps({"type": "error", "detail": type(e).__name__}) + b"\n"
+        return
+
+    if not ndjson:
+        yield encode_array_close(envelope)
+        return
+    if not header:
+        yield orjson.dumps({"type": "header", "Seed": seed}) + b"\n"
+    if not props and envelope is not None:
+        yield orjson.dumps({"type": "properties", "DefaultProperties": envelope["DefaultProperties"]}) + b"\n"
+    yield orjson.dumps({"type": "end", "count": count}) + b"\n"
+
+
+def stream_compile(events: AsyncIterator[tuple], seed: int, fmt: str, headers=None) -> StreamingResponse:
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    body = iter_compiled(events, seed, fmt, time.perf_counter())
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+# ==============================================================================
+# SERVER-SENT EVENTS
+# ==============================================================================
+SSE_HEARTBEAT = 15.0  # seconds; keeps proxies from closing an idle stream
+
+
+def sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def iter_sse(events: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    """{"event": name, ...} dicts -> SSE frames, with comment heartbeats while idle."""
+    events = events.__aiter__()
+    pending = asyncio.ensure_future(events.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=SSE_HEARTBEAT)
+            if not done:
+                yield b": keep-alive\n\n"
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            yield sse(item.pop("event"), item)
+            pending = asyncio.ensure_future(events.__anext__())
+    finally:
+        if not pending.done():
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        await events.aclose()
+
+
+def stream_events(events: AsyncIterator[dict]) -> StreamingResponse:
+    return StreamingResponse(
+        iter_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
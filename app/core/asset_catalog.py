@@ -0,0 +1,172 @@
+# app/core/asset_catalog.py
+"""
+The asset catalog: every placeable asset, one immutable table.
+
+Built at import from the definitions below into plain dicts and tuples, with
+indexes by id, class, category and (connector, tag). preload() imports it in
+the gunicorn master, so forked workers share those objects copy-on-write
+instead of building their own.
+
+Entry i is AssetTable index i (actor_batch interns the catalog first).
+"""
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+# ==============================================================================
+# DEFINITIONS (the only place assets are declared)
+# ==============================================================================
+LIBRARY = "/WorldBuilder/Core/Actors/Placeable/Library"
+
+# category -> (library folder, class prefix, count); numbered from 01
+CATEGORIES = {
+    "floor": ("Floor", "BP_FloorAsset_Wb", 11),
+    "wall": ("Wall", "BP_WallAsset_Wb", 12),
+    "door": ("Door", "BP_DoorAsset_Wb", 4),
+    "ceiling": ("Ceiling", "BP_CeilingAsset_Wb", 3),
+    "track": ("Tracks", "BP_RaceTrack_Wb", 25),
+    "decor": ("Decors", "BP_DecorAsset_Wb", 33),
+}
+
+CONNECTORS = ("Solid", "Pin")  # Solid: standard connection; Pin: socket connection (11, 14)
+SOLID, PIN = 0, 1
+
+# track piece -> (connector, tags, len, curve, z)
+TRACKS = {
+    # --- SOLID STRAIGHTS ---
+    "BP_RaceTrack_Wb_02": (SOLID, ("straight", "basic"), 900, 0, 0),
+    "BP_RaceTrack_Wb_03": (SOLID, ("straight", "bump"), 900, 0, 0),
+    "BP_RaceTrack_Wb_05": (SOLID, ("straight", "wide"), 900, 0, 0),
+    "BP_RaceTrack_Wb_06": (SOLID, ("straight", "gap"), 900, 0, 0),
+    "BP_RaceTrack_Wb_07": (SOLID, ("straight", "s_bend"), 1200, 0, 0),
+    "BP_RaceTrack_Wb_17": (SOLID, ("straight", "long_bump"), 1200, 0, 0),
+    # --- SOLID TURNS ---
+    "BP_RaceTrack_Wb_04": (SOLID, ("turn", "90"), 900, 90, 0),
+    "BP_RaceTrack_Wb_12": (SOLID, ("turn", "slight"), 900, 15, 0),
+    "BP_RaceTrack_Wb_13": (SOLID, ("turn", "sharp"), 900, 90, 0),
+    "BP_RaceTrack_Wb_18": (SOLID, ("turn", "u_turn"), 900, 180, 0),
+    # --- SOLID ELEVATION (Ramps/Hills) ---
+    "BP_RaceTrack_Wb_08": (SOLID, ("ramp", "gentle"), 900, 0, 200),
+    "BP_RaceTrack_Wb_09": (SOLID, ("ramp", "steep"), 900, 0, 400),
+    "BP_RaceTrack_Wb_15": (SOLID, ("ramp", "spiral"), 1200, 45, 300),
+    "BP_RaceTrack_Wb_16": (SOLID, ("ramp", "spiral_steep"), 1200, 90, 600),
+    "BP_RaceTrack_Wb_19": (SOLID, ("ramp", "down"), 1200, 90, -400),
+    "BP_RaceTrack_Wb_20": (SOLID, ("loop",), 2000, 0, 800),  # 360 Loop
+    "BP_RaceTrack_Wb_21": (SOLID, ("hill", "down"), 1200, 0, -200),
+    # --- BRIDGE & SPECIALS ---
+    "BP_RaceTrack_Wb_10": (SOLID, ("bridge", "start"), 1200, 0, 100),
+    "BP_RaceTrack_Wb_25": (SOLID, ("bridge", "segment"), 1200, 0, 0),
+    "BP_RaceTrack_Wb_22": (SOLID, ("split",), 1200, 0, 0),
+    "BP_RaceTrack_Wb_23": (SOLID, ("junction", "mercedes"), 1200, 0, 0),
+    # --- PINS (Socket Connectors) ---
+    "BP_RaceTrack_Wb_11": (PIN, ("connector",), 600, 0, 0),
+    "BP_RaceTrack_Wb_14": (PIN, ("turn", "t_junction"), 900, 90, 0),
+    # --- CAPS/DEAD ENDS ---
+    "BP_RaceTrack_Wb_01": (SOLID, ("cap", "dead_end"), 300, 0, 0),
+    "BP_RaceTrack_Wb_24": (SOLID, ("cap", "return"), 900, 180, 0),
+}
+
+# Road keys the compiler (and the LLM prompt) use -> track piece
+ROAD_KEYS = {
+    "straight": "BP_RaceTrack_Wb_02",
+    "straight_bump": "BP_RaceTrack_Wb_03",
+    "turn_90": "BP_RaceTrack_Wb_04",
+    "turn_slight": "BP_RaceTrack_Wb_12",
+    "ramp_gentle": "BP_RaceTrack_Wb_08",
+    "ramp_steep": "BP_RaceTrack_Wb_09",
+    "bridge_start": "BP_RaceTrack_Wb_10",
+    "bridge_segment": "BP_RaceTrack_Wb_25",
+    "loop_360": "BP_RaceTrack_Wb_20",
+    "u_turn": "BP_RaceTrack_Wb_18",
+    "mercedes": "BP_RaceTrack_Wb_23",
+    "splitter": "BP_RaceTrack_Wb_22",
+    "return_loop": "BP_RaceTrack_Wb_24",
+    "pin_t_junction": "BP_RaceTrack_Wb_14",
+    "adapter_pin": "BP_RaceTrack_Wb_11",  # connects Solid to Pin (or Pin to Solid)
+}
+
+# ==============================================================================
+# TABLES
+# ==============================================================================
+def _definitions() -> List[Tuple[str, str, str]]:
+    """(category, class, path) in catalog order."""
+    out = []
+    for category, (folder, prefix, count) in CATEGORIES.items():
+        for i in range(1, count + 1):
+            name = f"{prefix}_{i:02d}"
+            out.append((category, f"{name}_C", f"{LIBRARY}/{folder}/{name}.{name}_C"))
+    return out
+
+
+def asset_id(path: str) -> str:
+    """Stable 12-hex id of an asset (sha1 of its path)."""
+    return hashlib.sha1(path.encode()).hexdigest()[:12]
+
+
+class AssetCatalog:
+    """
+    entries[i] is the {"class", "path"} dict for AssetTable index i, ids[i] its
+    asset id. Everything returned is shared: do not mutate.
+    """
+
+    def __init__(self):
+        defs = _definitions()
+        self.entries: Tuple[dict, ...] = tuple({"class": cls, "path": path} for _, cls, path in defs)
+        self.ids: Tuple[str, ...] = tuple(asset_id(path) for _, _, path in defs)
+        self.road_keys = ROAD_KEYS
+
+        spans: Dict[str, List[int]] = {}
+        for i, (category, _, _) in enumerate(defs):
+            spans.setdefault(category, [i, i])[1] = i + 1
+        self.categories = {name: range(*span) for name, span in spans.items()}
+        self._category_of = tuple(category for category, _, _ in defs)
+
+        self._by_class = {cls: i for i, (_, cls, _) in enumerate(defs)}
+        self._by_id = {aid: i for i, aid in enumerate(self.ids)}
+
+        # Track pieces and postings keep TRACKS order (the order resolve_next_asset picks defaults in)
+        self._tracks: Dict[int, dict] = {}
+        self._postings: Dict[str, List[int]] = {}
+        for name, (connector, tags, length, curve, z) in TRACKS.items():
+            i = self._by_class[f"{name}_C"]
+            self._tracks[i] = {
+                "index": i, "id": name, "connector": connector, "tags": list(tags),
+                "len": length, "curve": curve, "z": z,
+            }
+            for tag in tags:
+                self._postings.setdefault(f"{CONNECTORS[connector]}/{tag}", []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ------------------------------------------------------------------
+    # LOOKUPS
+    # ------------------------------------------------------------------
+    def index_of_class(self, cls: str) -> Optional[int]:
+        return self._by_class.get(cls)
+
+    def index_of_id(self, asset_id: str) -> Optional[int]:
+        return self._by_id.get(asset_id)
+
+    def category(self, name: str) -> List[dict]:
+        return [self.entries[i] for i in self.categories[name]]
+
+    def category_of(self, i: int) -> str:
+        return self._category_of[i]
+
+    def track(self, name: str) -> dict:
+        """Track piece by name (class without "_C"): entry index plus connector, tags, len, curve, z."""
+        i = self._by_class.get(f"{name}_C")
+        if i not in self._tracks:
+            raise KeyError(name)
+        return self._tracks[i]
+
+    def tracks(self) -> List[dict]:
+        """Every track piece, in definition order."""
+        return list(self._tracks.values())
+
+    def postings(self, connector: int, tag: str) -> List[int]:
+        """Indexes of track pieces with this connector and tag, in definition order."""
+        return self._postings.get(f"{CONNECTORS[connector]}/{tag}", [])
+
+
+CATALOG = AssetCatalog()
@@ -1,48 +1,28 @@
 # app/core/asset_registry.py
-import hashlib
+"""Category views of the asset catalog (app.core.asset_catalog)."""
+from app.core.asset_catalog import CATALOG
 
-# Derived strictly from your PlaceableAssets JSON
-ASSETS = {
-    "floor": [
-        {"class": f"BP_FloorAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Floor/BP_FloorAsset_Wb_{str(i).zfill(2)}.BP_FloorAsset_Wb_{str(i).zfill(2)}_C"} 
-        for i in range(1, 12)
-    ],
-    "wall": [
-        {"class": f"BP_WallAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Wall/BP_WallAsset_Wb_{str(i).zfill(2)}.BP_WallAsset_Wb_{str(i).zfill(2)}_C"} 
-        for i in range(1, 13)
-    ],
-    "door": [
-        {"class": f"BP_DoorAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Door/BP_DoorAsset_Wb_{str(i).zfill(2)}.BP_DoorAsset_Wb_{str(i).zfill(2)}_C"} 
-        for i in range(1, 5)
-    ],
-    "ceiling": [
-        {"class": f"BP_CeilingAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Ceiling/BP_CeilingAsset_Wb_{str(i).zfill(2)}.BP_CeilingAsset_Wb_{str(i).zfill(2)}_C"} 
-        for i in range(1, 4)
-    ],
-    "track": [
-        {"class": f"BP_RaceTrack_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Tracks/BP_RaceTrack_Wb_{str(i).zfill(2)}.BP_RaceTrack_Wb_{str(i).zfill(2)}_C"} 
-        for i in range(1, 26)
-    ],
-    "decor": [
-        {"class": f"BP_DecorAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Decors/BP_DecorAsset_Wb_{str(i).zfill(2)}.BP_DecorAsset_Wb_{str(i).zfill(2)}_C"} 
-        for i in range(1, 34)
+# category -> [{"class", "path"}], the catalog's own entries
+ASSETS = {category: CATALOG.category(category) for category in CATALOG.categories}
+
+# Built once from the catalog's ids; shared, do not mutate
+_PRODUCTION = {
+    category: [
+        {
+            "id": CATALOG.ids[i], "category": category, "blueprint": CATALOG.entries[i]["path"],
+            "class": CATALOG.entries[i]["class"], "path": CATALOG.entries[i]["path"]
+        }
+        for i in indexes
     ]
+    for category, indexes in CATALOG.categories.items()
 }
 
 def get_production_assets():
     """Returns registry for app state."""
-    processed = {cat: [] for cat in ASSETS.keys()}
-    for category, items in ASSETS.items():
-        for item in items:
-            asset_id = hashlib.sha1(item["path"].encode()).hexdigest()[:12]
-            processed[category].append({
-                "id": asset_id, "category": category, "blueprint": item["path"],
-                "class": item["class"], "path": item["path"]
-            })
-    return processed
+    return _PRODUCTION
 
 def get_asset_by_category(category: str, index: int = 0):
     """Deterministic picker."""
     # Fallback to decor if category not found (safety)
     cat_list = ASSETS.get(category, ASSETS["decor"])
-    return cat_list[index % len(cat_list)]
\ No newline at end of file
+    return cat_list[index % len(cat_list)]
@@ -0,0 +1,279 @@
+# app/core/executor.py
+"""
+Job execution subsystem.
+
+    submit()  ->  bounded queue, one FIFO per lane  ->  N async workers (LLM / I/O bound)
+                                                          |
+                                                  run_cpu() -> process pool (compile + encode)
+
+Interactive requests (/instant) always run before queued batch work (/command,
+/batch items), and `interactive_workers` of the workers only ever take
+interactive work, so a queue full of batch jobs cannot occupy every worker.
+When the queue is full, submit() raises QueueFull and the API answers 429
+instead of letting latency grow without bound. Cancelling the future that
+submit() returned cancels the job, queued or running; whatever a job holds
+(an admission lease) is released from that future's done callbacks, which run
+however it ends. Each job records how long it waited in the queue and how
+long it ran.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.settings import settings
+
+INTERACTIVE = 0
+BATCH = 1
+LANES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class QueueFull(Exception):
+    """The executor queue is at capacity; retry later."""
+
+
+# ==============================================================================
+# PROCESS POOL ENTRY POINTS (must be importable top-level functions)
+# ==============================================================================
+def compile_to_json(blueprint: dict, seed: Optional[int] = None) -> bytes:
+    """Compiled scene as the encoded JSON document."""
+    from app.core.scene_compiler import compile_scene
+    from app.core.scene_encoder import encode_scene
+    scene = compile_scene(blueprint, seed)
+    with metrics.stage("serialize"):
+        return encode_scene(scene)
+
+
+def compile_to_cbx(blueprint: dict, seed: Optional[int] = None) -> bytes:
+    """Compiled scene as .cbx bytes (the job store's result format), tiled per SCENE_TILE_CELLS."""
+    from app.core.scene_binary import encode_binary
+    from app.core.scene_compiler import compile_scene
+    scene = compile_scene(blueprint, seed)
+    if settings.SCENE_TILE_CELLS > 0:
+        from app.core.scene_tiles import tile_scene
+        with metrics.stage("tiles"):
+            scene = tile_scene(scene, settings.SCENE_TILE_CELLS)
+    with metrics.stage("serialize"):
+        return encode_binary(scene)
+
+
+def _warm_up() -> bool:
+    import app.core.scene_compiler  # noqa: F401  (pays the import cost before the first job)
+    return True
+
+
+# ==============================================================================
+# EXECUTOR
+# ==============================================================================
+class _Item:
+    __slots__ = ("factory", "future", "on_metrics", "lane", "enqueued", "context")
+
+    def __init__(self, factory, future, on_metrics, lane):
+        self.factory = factory
+        self.future = future
+        self.on_metrics = on_metrics
+        self.lane = lane
+        self.enqueued = time.perf_counter()
+        self.context = contextvars.copy_context()  # the submitter's (request timings)
+
+
+class JobExecutor:
+    def __init__(self, max_queue: int = 256, workers: int = 32, cpu_workers: int = 2, interactive_workers: int = 4):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.interactive_workers = max(0, min(interactive_workers, workers - 1))  # at least one takes batch work
+        self.cpu_workers = cpu_workers  # 0 = run CPU work on a thread instead
+        self._queues: Optional[Dict[int, Deque[_Item]]] = None
+        self._idle: List[Tuple[Tuple[int, ...], asyncio.Future]] = []  # (lanes, wake-up) of waiting workers
+        self._tasks = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.running = 0
+        self.counters = {"completed": 0, "failed": 0, "cancelled": 0, "rejected": 0}
+        self._wait_total = {lane: 0.0 for lane in LANES}
+        self._run_total = {lane: 0.0 for lane in LANES}
+        self._done = {lane: 0 for lane in LANES}
+
+    # ------------------------------------------------------------------
+    # LIFECYCLE (one executor per gunicorn worker, started after fork)
+    # ------------------------------------------------------------------
+    async def start(self):
+        if self._queues is not None:
+            return
+        self._queues = {lane: deque() for lane in LANES}
+        if self.cpu_workers > 0:
+            # spawn: never fork a process that already holds event-loop/HTTP/SQLite state
+            self._pool = ProcessPoolExecutor(self.cpu_workers, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.cpu_workers):
+                self._pool.submit(_warm_up)
+        general = self.workers - self.interactive_workers
+        self._tasks = [
+            asyncio.create_task(self._worker((INTERACTIVE, BATCH) if i < general else (INTERACTIVE,)))
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in (self._queues or {}).values():
+            for item in queue:
+                item.future.cancel()  # never started: their done callbacks still release what they hold
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._queues = None
+        self._idle = []
+
+    # ------------------------------------------------------------------
+    # SUBMISSION
+    # ------------------------------------------------------------------
+    def queued(self, lane: int) -> int:
+        return len(self._queues[lane]) if self._queues is not None else 0
+
+    @property
+    def depth(self) -> int:
+        return sum(self.queued(lane) for lane in LANES)
+
+    def ensure_capacity(self, jobs: int = 1):
+        """Raises QueueFull when submitting `jobs` jobs right now would be rejected."""
+        if self.depth + jobs > self.max_queue:
+            self.counters["rejected"] += 1
+            raise QueueFull(f"{self.depth} jobs queued")
+
+    def submit(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        lane: int = BATCH,
+        on_metrics: Optional[Callable[[Dict[str, float]], None]] = None,
+    ) -> asyncio.Future:
+        """
+        Queues `factory()` (a coroutine function) and returns a future for its
+        result; cancelling the future cancels the job. on_metrics receives
+        {"queue_wait_ms", "run_ms"} when it finishes.
+        """
+        if self._queues is None:
+            raise RuntimeError("JobExecutor is not started")
+        self.ensure_capacity()
+        future = asyncio.get_running_loop().create_future()
+        self._queues[lane].append(_Item(factory, future, on_metrics, lane))
+        for i, (lanes, wake) in enumerate(self._idle):
+            if lane in lanes:
+                del self._idle[i]
+                wake.set_result(None)
+                break
+        return future
+
+    async def run(self, factory: Callable[[], Awaitable[Any]], lane: int = INTERACTIVE, on_metrics=None) -> Any:
+        return await self.submit(factory, lane, on_metrics)
+
+    async def run_cpu(self, fn: Callable, *args) -> Any:
+        """Runs a picklable top-level function in the process pool."""
+        if metrics.ENABLED:
+            # stages timed in the pool come back with the result
+            fn, args = metrics.captured_call, (fn, *args)
+        if self._pool is None:
+            result = await asyncio.to_thread(fn, *args)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        if metrics.ENABLED:
+            result, stages = result
+            metrics.absorb(stages)
+        return result
+
+    # ------------------------------------------------------------------
+    # WORKERS
+    # ------------------------------------------------------------------
+    async def _next(self, lanes: Tuple[int, ...]) -> _Item:
+        """The oldest item of the first non-empty lane in `lanes`, waiting for one."""
+        while True:
+            for lane in lanes:
+                if self._queues[lane]:
+                    return self._queues[lane].popleft()
+            wake = asyncio.get_running_loop().create_future()
+            self._idle.append((lanes, wake))
+            try:
+                await wake
+            finally:
+                if not wake.done():  # the worker is being stopped
+                    self._idle.remove((lanes, wake))
+
+    async def _worker(self, lanes: Tuple[int, ...]):
+        while True:
+            item = await self._next(lanes)
+            if item.future.cancelled():
+                continue  # cancelled while queued: its done callbacks already ran, the factory never does
+            started = time.perf_counter()
+            self.running += 1
+            # run in the submitter's context so its stage timings reach its response
+            task = item.context.run(asyncio.ensure_future, item.factory())
+            # a submitter that stops waiting (client gone) takes the job down with it
+            item.future.add_done_callback(lambda future, task=task: future.cancelled() and task.cancel())
+            try:
+                value = await task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    task.cancel()  # the executor is stopping
+                    item.future.cancel()
+                    raise
+                self.counters["cancelled"] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+            else:
+                self.counters["completed"] += 1
+                if not item.future.done():
+                    item.future.set_result(value)
+            finally:
+                self.running -= 1
+                finished = time.perf_counter()
+                self._record(item, started - item.enqueued, finished - started)
+
+    def _record(self, item: _Item, wait: float, run: float):
+        self._wait_total[item.lane] += wait
+        self._run_total[item.lane] += run
+        self._done[item.lane] += 1
+        if item.on_metrics is not None:
+            try:
+                item.on_metrics({"queue_wait_ms": round(wait * 1000, 3), "run_ms": round(run * 1000, 3)})
+            except Exception:
+                pass  # metrics must never take a worker down
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane, name in LANES.items():
+            n = self._done[lane]
+            lanes[name] = {
+                "queued": self.queued(lane),
+                "finished": n,
+                "avg_queue_wait_ms": round(self._wait_total[lane] / n * 1000, 3) if n else 0.0,
+                "avg_run_ms": round(self._run_total[lane] / n * 1000, 3) if n else 0.0,
+            }
+        return {
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "interactive_workers": self.interactive_workers,
+            "cpu_workers": self.cpu_workers,
+            "running": self.running,
+            "lanes": lanes,
+            **self.counters,
+        }
+
+
+executor = JobExecutor(
+    max_queue=settings.EXECUTOR_MAX_QUEUE,
+    workers=settings.EXECUTOR_WORKERS,
+    cpu_workers=settings.EXECUTOR_CPU_WORKERS,
+    interactive_workers=settings.EXECUTOR_INTERACTIVE_WORKERS,
+)
+
+metrics.gauge(
+    "cobox_executor_queue_depth", "Jobs waiting in the executor queue",
+    lambda: {(("lane", name),): executor.queued(lane) for lane, name in LANES.items()},
+)
+metrics.gauge("cobox_executor_running", "Jobs being executed", lambda: {(): executor.running})
@@ -1,15 +1,109 @@
-import json
+# app/core/exporter.py
+"""
+Scene export.
+
+The scene is encoded in chunks and hashed first: the name is the SHA-256 of
+the uncompressed content, so identical scenes map to the same file and a
+re-export returns the existing one without writing anything, while two
+different exports can never collide. A new file is written through an
+optional compressor into a temp file in the export directory, then renamed
+into place (atomic on POSIX). export_scene_async runs the whole pipeline off
+the event loop.
+"""
+import asyncio
+import gzip
+import hashlib
+import lzma
+import os
+import tempfile
 from pathlib import Path
-from datetime import datetime
+from typing import Iterator, Optional
+
+from app.core.actor_batch import ActorBatch
+from app.core.scene_binary import encode_binary
+from app.core.scene_encoder import encode_scene, iter_encoded_batches
+from app.settings import settings
+
+EXPORT_FORMATS = ("json", "cbx")
+COMPRESSION = {None: "", "gzip": ".gz", "lzma": ".xz"}
+CHUNK_ACTORS = 4096  # actors per write
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates 0600 files; exports get the mode open() would have given them.
+# Read once: setting the umask to read it is not safe while export threads run
+FILE_MODE = 0o666 & ~_umask()
+
+
+def export_dir() -> Path:
+    path = Path(settings.EXPORT_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _iter_chunks(scene: dict, fmt: str) -> Iterator[bytes]:
+    if fmt == "cbx":
+        yield encode_binary(scene)
+        return
+    actors = scene.get("PlaceableAssets")
+    if not isinstance(actors, ActorBatch):
+        yield encode_scene(scene)
+        return
+    envelope = {k: v for k, v in scene.items() if k != "PlaceableAssets"}
+    batches = (actors[i:i + CHUNK_ACTORS] for i in range(0, len(actors), CHUNK_ACTORS))
+    yield from iter_encoded_batches(batches, envelope)
+
+
+def _open_compressed(raw, compression: Optional[str]):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)  # mtime=0: reproducible bytes
+    if compression == "lzma":
+        return lzma.LZMAFile(raw, mode="wb")
+    return raw
+
+
+def export_scene(scene: dict, fmt: str = "json", compression: Optional[str] = None) -> str:
+    """
+    Writes the scene and returns its path: scene_<sha256[:16]>.<fmt>[.gz|.xz].
+    fmt: "json" (Unreal layout) or "cbx" (compact binary, see scene_binary).
+    compression: None, "gzip" or "lzma".
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression not in COMPRESSION:
+        raise ValueError(f"Unknown compression: {compression}")
 
-EXPORT_DIR = Path("exports")
-EXPORT_DIR.mkdir(exist_ok=True)
+    chunks = list(_iter_chunks(scene, fmt))
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    directory = export_dir()
+    path = directory / f"scene_{digest.hexdigest()[:16]}.{fmt}{COMPRESSION[compression]}"
+    if path.exists():
+        return str(path)  # identical scene already exported
 
-def export_scene(scene: dict) -> str:
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_path = EXPORT_DIR / f"scene_{ts}.json"
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".scene_", suffix=".tmp")
+    try:
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, "wb") as raw:
+            out = _open_compressed(raw, compression)
+            for chunk in chunks:
+                out.write(chunk)
+            if out is not raw:
+                out.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_name, path)  # a concurrent export of the same scene wrote the same bytes
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return str(path)
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(scene, f, indent=2)
 
-    return str(file_path)
+async def export_scene_async(scene: dict, fmt: str = "json", compression: Optional[str] = None) -> str:
+    return await asyncio.to_thread(export_scene, scene, fmt, compression)
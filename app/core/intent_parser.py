@@ -1,6 +1,274 @@
 # app/core/intent_parser.py
-from app.llm.openai_client import generate_spatial_layout
+import re
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-def parse_intent(text: str):
-    """Bridge to the LLM Spatial Engine."""
-    return generate_spatial_layout(text)
\ No newline at end of file
+from pydantic import ValidationError
+
+from app.core.intent_schema import ObjectIntent, SceneIntent
+from app.llm.blueprint_dsl import MAX_BUILDINGS, MAX_ROAD_PIECES
+from app.llm.openai_client import generate_spatial_layout, stream_spatial_layout
+from app.settings import settings
+
+# Which path served each request ("local" never touches the network).
+INTENT_SOURCES: Counter = Counter()
+
+# ==============================================================================
+# LOCAL FAST PATH (deterministic phrase rules)
+# ==============================================================================
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "fifteen": 15, "twenty": 20, "few": 3, "couple": 2,
+}
+_NUM = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+DEFAULT_FLOORS = 3
+DEFAULT_ROADS = ["straight", "straight", "turn_90"]
+LOOP_ROADS = ["straight", "straight", "turn_90"] * 4
+DEFAULT_ENVIRONMENT = {"time": 14.0, "brightness": 10.0}
+
+# Words that carry no layout meaning on their own.
+FILLER = {
+    "a", "an", "the", "with", "and", "of", "some", "please", "make", "create",
+    "generate", "build", "give", "me", "i", "want", "need", "scene", "level",
+    "map", "world", "in", "on", "at", "for", "to", "that", "has", "have", "only",
+    "just", "road", "roads", "track", "racetrack", "race", "simple", "small", "around",
+    "city", "town", "village",
+}
+
+# A negation no rule consumed ("3 buildings with no roads") may flip the meaning
+# of whatever the rules did match, so the parse is not trusted at all.
+NEGATIONS = {"no", "not", "without", "dont", "never", "except", "nor"}
+
+def _count(token: str, limit: Optional[int] = None) -> int:
+    """A number word or digits; at most `limit` (lists are built from it)."""
+    n = int(token) if token.isdigit() else NUMBER_WORDS[token]
+    return n if limit is None else min(n, limit)
+
+
+def _buildings(state, m):
+    state["buildings"] = _count(m.group(1), MAX_BUILDINGS)
+    if m.group(2):
+        state["floors"] = _count(m.group(2))
+
+
+def _sized_buildings(state, m):
+    state["buildings"] = _count(m.group(1), MAX_BUILDINGS)
+    state["floors"] = _count(m.group(2))
+
+
+def _floors(state, m):
+    state["floors"] = _count(m.group(1))
+
+
+def _no_buildings(state, m):
+    state["buildings"] = 0
+
+
+def _straights(state, m):
+    state["roads"] = ["straight"] * _count(m.group(1), MAX_ROAD_PIECES)
+
+
+def _loop(state, m):
+    state["roads"] = list(LOOP_ROADS)
+
+
+def _forest(density):
+    def handler(state, m):
+        state["forest_density"] = density
+    return handler
+
+
+def _environment(time, brightness):
+    def handler(state, m):
+        state["environment"] = {"time": time, "brightness": brightness}
+    return handler
+
+
+# (pattern, handler) — handlers mutate the parse state; matched spans are consumed.
+RULES = [
+    (rf"\b{_NUM} {_NUM}(?: |-)?(?:floors?|stor(?:e)?(?:y|ies)) (?:buildings?|houses?|towers?)\b", _sized_buildings),
+    (rf"\b{_NUM} (?:buildings?|houses?|towers?)(?: (?:with|of) {_NUM} (?:floors?|stor(?:e)?(?:y|ies)|levels?))?\b", _buildings),
+    (rf"\b{_NUM}(?: |-)?(?:floors?|stor(?:e)?(?:y|ies)) ?(?:tall|high)?\b", _floors),
+    (r"\b(?:roads? only|only roads?|no buildings?|without buildings?)\b", _no_buildings),
+    (rf"\b{_NUM} (?:straight (?:roads?|segments?|pieces?)|straights?|road segments?|segments?)\b", _straights),
+    (r"\b(?:loop|circular|circuit|oval)\b", _loop),
+    (r"\b(?:no|without) (?:trees?|forest|foliage)\b", _forest(0.0)),
+    (r"\b(?:dense|thick|lots of|many) (?:forest|trees?|woods?)\b", _forest(0.4)),
+    (r"\b(?:sparse|few|light) (?:forest|trees?|woods?)\b", _forest(0.05)),
+    (r"\b(?:forest|trees?|woods?)\b", _forest(0.2)),
+    (r"\b(?:at )?night(?:time)?\b", _environment(22.0, 2.0)),
+    (r"\b(?:at )?(?:sunset|dusk|evening)\b", _environment(19.0, 5.0)),
+    (r"\b(?:in the )?(?:morning|sunrise|dawn)\b", _environment(7.0, 7.0)),
+    (r"\b(?:at )?(?:noon|midday|daytime|day)\b", _environment(12.0, 10.0)),
+]
+_COMPILED_RULES = [(re.compile(p), h) for p, h in RULES]
+
+
+def _apply_rules(rules, text: str, filler=FILLER) -> Tuple[Dict, float]:
+    """
+    Runs (pattern, handler) rules over text; returns (state, share of meaningful
+    words understood). Meaningful words are the ones not in `filler`; an
+    unconsumed negation makes the confidence 0.0.
+    """
+    state: Dict = {}
+    remaining = f" {text} "
+    for pattern, handler in rules:
+        match = pattern.search(remaining)
+        if match is None:
+            continue
+        handler(state, match)
+        remaining = remaining[:match.start()] + " " + remaining[match.end():]
+
+    meaningful = [w for w in text.split() if w not in filler]
+    unknown = [w for w in remaining.split() if w not in filler]
+    if any(w in NEGATIONS for w in unknown):
+        return state, 0.0
+    confidence = 1.0 - (len(unknown) / len(meaningful)) if meaningful else 1.0
+    return state, confidence
+
+
+def _to_scene_intent(state: Dict) -> SceneIntent:
+    objects: List[ObjectIntent] = []
+    if state.get("buildings"):
+        objects.append(ObjectIntent(type="building", count=state["buildings"]))
+    if state.get("roads"):
+        objects.append(ObjectIntent(type="road", count=len(state["roads"])))
+    scene_type = "city" if state.get("buildings") else "track"
+    return SceneIntent(scene_type=scene_type, objects=objects)
+
+
+def parse_local(text: str) -> Tuple[Optional[dict], float]:
+    """
+    Rule-based parser for common phrasing ("3 buildings", "roads only", "a loop track").
+    Expects sanitize_text output. Returns (blueprint, confidence); confidence is the
+    share of meaningful words the rules understood, 0.0 when nothing matched.
+    """
+    state, confidence = _apply_rules(_COMPILED_RULES, text)
+    if not state:
+        return None, 0.0
+
+    try:
+        intent = _to_scene_intent(state)
+    except ValidationError:
+        return None, 0.0
+
+    building_count = next((o.count for o in intent.objects if o.type == "building"), 0)
+    floors = min(max(state.get("floors", DEFAULT_FLOORS), 1), 20)
+    blueprint = {
+        "layout": {
+            "buildings": [floors] * building_count,
+            "road_sequence": state.get("roads") or list(DEFAULT_ROADS),
+            "forest_density": state.get("forest_density", 0.1),
+        },
+        "environment": dict(state.get("environment", DEFAULT_ENVIRONMENT)),
+    }
+    return blueprint, confidence
+
+
+# ==============================================================================
+# EDIT PHRASES (blueprint deltas for scene_state.SceneState.apply)
+# ==============================================================================
+EDIT_FILLER = FILLER | {"more", "add", "another", "extra", "bit", "little", "lot", "it", "can", "you", "this", "is"}
+
+def _append_buildings(count_group, floors_group=None):
+    def handler(delta, m):
+        count = _count(m.group(count_group), MAX_BUILDINGS) if count_group else 1
+        floors = _count(m.group(floors_group)) if floors_group and m.group(floors_group) else DEFAULT_FLOORS
+        delta.setdefault("append", {})["buildings"] = [min(max(floors, 1), 20)] * count
+    return handler
+
+
+def _remove_buildings(delta, m):
+    delta["remove_buildings"] = _count(m.group(1))
+
+
+def _clear_buildings(delta, m):
+    delta.setdefault("layout", {})["buildings"] = []
+
+
+def _append_straights(count):
+    def handler(delta, m):
+        n = _count(m.group(1), MAX_ROAD_PIECES) if count is None else count
+        delta.setdefault("append", {})["road_sequence"] = ["straight"] * n
+    return handler
+
+
+def _set_forest(density):
+    def handler(delta, m):
+        delta.setdefault("layout", {})["forest_density"] = density
+    return handler
+
+
+def _set_environment(time, brightness):
+    def handler(delta, m):
+        delta["environment"] = {"time": time, "brightness": brightness}
+    return handler
+
+
+_BUILDING = r"(?:buildings?|houses?|towers?)"
+_FLOORS = r"(?:floors?|stor(?:e)?(?:y|ies))"
+
+EDIT_RULES = [
+    (rf"\b(?:add )?{_NUM} (?:more|extra) {_BUILDING}(?: with {_NUM} {_FLOORS})?\b", _append_buildings(1, 2)),
+    (rf"\badd {_NUM} {_BUILDING}(?: with {_NUM} {_FLOORS})?\b", _append_buildings(1, 2)),
+    (rf"\b(?:add )?another {_BUILDING}\b", _append_buildings(None)),
+    (rf"\b(?:remove|delete|drop) {_NUM} {_BUILDING}\b", _remove_buildings),
+    (rf"\b(?:remove|delete|drop) (?:the |all )?(?:of the )?{_BUILDING}\b", _clear_buildings),
+    (r"\b(?:add|extend (?:the )?(?:track|road) by) " + _NUM + r" (?:more )?(?:straight )?(?:road )?(?:segments?|pieces?|straights?)\b", _append_straights(None)),
+    (r"\b(?:(?:track|road) )?longer\b|\bextend (?:the )?(?:track|road)\b", _append_straights(3)),
+    (r"\b(?:remove|no|without) (?:the )?(?:trees?|forest)\b", _set_forest(0.0)),
+    (r"\b(?:more|denser|thicker) (?:trees|forest)\b|\bdenser\b", _set_forest(0.4)),
+    (r"\b(?:fewer|less|sparser) (?:trees|forest)\b", _set_forest(0.05)),
+    (r"\b(?:at )?night(?:time)?\b", _set_environment(22.0, 2.0)),
+    (r"\b(?:at )?(?:sunset|dusk|evening)\b", _set_environment(19.0, 5.0)),
+    (r"\b(?:in the )?(?:morning|sunrise|dawn)\b", _set_environment(7.0, 7.0)),
+    (r"\b(?:at )?(?:noon|midday|daytime|day)\b", _set_environment(12.0, 10.0)),
+]
+_COMPILED_EDIT_RULES = [(re.compile(p), h) for p, h in EDIT_RULES]
+
+
+def parse_edit(text: str) -> Optional[dict]:
+    """
+    Follow-up phrasing ("add two more buildings", "make the track longer") as a
+    blueprint delta; None when the rules are not confident (see LOCAL_INTENT_MIN_CONFIDENCE).
+    Appended counts are capped at MAX_BUILDINGS / MAX_ROAD_PIECES.
+    """
+    delta, confidence = _apply_rules(_COMPILED_EDIT_RULES, text, EDIT_FILLER)
+    if not delta or confidence < settings.LOCAL_INTENT_MIN_CONFIDENCE:
+        return None
+    return delta
+
+
+async def parse_intent(text: str) -> Tuple[dict, str]:
+    """
+    Local rules first, LLM Spatial Engine when they are not confident.
+    Returns (blueprint, source) with source in {"local", "llm"}.
+    """
+    blueprint, confidence = parse_local(text)
+    if blueprint is not None and confidence >= settings.LOCAL_INTENT_MIN_CONFIDENCE:
+        source = "local"
+    else:
+        blueprint, source = await generate_spatial_layout(text), "llm"
+    INTENT_SOURCES[source] += 1
+    return blueprint, source
+
+
+async def _whole(blueprint: dict) -> AsyncIterator[tuple]:
+    yield "blueprint", blueprint
+
+
+def stream_intent(text: str) -> Tuple[AsyncIterator[tuple], str]:
+    """
+    parse_intent for streaming compiles: (events, source). A local blueprint
+    is a single ("blueprint", ...) event; the LLM's arrives element by element
+    (see stream_spatial_layout).
+    """
+    blueprint, confidence = parse_local(text)
+    if blueprint is not None and confidence >= settings.LOCAL_INTENT_MIN_CONFIDENCE:
+        events, source = _whole(blueprint), "local"
+    else:
+        events, source = stream_spatial_layout(text), "llm"
+    INTENT_SOURCES[source] += 1
+    return events, source
@@ -1,24 +1,216 @@
+# app/core/job_manager.py
+"""
+Jobs and editable scenes on top of the job store (app/core/job_store.py).
+
+The async functions are for the event loop: their store calls run on one
+job-store thread per worker, in submission order, so a busy SQLite file (up
+to its 10 s busy timeout) never stalls the loop. get_result/get_tiled_result
+block and are for worker threads (the sync result routes).
+"""
+import asyncio
+import functools
+import os
 import uuid
-from typing import Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set, Tuple
+
+from app.core.job_store import FINISHED, build_job_store
+from app.core.scene_binary import BinaryScene, encode_binary
+from app.core.scene_state import SceneState
+from app.settings import settings
+
+STORE = build_job_store(
+    settings.JOB_STORE,
+    settings.JOB_STORE_PATH,
+    ttl=settings.JOB_TTL,
+    unfinished_ttl=settings.JOB_UNFINISHED_TTL,
+    max_results=settings.JOB_MAX_RESULTS,
+    max_result_bytes=settings.JOB_MAX_RESULT_BYTES,
+    scene_ttl=settings.SCENE_TTL,
+)
+
+# Local wake-ups for watch(); other workers' changes are picked up by polling
+_WATCHERS: Dict[str, Set[asyncio.Event]] = {}
+
+def _notify(job_id):
+    for event in _WATCHERS.get(job_id, ()):
+        event.set()
+
+# ==============================================================================
+# JOB-STORE THREAD (created per process, never inherited across a gunicorn fork)
+# ==============================================================================
+_IO: Optional[ThreadPoolExecutor] = None
+_IO_PID = None
 
-JOBS: Dict[str, Dict[str, Any]] = {}
+def _io() -> ThreadPoolExecutor:
+    global _IO, _IO_PID
+    if _IO is None or _IO_PID != os.getpid():
+        _IO, _IO_PID = ThreadPoolExecutor(1, thread_name_prefix="job-store"), os.getpid()
+    return _IO
 
-def create_job() -> str:
+async def _store(fn: Callable, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(_io(), functools.partial(fn, *args, **kwargs))
+
+async def evict_periodically(interval: float):
+    """Runs STORE.evict() every `interval` seconds (the app's lifetime task)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await _store(STORE.evict)
+        except Exception:
+            pass  # a locked database is retried next round
+
+
+# ==============================================================================
+# JOBS
+# ==============================================================================
+def _create(job_id: str):
+    STORE.create(job_id)
+    STORE.append_log(job_id, "Queued")
+
+def _update(job_id, result=None, **fields):
+    # Scenes are stored encoded (.cbx), never as live objects
+    if result is not None:
+        payload = result if isinstance(result, bytes) else encode_binary(result)
+        STORE.set_result(job_id, payload, status=fields.pop("status", "done"))
+    if fields:
+        STORE.update(job_id, **fields)
+
+async def create_job() -> str:
     job_id = uuid.uuid4().hex
-    JOBS[job_id] = {
-        "status": "queued",
-        "logs": [],
-        "result": None,
-        "cancelled": False
-    }
+    await _store(_create, job_id)
     return job_id
 
-def update_job(job_id, **kwargs):
-    JOBS[job_id].update(kwargs)
+async def update_job(job_id, **kwargs):
+    await _store(_update, job_id, **kwargs)
+    _notify(job_id)
+
+def update_job_nowait(job_id, **kwargs):
+    """update_job from synchronous callbacks on the loop (executor on_metrics): queued, not awaited."""
+    loop = asyncio.get_running_loop()
+    done = _io().submit(functools.partial(_update, job_id, **kwargs))
+    done.add_done_callback(lambda _: loop.call_soon_threadsafe(_notify, job_id))
+
+async def log(job_id, message):
+    await _store(STORE.append_log, job_id, message)
+    _notify(job_id)
+
+async def cancel(job_id):
+    await _store(STORE.cancel, job_id)
+    _notify(job_id)
+
+async def get_job(job_id) -> Optional[Dict[str, Any]]:
+    """Status, logs and extras of a job (no result); None when unknown or evicted."""
+    return await _store(STORE.get, job_id)
+
+def _open_result(job_id) -> Optional[BinaryScene]:
+    payload = STORE.get_result(job_id)
+    return BinaryScene(payload) if payload is not None else None
+
+def get_result(job_id) -> Optional[dict]:
+    """Finished scene ({"PlaceableAssets": ActorBatch, ...envelope}) or None."""
+    scene = _open_result(job_id)
+    if scene is None:
+        return None
+    envelope = {k: v for k, v in scene.meta.items() if k != "Tiles"}  # the manifest is served separately
+    return {"PlaceableAssets": scene.batch(), **envelope}
+
+def get_tiled_result(job_id) -> Optional[Tuple[Optional[dict], BinaryScene]]:
+    """
+    (tile manifest, BinaryScene) of a finished job, or None. The manifest is
+    None for results stored untiled; see app/core/scene_tiles.py. The scene
+    reads each tile's records from the store as it is asked for.
+    """
+    scene = BinaryScene.head(functools.partial(STORE.get_result_range, job_id))
+    if scene is None:
+        return None
+    return scene.meta.get("Tiles"), scene
+
+async def watch(job_id, poll: float = 0.5) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yields {"event": "status" | "log", ...} as the job changes and stops after
+    a finished status. Yields a single {"event": "status", "status": "unknown"}
+    for missing or evicted jobs.
+    """
+    wake = asyncio.Event()
+    _WATCHERS.setdefault(job_id, set()).add(wake)
+    status, seen = None, 0
+    try:
+        while True:
+            wake.clear()
+            job = await get_job(job_id)
+            if job is None:
+                yield {"event": "status", "status": "unknown"}
+                return
+            for message in job["logs"][seen:]:
+                yield {"event": "log", "message": message}
+            seen = len(job["logs"])
+            if job["status"] != status:
+                status = job["status"]
+                yield {"event": "status", "status": status}
+            if status in FINISHED:
+                return
+            try:
+                await asyncio.wait_for(wake.wait(), poll)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        watchers = _WATCHERS.get(job_id)
+        if watchers is not None:
+            watchers.discard(wake)
+            if not watchers:
+                del _WATCHERS[job_id]
+
+
+# ==============================================================================
+# EDITABLE SCENES (versioned records in the job store; hot copies cached per worker)
+# ==============================================================================
+_SCENES: "OrderedDict[str, SceneState]" = OrderedDict()
+
+def _cache_scene(scene_id, state: SceneState):
+    _SCENES[scene_id] = state
+    _SCENES.move_to_end(scene_id)
+    while len(_SCENES) > settings.SCENE_CACHE_ENTRIES:
+        _SCENES.popitem(last=False)
+
+def _stored_scene(scene_id, cached_version: Optional[int]) -> Tuple[Optional[int], Optional[bytes]]:
+    """(version, payload) of a stored scene, payload None when cached_version is current; (None, None) when unknown."""
+    version = STORE.get_scene_version(scene_id)
+    if version is None or version == cached_version:
+        return version, None
+    return STORE.get_scene(scene_id) or (None, None)
+
+async def create_scene(state: SceneState) -> str:
+    scene_id = uuid.uuid4().hex
+    await _store(STORE.create_scene, scene_id, state.dumps(), state.version)
+    _cache_scene(scene_id, state)
+    return scene_id
 
-def log(job_id, message):
-    JOBS[job_id]["logs"].append(message)
+async def save_scene(scene_id, state: SceneState, expected: int) -> bool:
+    """
+    Stores `state` if the stored scene is still at version `expected`;
+    False when another edit (on any worker) saved first.
+    """
+    if not await _store(STORE.save_scene, scene_id, state.dumps(), state.version, expected):
+        _SCENES.pop(scene_id, None)
+        return False
+    _cache_scene(scene_id, state)
+    return True
 
-def cancel(job_id):
-    JOBS[job_id]["cancelled"] = True
-    JOBS[job_id]["status"] = "cancelled"
+async def load_scene(scene_id) -> Optional[SceneState]:
+    """Latest SceneState (possibly saved by another worker); None when unknown or evicted."""
+    cached = _SCENES.get(scene_id)
+    version, payload = await _store(_stored_scene, scene_id, cached.version if cached is not None else None)
+    if version is None:
+        _SCENES.pop(scene_id, None)
+        return None
+    if cached is not None and cached.version == version:
+        _SCENES.move_to_end(scene_id)
+        return cached
+    if payload is None:
+        return None
+    # replays the scene's edits: off the loop, and off the job-store thread
+    state = await asyncio.to_thread(SceneState.loads, payload)
+    _cache_scene(scene_id, state)
+    return state
@@ -0,0 +1,402 @@
+# app/core/job_store.py
+"""
+Job state storage behind app.core.job_manager.
+
+MemoryJobStore   per-process dict (single worker, scripts).
+SQLiteJobStore   one WAL-mode database file shared by every worker on the host.
+
+Results are kept as encoded bytes (scene_binary .cbx), never as live objects,
+and evict() drops finished jobs by age (ttl), jobs that never finished by age
+(unfinished_ttl) and the oldest results past a count/byte budget, so memory and
+disk stay flat under sustained load. evict() is the caller's to schedule
+(app.core.job_manager runs it on a timer); writes never evict.
+
+Editable scenes are versioned records (SceneState.dumps) kept apart from
+jobs: they are not results, and a burst of jobs never evicts them. They are
+dropped once unsaved for scene_ttl.
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+FINISHED = ("done", "error", "cancelled")
+
+
+class JobStore(ABC):
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        unfinished_ttl: float = 6 * 3600.0,
+        max_results: int = 256,
+        max_result_bytes: int = 256 * 1024 * 1024,
+        scene_ttl: float = 24 * 3600.0,
+    ):
+        self.ttl = ttl
+        self.unfinished_ttl = unfinished_ttl
+        self.max_results = max_results
+        self.max_result_bytes = max_result_bytes
+        self.scene_ttl = scene_ttl
+
+    @abstractmethod
+    def create(self, job_id: str):
+        pass
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job fields (status, logs, cancelled, extras) without the result payload."""
+        pass
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        pass
+
+    @abstractmethod
+    def append_log(self, job_id: str, message: str):
+        pass
+
+    @abstractmethod
+    def set_result(self, job_id: str, payload: bytes, status: str = "done"):
+        """Stores or replaces the result; eviction age restarts from now."""
+        pass
+
+    @abstractmethod
+    def get_result(self, job_id: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    def get_result_range(self, job_id: str, offset: int, length: int) -> Optional[bytes]:
+        """Bytes [offset, offset + length) of the result, without reading the rest; None without a result."""
+        pass
+
+    @abstractmethod
+    def create_scene(self, scene_id: str, payload: bytes, version: int):
+        pass
+
+    @abstractmethod
+    def save_scene(self, scene_id: str, payload: bytes, version: int, expected: int) -> bool:
+        """
+        Replaces a scene record with `version` only while the stored version is
+        still `expected` (compare-and-set). False on a conflict or an unknown scene.
+        """
+        pass
+
+    @abstractmethod
+    def get_scene_version(self, scene_id: str) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    def get_scene(self, scene_id: str) -> Optional[Tuple[int, bytes]]:
+        """(version, record) of a scene, or None."""
+        pass
+
+    @abstractmethod
+    def evict(self):
+        """
+        Drops finished jobs past ttl and unfinished ones (a crashed worker's)
+        past unfinished_ttl, then the oldest results over the count/byte budget;
+        and scenes not saved for scene_ttl.
+        """
+        pass
+
+    def cancel(self, job_id: str):
+        self.update(job_id, status="cancelled", cancelled=True)
+
+
+# ==============================================================================
+# IN-PROCESS
+# ==============================================================================
+class MemoryJobStore(JobStore):
+    def __init__(self, **limits):
+        super().__init__(**limits)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._results: "OrderedDict[str, bytes]" = OrderedDict()  # finish order
+        self._created: Dict[str, float] = {}
+        self._finished: Dict[str, float] = {}
+        self._scenes: Dict[str, Tuple[int, bytes, float]] = {}  # id -> (version, record, saved)
+        self._result_bytes = 0
+
+    def create(self, job_id: str):
+        self._jobs[job_id] = {"status": "queued", "logs": [], "cancelled": False}
+        self._created[job_id] = time.time()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job, logs=list(job["logs"])) if job else None
+
+    def update(self, job_id: str, **fields):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.update(fields)
+        if fields.get("status") in FINISHED and job_id not in self._finished:
+            self._finished[job_id] = time.time()
+
+    def append_log(self, job_id: str, message: str):
+        if job_id in self._jobs:
+            self._jobs[job_id]["logs"].append(message)
+
+    def set_result(self, job_id: str, payload: bytes, status: str = "done"):
+        if job_id not in self._jobs:
+            return
+        self._drop_result(job_id)
+        self._results[job_id] = payload
+        self._result_bytes += len(payload)
+        self._finished[job_id] = time.time()
+        self.update(job_id, status=status)
+
+    def get_result(self, job_id: str) -> Optional[bytes]:
+        return self._results.get(job_id)
+
+    def get_result_range(self, job_id: str, offset: int, length: int) -> Optional[bytes]:
+        payload = self._results.get(job_id)
+        return payload[offset:offset + length] if payload is not None else None
+
+    def create_scene(self, scene_id: str, payload: bytes, version: int):
+        self._scenes[scene_id] = (version, payload, time.time())
+
+    def save_scene(self, scene_id: str, payload: bytes, version: int, expected: int) -> bool:
+        stored = self._scenes.get(scene_id)
+        if stored is None or stored[0] != expected:
+            return False
+        self._scenes[scene_id] = (version, payload, time.time())
+        return True
+
+    def get_scene_version(self, scene_id: str) -> Optional[int]:
+        stored = self._scenes.get(scene_id)
+        return stored[0] if stored is not None else None
+
+    def get_scene(self, scene_id: str) -> Optional[Tuple[int, bytes]]:
+        stored = self._scenes.get(scene_id)
+        return stored[:2] if stored is not None else None
+
+    def _drop_result(self, job_id: str):
+        payload = self._results.pop(job_id, None)
+        if payload is not None:
+            self._result_bytes -= len(payload)
+
+    def _drop(self, job_id: str):
+        self._jobs.pop(job_id, None)
+        self._created.pop(job_id, None)
+        self._finished.pop(job_id, None)
+        self._drop_result(job_id)
+
+    def evict(self):
+        now = time.time()
+        cutoff, unfinished_cutoff = now - self.ttl, now - self.unfinished_ttl
+        for job_id, created in list(self._created.items()):
+            finished = self._finished.get(job_id)
+            if (finished < cutoff) if finished is not None else (created < unfinished_cutoff):
+                self._drop(job_id)
+        while self._results and (len(self._results) > self.max_results or self._result_bytes > self.max_result_bytes):
+            self._drop(next(iter(self._results)))
+        scene_cutoff = now - self.scene_ttl
+        for scene_id, (_, _, saved) in list(self._scenes.items()):
+            if saved < scene_cutoff:
+                del self._scenes[scene_id]
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+# ==============================================================================
+# SQLITE (shared between workers)
+# ==============================================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    status    TEXT NOT NULL,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    extra     BLOB NOT NULL DEFAULT '{}',
+    created   REAL NOT NULL,
+    finished  REAL,
+    result    BLOB,
+    size      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished) WHERE finished IS NOT NULL;
+CREATE INDEX IF NOT EXISTS jobs_unfinished ON jobs (created) WHERE finished IS NULL;
+CREATE TABLE IF NOT EXISTS job_logs (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id  TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_logs_job ON job_logs (job_id, seq);
+CREATE TABLE IF NOT EXISTS scenes (
+    id      TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    record  BLOB NOT NULL,
+    saved   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenes_saved ON scenes (saved);
+"""
+
+_COLUMNS = ("status", "cancelled")
+
+
+class SQLiteJobStore(JobStore):
+    """
+    One connection per process (opened lazily, so it is never inherited across a
+    gunicorn fork), serialized by a lock for callers on worker threads.
+    """
+
+    def __init__(self, path: str, **limits):
+        super().__init__(**limits)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None or self._pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._db, self._pid = db, os.getpid()
+        return self._db
+
+    def create(self, job_id: str):
+        with self._lock:
+            self._conn().execute(
+                "INSERT INTO jobs (id, status, created) VALUES (?, 'queued', ?)", (job_id, time.time())
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT status, cancelled, extra FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            logs = [m for (m,) in db.execute("SELECT message FROM job_logs WHERE job_id = ? ORDER BY seq", (job_id,))]
+        status, cancelled, extra = row
+        return {**orjson.loads(extra), "status": status, "cancelled": bool(cancelled), "logs": logs}
+
+    def update(self, job_id: str, **fields):
+        columns = {k: fields.pop(k) for k in _COLUMNS if k in fields}
+        sets: List[str] = [f"{k} = ?" for k in columns]
+        params: List[Any] = list(columns.values())
+        finishing = columns.get("status") in FINISHED
+        if finishing:
+            sets.append("finished = COALESCE(finished, ?)")
+            params.append(time.time())
+        with self._lock:
+            db = self._conn()
+            if fields:
+                # read-modify-write of the extras blob inside one transaction
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    row = db.execute("SELECT extra FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                    if row is not None:
+                        extra = {**orjson.loads(row[0]), **fields}
+                        db.execute(
+                            f"UPDATE jobs SET {', '.join(sets + ['extra = ?'])} WHERE id = ?",
+                            (*params, orjson.dumps(extra), job_id),
+                        )
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+            elif sets:
+                db.execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", (*params, job_id))
+
+    def append_log(self, job_id: str, message: str):
+        with self._lock:
+            self._conn().execute("INSERT INTO job_logs (job_id, message) VALUES (?, ?)", (job_id, message))
+
+    def set_result(self, job_id: str, payload: bytes, status: str = "done"):
+        with self._lock:
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, result = ?, size = ?, finished = ? WHERE id = ?",
+                (status, payload, len(payload), time.time(), job_id),
+            )
+
+    def get_result(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_result_range(self, job_id: str, offset: int, length: int) -> Optional[bytes]:
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT rowid, size FROM jobs WHERE id = ? AND result IS NOT NULL", (job_id,)).fetchone()
+            if row is None:
+                return None
+            rowid, size = row
+            offset = min(offset, size)
+            # incremental blob I/O: only the range is read from the page cache / file
+            with db.blobopen("jobs", "result", rowid, readonly=True) as blob:
+                blob.seek(offset)
+                return blob.read(min(length, size - offset))
+
+    def create_scene(self, scene_id: str, payload: bytes, version: int):
+        with self._lock:
+            self._conn().execute(
+                "INSERT INTO scenes (id, version, record, saved) VALUES (?, ?, ?, ?)",
+                (scene_id, version, payload, time.time()),
+            )
+
+    def save_scene(self, scene_id: str, payload: bytes, version: int, expected: int) -> bool:
+        with self._lock:
+            cursor = self._conn().execute(
+                "UPDATE scenes SET version = ?, record = ?, saved = ? WHERE id = ? AND version = ?",
+                (version, payload, time.time(), scene_id, expected),
+            )
+        return cursor.rowcount == 1
+
+    def get_scene_version(self, scene_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn().execute("SELECT version FROM scenes WHERE id = ?", (scene_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_scene(self, scene_id: str) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            row = self._conn().execute("SELECT version, record FROM scenes WHERE id = ?", (scene_id,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def evict(self):
+        now = time.time()
+        cutoff = now - self.ttl
+        with self._lock:
+            db = self._conn()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                stale = [row for row in db.execute(
+                    "SELECT id FROM jobs WHERE finished IS NOT NULL AND finished < ?", (cutoff,)
+                )]
+                stale += db.execute(
+                    "SELECT id FROM jobs WHERE finished IS NULL AND created < ?", (now - self.unfinished_ttl,)
+                ).fetchall()
+                # newest results first; everything past the count or byte budget goes
+                kept, total = 0, 0
+                for job_id, size in db.execute(
+                    "SELECT id, size FROM jobs WHERE finished >= ? AND result IS NOT NULL ORDER BY finished DESC",
+                    (cutoff,),
+                ):
+                    kept += 1
+                    total += size
+                    if kept > self.max_results or total > self.max_result_bytes:
+                        stale.append((job_id,))
+                db.executemany("DELETE FROM jobs WHERE id = ?", stale)
+                db.executemany("DELETE FROM job_logs WHERE job_id = ?", stale)
+                db.execute("DELETE FROM scenes WHERE saved < ?", (now - self.scene_ttl,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+
+def build_job_store(backend: str, path: str, **limits) -> JobStore:
+    if backend == "sqlite":
+        return SQLiteJobStore(path, **limits)
+    if backend == "memory":
+        return MemoryJobStore(**limits)
+    raise ValueError(f"Unknown job store backend: {backend}")
@@ -0,0 +1,270 @@
+# app/core/metrics.py
+"""
+Hot-path instrumentation.
+
+    with metrics.stage("llm"):                 time a block
+    yield from metrics.timed("roads", gen)     time a batch generator (only while it computes)
+    metrics.LLM_TOKENS.inc(n, kind="prompt")   plain counters / histograms
+
+Every stage lands in two places: the cobox_stage_seconds / cobox_stage_actors
+series served as Prometheus text on /metrics, and the current request's
+Server-Timing header (request_timings(), set by the middleware in app.main).
+
+Work running in the compile process pool records into a capture() instead; the
+executor sends the captured stages back with the result and absorb()s them in
+the serving process. Metrics are per worker process.
+
+With METRICS_ENABLED=0 stage() returns a shared no-op context manager and
+timed() passes the generator through untouched.
+"""
+import bisect
+import contextlib
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.settings import settings
+
+ENABLED = settings.METRICS_ENABLED
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{v}"' for k, v in labels)
+        return f"{name}{{{inner}}} {value:g}"
+    return f"{name} {value:g}"
+
+
+# ==============================================================================
+# METRIC TYPES
+# ==============================================================================
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _labels(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [_fmt(self.name, k, v) for k, v in self.values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.values: Dict[Labels, list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with _lock:
+            row = self.values.get(key)
+            if row is None:
+                row = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):  # past the last bound: only in +Inf (= count)
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self) -> List[str]:
+        out = []
+        for key, row in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                out.append(_fmt(f"{self.name}_bucket", key + (("le", f"{bound:g}"),), cumulative))
+            out.append(_fmt(f"{self.name}_bucket", key + (("le", "+Inf"),), row[-1]))
+            out.append(_fmt(f"{self.name}_sum", key, row[-2]))
+            out.append(_fmt(f"{self.name}_count", key, row[-1]))
+        return out
+
+
+class Gauge:
+    """Read at scrape time from `fn` -> {labels dict as tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Dict[Labels, float]]):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []  # a broken collector must not break the scrape
+        return [_fmt(self.name, k, v) for k, v in values.items()]
+
+
+REGISTRY: List = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter(name, help))
+
+
+def histogram(name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, buckets))
+
+
+def gauge(name: str, help: str, fn: Callable[[], Dict[Labels, float]]) -> Gauge:
+    return _register(Gauge(name, help, fn))
+
+
+def render() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = histogram("cobox_stage_seconds", "Time spent per pipeline stage")
+STAGE_ACTORS = counter("cobox_stage_actors_total", "Actors produced per pipeline stage")
+REQUEST_SECONDS = histogram("cobox_request_seconds", "HTTP request latency by route")
+LLM_SECONDS = histogram("cobox_llm_seconds", "LLM completion latency")
+LLM_TOKENS = counter("cobox_llm_tokens_total", "LLM token usage")
+FIRST_ACTOR_SECONDS = histogram("cobox_first_actor_seconds", "Streamed scenes: request start to the first actor")
+
+
+# ==============================================================================
+# STAGES
+# ==============================================================================
+# stage -> [seconds, actors] for the current request (Server-Timing) / pool capture
+_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("cobox_timings", default=None)
+_capture: ContextVar[Optional[Dict[str, list]]] = ContextVar("cobox_capture", default=None)
+
+
+def record(name: str, seconds: float, actors: int = 0):
+    captured = _capture.get()
+    if captured is not None:
+        _add(captured, name, seconds, actors)  # observed later by absorb() in the serving process
+        return
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if actors:
+        STAGE_ACTORS.inc(actors, stage=name)
+    timings = _timings.get()
+    if timings is not None:
+        _add(timings, name, seconds, actors)
+
+
+def _add(into: Dict[str, list], name: str, seconds: float, actors: int):
+    row = into.setdefault(name, [0.0, 0])
+    row[0] += seconds
+    row[1] += actors
+
+
+class _Stage:
+    __slots__ = ("name", "actors", "_start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.actors = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self._start, self.actors)
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+
+def stage(name: str):
+    """Times a block; set `.actors` on the returned object to count output."""
+    return _Stage(name) if ENABLED else _NOOP
+
+
+def timed(name: str, batches: Iterable) -> Iterator:
+    """
+    Re-yields `batches`, timing only the time spent producing them (not the
+    consumer's time between items) and counting their lengths as actors.
+    """
+    if not ENABLED:
+        yield from batches
+        return
+    elapsed, actors = 0.0, 0
+    it = iter(batches)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                batch = next(it)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - start
+            actors += len(batch)
+            yield batch
+    finally:
+        record(name, elapsed, actors)
+
+
+# ------------------------------------------------------------------
+# PROCESS POOL HAND-OFF
+# ------------------------------------------------------------------
+def captured_call(fn: Callable, *args):
+    """Runs fn(*args) recording stages locally; returns (result, stages)."""
+    stages: Dict[str, list] = {}
+    token = _capture.set(stages)
+    try:
+        return fn(*args), stages
+    finally:
+        _capture.reset(token)
+
+
+def absorb(stages: Dict[str, list]):
+    for name, (seconds, actors) in stages.items():
+        record(name, seconds, actors)
+
+
+# ------------------------------------------------------------------
+# REQUEST TIMINGS (Server-Timing)
+# ------------------------------------------------------------------
+def begin_request() -> Dict[str, list]:
+    timings: Dict[str, list] = {}
+    _timings.set(timings)
+    return timings
+
+
+def server_timing(timings: Dict[str, list], total: Optional[float] = None) -> str:
+    parts = []
+    for name, (seconds, actors) in timings.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if actors:
+            entry += f';desc="{actors} actors"'
+        parts.append(entry)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
@@ -13,6 +13,9 @@ If something breaks in the engine, it must be fixed HERE — not in prompts.
 from typing import Dict, List, Tuple
 import itertools
 
+from app.core.actor_batch import ActorBatch
+from app.core.asset_registry import get_asset_by_category
+
 # -------------------------------------------------------------------
 # GLOBAL ENGINE CONSTANTS (DO NOT CHANGE)
 # -------------------------------------------------------------------
@@ -116,17 +119,26 @@ def default_rotation() -> Dict:
 # BUILDING GENERATION LOGIC
 # -------------------------------------------------------------------
 
+def _place(actors: ActorBatch, category: str, position: Dict):
+    actors.append(
+        get_asset_by_category(category),
+        position["x"], position["y"], position["z"],
+        stage="placement"
+    )
+
+
 def generate_building(
     building_index: int,
     base_x: float,
     base_y: float,
     floors: int,
     include_door: bool
-) -> List[Dict]:
+) -> ActorBatch:
     """
     Generates a single building as a deterministic set of actors.
+    Rotation, scale and physics are the engine defaults above for every part.
     """
-    actors = []
+    actors = ActorBatch()
 
     floors = min(floors, MAX_FLOORS_PER_BUILDING)
     base_z = 0.0
@@ -135,13 +147,7 @@ def generate_building(
     for i in range(floors):
         floor_z = base_z + (i * FLOOR_HEIGHT)
 
-        actors.append({
-            "category": "floor",
-            "position": make_position(base_x, base_y, floor_z),
-            "rotation": default_rotation(),
-            "scale": DEFAULT_SCALE,
-            "physics": False
-        })
+        _place(actors, "floor", make_position(base_x, base_y, floor_z))
 
         # ---- WALLS (4 sides) ----
         wall_offsets = [
@@ -152,44 +158,26 @@ def generate_building(
         ]
 
         for ox, oy in wall_offsets:
-            actors.append({
-                "category": "wall",
-                "position": make_position(
-                    base_x + ox,
-                    base_y + oy,
-                    floor_z
-                ),
-                "rotation": default_rotation(),
-                "scale": DEFAULT_SCALE,
-                "physics": False
-            })
+            _place(actors, "wall", make_position(
+                base_x + ox,
+                base_y + oy,
+                floor_z
+            ))
 
     # ---- DOOR (GROUND FLOOR ONLY) ----
     if include_door:
-        actors.append({
-            "category": "door",
-            "position": make_position(
-                base_x + GRID_SIZE,
-                base_y,
-                base_z
-            ),
-            "rotation": default_rotation(),
-            "scale": DEFAULT_SCALE,
-            "physics": False
-        })
+        _place(actors, "door", make_position(
+            base_x + GRID_SIZE,
+            base_y,
+            base_z
+        ))
 
     # ---- CEILING ----
-    actors.append({
-        "category": "ceiling",
-        "position": make_position(
-            base_x,
-            base_y,
-            base_z + (floors * FLOOR_HEIGHT)
-        ),
-        "rotation": default_rotation(),
-        "scale": DEFAULT_SCALE,
-        "physics": False
-    })
+    _place(actors, "ceiling", make_position(
+        base_x,
+        base_y,
+        base_z + (floors * FLOOR_HEIGHT)
+    ))
 
     return actors
 
@@ -219,7 +207,7 @@ def generate_city_layout(building_count: int) -> List[Tuple[float, float]]:
 # SCENE VALIDATION
 # -------------------------------------------------------------------
 
-def validate_actor_count(actors: List[Dict]):
+def validate_actor_count(actors: ActorBatch):
     if len(actors) > MAX_ACTORS:
         raise ValueError(
             f"Scene too large: {len(actors)} actors (max {MAX_ACTORS})"
@@ -243,7 +231,7 @@ def build_city_scene(intent: Dict) -> Dict:
 
     city_coords = generate_city_layout(building_count)
 
-    actors: List[Dict] = []
+    actors = ActorBatch()
 
     for idx, (x, y) in enumerate(city_coords):
         actors.extend(
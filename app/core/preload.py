@@ -0,0 +1,46 @@
+# app/core/preload.py
+"""
+Fork-friendly startup (gunicorn preload_app, see gunicorn.conf.py).
+
+preload() runs once in the master after the app is imported: it builds every
+immutable table a request touches (asset catalog, road tables and planner
+candidate lists, pre-encoded actor templates, the heavy SDK imports) and then
+freezes the GC so those objects sit in the permanent generation. Forked
+workers share the pages copy-on-write; collections in a worker no longer
+touch (and so copy) them.
+
+Nothing with a socket, thread, process or event loop is created before the
+fork. The OpenAI HTTP client, the executor's queue and process pool, the
+SQLite connection and the export directory are all created lazily in each
+worker. after_fork() only resets per-process state inherited from the master.
+"""
+import gc
+import random
+import time
+
+from app.settings import settings
+
+
+def preload() -> float:
+    """Warms shared immutable state; returns the seconds it took."""
+    start = time.perf_counter()
+    import app.main  # noqa: F401  (already imported under preload_app)
+    from app.core import scene_compiler, scene_encoder
+    from app.core.asset_registry import get_production_assets
+
+    get_production_assets()
+    for key, data in scene_compiler.ROAD_DB.items():
+        scene_compiler.ROAD_PLANNER.candidates(key)
+        scene_compiler._track_asset(data["id"])
+    scene_encoder._heads()
+    if settings.LLM_BACKEND == "openai":
+        import openai  # noqa: F401  (module objects shared instead of imported per worker)
+
+    gc.collect()
+    gc.freeze()
+    return time.perf_counter() - start
+
+
+def after_fork():
+    """Per-worker reset of state copied from the master."""
+    random.seed()  # workers must not replay the master's random stream
@@ -0,0 +1,275 @@
+# app/core/road_planner.py
+"""
+Road planner: repairs a requested road_sequence so the track does not run
+through itself or through buildings.
+
+Every candidate piece's footprint (the grid cells along its centre line) is
+checked against a spatial hash of the track placed so far and a `blocked`
+test for static obstacles (building occupancy). Track may cross itself only
+with CLEARANCE of height between the two passes. When the requested piece
+collides, alternatives are tried from an index of pieces by connector type
+and tag: same kind of piece first, then turns to steer away. At a dead end
+the planner backtracks over at most `max_backtrack` pieces within a budget of
+`max_nodes` candidate checks, and all dead ends of one plan share a budget of
+`max_search` checks plus `search_per_piece` for every piece reached so far;
+past either the requested piece is kept and counted as unresolved. A plan
+therefore costs O(pieces * (candidates + search_per_piece) + max_search)
+checks of O(piece length) each, so 1,000+ piece tracks plan interactively even
+when they box themselves in.
+"""
+import math
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.road_logic import tags_of
+
+Cell = Tuple[int, int]
+Footprint = List[Tuple[Cell, float]]  # (cell, track height)
+
+STATIC = -1  # owner of cells that always collide
+
+
+class SpatialHash:
+    """Grid cell -> [(owner piece index, z)] for placed track."""
+
+    def __init__(self):
+        self.cells: Dict[Cell, List[Tuple[int, float]]] = {}
+
+    def add(self, footprint: Footprint, owner: int):
+        for cell, z in footprint:
+            self.cells.setdefault(cell, []).append((owner, z))
+
+    def remove(self, footprint: Footprint, owner: int):
+        for cell, z in footprint:
+            entries = self.cells.get(cell)
+            if entries is None:
+                continue
+            entries.remove((owner, z))
+            if not entries:
+                del self.cells[cell]
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+
+class RoadPlan:
+    __slots__ = ("keys", "footprints", "substituted", "unresolved", "nodes")
+
+    def __init__(self, keys, footprints, substituted, unresolved, nodes):
+        self.keys: List[str] = keys              # piece keys to place, one per requested intent
+        self.footprints: List[Footprint] = footprints
+        self.substituted = substituted           # pieces replaced by an alternative
+        self.unresolved = unresolved             # placed pieces that still collide
+        self.nodes = nodes                       # candidate checks performed
+
+    def __repr__(self) -> str:
+        return f"RoadPlan({len(self.keys)} pieces, {self.substituted} substituted, {self.unresolved} unresolved)"
+
+
+class RoadPlanner:
+    def __init__(
+        self,
+        road_db: dict,
+        geometry: Callable,
+        grid_unit: float,
+        clearance: float = 400.0,
+        max_backtrack: int = 8,
+        max_nodes: int = 256,
+        max_search: int = 2048,
+        search_per_piece: int = 8,
+        default_key: str = "straight",
+    ):
+        self.road_db = road_db
+        self.geometry = geometry      # (key, cursor) -> ([(asset id, x, y, z, yaw)], cursor after)
+        self.grid_unit = grid_unit
+        self.clearance = clearance
+        self.max_backtrack = max_backtrack
+        self.max_nodes = max_nodes
+        self.max_search = max_search
+        self.search_per_piece = search_per_piece
+        self.default_key = default_key
+        self._length = {data["id"]: data["len"] for data in road_db.values()}
+
+        # (connector type, tag) -> keys, in ROAD_DB order
+        self.index: Dict[Tuple[int, str], List[str]] = {}
+        for key, data in road_db.items():
+            for tag in tags_of(data["id"]):
+                self.index.setdefault((data["type"], tag), []).append(key)
+
+        steer = [k for k in self.index.get((self._type(default_key), "turn"), []) if road_db[k]["curve"]]
+        self._steer = sorted(steer, key=lambda k: road_db[k]["curve"])  # gentlest turn first
+        self._candidates: Dict[str, Tuple[str, ...]] = {}
+
+    def _type(self, key: str) -> int:
+        return self.road_db[key]["type"]
+
+    def candidates(self, key: str) -> Tuple[str, ...]:
+        """Requested piece first, then the same kind of piece, then steering turns."""
+        key = key if key in self.road_db else self.default_key
+        found = self._candidates.get(key)
+        if found is None:
+            data = self.road_db[key]
+            tags = tags_of(data["id"])
+            same_kind = self.index.get((data["type"], tags[0]), []) if tags else []
+            found = tuple(dict.fromkeys([key, *same_kind, *self._steer]))
+            self._candidates[key] = found
+        return found
+
+    # ------------------------------------------------------------------
+    # FOOTPRINTS
+    # ------------------------------------------------------------------
+    def footprint(self, placements) -> Footprint:
+        """Cells under each placed piece's centre line, sampled every half cell."""
+        step = self.grid_unit / 2
+        unit = self.grid_unit
+        seen: Set[Cell] = set()
+        out: Footprint = []
+        for asset_id, x, y, z, yaw in placements:
+            rad = math.radians(yaw)
+            dx, dy = math.cos(rad), math.sin(rad)
+            for k in range(max(1, math.ceil(self._length[asset_id] / step))):
+                t = (k + 0.5) * step
+                cell = (math.floor((x + dx * t) / unit + 0.5), math.floor((y + dy * t) / unit + 0.5))
+                if cell not in seen:
+                    seen.add(cell)
+                    out.append((cell, z))
+        return out
+
+    def _collides(self, track: SpatialHash, blocked, footprint: Footprint, owner: int, closes: bool) -> bool:
+        # the previous piece shares our start cell; a piece closing the circuit shares piece 0's
+        first = 1 if closes else 0
+        cells = track.cells
+        for cell, z in footprint:
+            if blocked is not None and blocked(*cell):
+                return True
+            for other, z2 in cells.get(cell, ()):
+                if other == STATIC or (first <= other < owner - 1 and abs(z - z2) < self.clearance):
+                    return True
+        return False
+
+    def _closes(self, after: tuple, start: tuple) -> bool:
+        """True when a piece ends back at the track's start (a closed circuit)."""
+        return (
+            math.hypot(after[0] - start[0], after[1] - start[1]) < self.grid_unit / 2
+            and abs(after[2] - start[2]) < self.clearance
+        )
+
+    # ------------------------------------------------------------------
+    # SEARCH
+    # ------------------------------------------------------------------
+    def session(self, cursor: tuple, blocked=None, track=None, first_owner: int = 0, start=None) -> "PlanSession":
+        """An incremental plan() (see PlanSession)."""
+        return PlanSession(self, cursor, blocked, track, first_owner, start)
+
+    def plan(
+        self,
+        intents: List[str],
+        cursor: tuple,
+        blocked: Optional[Callable[[int, int], bool]] = None,
+        track: Optional[SpatialHash] = None,
+        first_owner: int = 0,
+        start: Optional[tuple] = None,
+    ) -> RoadPlan:
+        """
+        Repairs `intents` starting at `cursor`. `track` holds already-placed
+        pieces (owners below first_owner) and receives the planned ones;
+        `start` is where piece 0 began (defaults to `cursor`).
+        """
+        session = self.session(cursor, blocked, track, first_owner, start)
+        session.extend(intents)
+        return session.finish()
+
+
+class PlanSession:
+    """
+    RoadPlanner.plan() fed a few intents at a time (streamed blueprints).
+
+    The search only ever looks back, so planning what has arrived so far and
+    resuming when more comes gives exactly plan()'s result. Pieces below
+    `final` are settled: no later backtrack can reach them.
+    """
+
+    def __init__(self, planner: RoadPlanner, cursor: tuple, blocked=None, track=None, first_owner=0, start=None):
+        self.planner = planner
+        self.blocked = blocked
+        self.track = track if track is not None else SpatialHash()
+        self.first_owner = first_owner
+        self.start = start if start is not None else cursor
+        self.options: List[Tuple[str, ...]] = []
+        self.keys: List[Optional[str]] = []
+        self.footprints: List[Footprint] = []
+        self.cursors = [cursor]
+        self.tried: List[int] = []
+        self.collided: List[bool] = []  # placed piece kept despite a collision
+        self.i = 0
+        self.dead, self.floor, self.checks, self.budget_start = -1, 0, 0, 0
+        self.searched = 0  # checks spent in finished dead ends (max_search)
+
+    @property
+    def final(self) -> int:
+        """Pieces [0, final) will not change any more."""
+        if self.dead >= 0:
+            return self.floor
+        return max(0, self.i - self.planner.max_backtrack)
+
+    def extend(self, intents: List[str]) -> int:
+        """Appends intents, plans as far as they go; returns `final`."""
+        for key in intents:
+            self.options.append(self.planner.candidates(key))
+            self.keys.append(None)
+            self.footprints.append([])
+            self.cursors.append(None)
+            self.tried.append(0)
+            self.collided.append(False)
+        self._run()
+        return self.final
+
+    def finish(self) -> RoadPlan:
+        keys = self.keys
+        substituted = sum(k != o[0] for k, o in zip(keys, self.options))
+        return RoadPlan(keys, self.footprints, substituted, sum(self.collided), self.checks)
+
+    def _run(self):
+        p = self.planner
+        track, blocked, start = self.track, self.blocked, self.start
+        options, keys, footprints, cursors, tried = self.options, self.keys, self.footprints, self.cursors, self.tried
+        collided = self.collided
+        n = len(options)
+
+        i = self.i
+        while i < n:
+            owner = self.first_owner + i
+            chosen, collided[i] = None, False
+            while tried[i] < len(options[i]):
+                key = options[i][tried[i]]
+                tried[i] += 1
+                self.checks += 1
+                placements, after = p.geometry(key, cursors[i])
+                fp = p.footprint(placements)
+                if not p._collides(track, blocked, fp, owner, p._closes(after, start)):
+                    chosen = key
+                    break
+
+            if chosen is None:
+                if self.dead < 0:
+                    self.dead, self.floor, self.budget_start = i, max(0, i - p.max_backtrack), self.checks
+                spent = self.checks - self.budget_start
+                if i > self.floor and spent < p.max_nodes and self.searched + spent < p.max_search + p.search_per_piece * i:
+                    # undo the previous piece and try its next alternative
+                    i -= 1
+                    track.remove(footprints[i], self.first_owner + i)
+                    continue
+                # budget spent: keep the requested piece
+                chosen = options[i][0]
+                placements, after = p.geometry(chosen, cursors[i])
+                fp = p.footprint(placements)
+                collided[i] = p._collides(track, blocked, fp, owner, p._closes(after, start))
+
+            keys[i], footprints[i], cursors[i + 1] = chosen, fp, after
+            track.add(fp, owner)
+            i += 1
+            if i < n:
+                tried[i] = 0
+            if self.dead >= 0 and i > self.dead:
+                self.searched += self.checks - self.budget_start
+                self.dead = -1
+        self.i = i
@@ -0,0 +1,266 @@
+# app/core/scene_binary.py
+"""
+Compact binary scene format (.cbx) for archiving and offline reprocessing.
+
+Layout (little endian):
+
+    header   "<4sHHQQQQQQ"  magic b"CBXS", version, reserved, actor count,
+                            table offset/length, meta offset/length, records offset
+    table    JSON list of [AssetClass, AssetClassPath, OcaData] (the string table)
+    meta     JSON object: the scene document minus PlaceableAssets
+    records  fixed 80-byte rows, 8-byte aligned:
+             asset u4 (table index), stage u1, 3 pad,
+             X Y Z, Pitch Yaw Roll, ScaleX ScaleY ScaleZ as f8
+
+Every value of the JSON layout is kept, so JSON -> cbx -> JSON is lossless.
+Readers memory-map the file and slice records without parsing the rest, or
+(BinaryScene.head) read the header and then only the record ranges asked for.
+"""
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Union
+
+import numpy as np
+import orjson
+
+from app.core.actor_batch import ASSET_TABLE, ActorBatch, STAGES, _STAGE_INDEX
+
+MAGIC = b"CBXS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQQQQQ")
+
+RECORD_DTYPE = np.dtype([
+    ("asset", "<u4"), ("stage", "u1"), ("_pad", "V3"),
+    ("x", "<f8"), ("y", "<f8"), ("z", "<f8"),
+    ("pitch", "<f8"), ("yaw", "<f8"), ("roll", "<f8"),
+    ("sx", "<f8"), ("sy", "<f8"), ("sz", "<f8"),
+])
+assert RECORD_DTYPE.itemsize == 80
+
+DEFAULT_OCA = {"CollisionProfile": "BlockAllDynamic", "Physics": False, "Shadow": True}
+_UNKNOWN_STAGE = len(STAGES)  # dict actors carry no stage
+
+
+def _align(n: int, to: int = 8) -> int:
+    return (n + to - 1) // to * to
+
+
+# ==============================================================================
+# WRITER
+# ==============================================================================
+def _records_from_batch(batch: ActorBatch, table: List[list]) -> np.ndarray:
+    cols = batch.columns()
+    used = np.unique(cols["asset"])
+    remap = np.zeros(int(used.max()) + 1 if len(used) else 1, dtype=np.uint32)
+    for idx in used.tolist():
+        asset = ASSET_TABLE[idx]
+        remap[idx] = len(table)
+        table.append([asset["class"], asset["path"], DEFAULT_OCA])
+
+    rec = np.zeros(len(batch), dtype=RECORD_DTYPE)
+    rec["asset"] = remap[cols["asset"]]
+    rec["stage"] = cols["stage"]
+    for name in ("x", "y", "z", "yaw"):
+        rec[name] = cols[name]
+    rec["sx"] = rec["sy"] = rec["sz"] = 1.0
+    return rec
+
+
+def _records_from_actors(actors: List[dict], table: List[list]) -> np.ndarray:
+    index = {}
+    rec = np.zeros(len(actors), dtype=RECORD_DTYPE)
+    for i, a in enumerate(actors):
+        oca = a.get("OcaData", DEFAULT_OCA)
+        key = (a["AssetClass"], a["AssetClassPath"], orjson.dumps(oca, option=orjson.OPT_SORT_KEYS))
+        slot = index.get(key)
+        if slot is None:
+            slot = index[key] = len(table)
+            table.append([a["AssetClass"], a["AssetClassPath"], oca])
+        t = a["Transform"]
+        loc, rot, scale = t["Location"], t["Rotation"], t["Scale"]
+        rec[i] = (
+            slot, _UNKNOWN_STAGE, b"\0\0\0",
+            loc["X"], loc["Y"], loc["Z"],
+            rot["Pitch"], rot["Yaw"], rot["Roll"],
+            scale["X"], scale["Y"], scale["Z"],
+        )
+    return rec
+
+
+def encode_binary(scene: dict) -> bytes:
+    """Scene document (PlaceableAssets as ActorBatch or dicts) -> cbx bytes."""
+    actors = scene.get("PlaceableAssets", [])
+    table: List[list] = []
+    if isinstance(actors, ActorBatch):
+        records = _records_from_batch(actors, table)
+    else:
+        records = _records_from_actors(list(actors), table)
+
+    table_bytes = orjson.dumps(table)
+    meta_bytes = orjson.dumps({k: v for k, v in scene.items() if k != "PlaceableAssets"})
+    table_off = HEADER.size
+    meta_off = table_off + len(table_bytes)
+    records_off = _align(meta_off + len(meta_bytes))
+
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, len(records),
+        table_off, len(table_bytes), meta_off, len(meta_bytes), records_off,
+    )
+    padding = b"\0" * (records_off - meta_off - len(meta_bytes))
+    return b"".join((header, table_bytes, meta_bytes, padding, records.tobytes()))
+
+
+def write_binary(scene: dict, path: Union[str, Path]) -> str:
+    Path(path).write_bytes(encode_binary(scene))
+    return str(path)
+
+
+# ==============================================================================
+# READER
+# ==============================================================================
+def _unpack_header(buffer) -> tuple:
+    """(count, table_off, table_len, meta_off, meta_len, records_off)"""
+    magic, version, _, *fields = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a cbx scene file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported cbx version {version}")
+    return tuple(fields)
+
+
+class BinaryScene:
+    """
+    Zero-parse view of a cbx buffer. Records are a NumPy structured array over
+    the buffer (or the memory-mapped file); actors are decoded only when asked.
+    """
+
+    def __init__(self, buffer, _mmap=None):
+        self._mmap = _mmap
+        self._read = None
+        count, table_off, table_len, meta_off, meta_len, records_off = _unpack_header(buffer)
+        view = memoryview(buffer)
+        self.table = orjson.loads(view[table_off:table_off + table_len])
+        self.meta = orjson.loads(view[meta_off:meta_off + meta_len])
+        self.records = np.frombuffer(buffer, dtype=RECORD_DTYPE, count=count, offset=records_off)
+        self._count, self._records_off = count, records_off
+
+    @classmethod
+    def head(cls, read: Callable[[int, int], Optional[bytes]]) -> Optional["BinaryScene"]:
+        """
+        View that reads through `read(offset, length)` (a stored blob): the header,
+        table and meta now, records only as ranges are asked for. None when
+        `read` finds nothing.
+        """
+        header = read(0, HEADER.size)
+        if header is None:
+            return None
+        count, table_off, table_len, meta_off, meta_len, records_off = _unpack_header(header)
+        front = read(table_off, meta_off + meta_len - table_off)  # table and meta are adjacent
+        if front is None:
+            return None
+        self = cls.__new__(cls)
+        self._mmap, self._read, self.records = None, read, None
+        self.table = orjson.loads(front[:table_len])
+        self.meta = orjson.loads(front[meta_off - table_off:])
+        self._count, self._records_off = count, records_off
+        return self
+
+    def _rows(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Records [start:stop)."""
+        if self._read is None:
+            return self.records[start:stop]
+        start, stop, _ = slice(start, stop).indices(self._count)
+        stop = max(start, stop)
+        size = RECORD_DTYPE.itemsize
+        data = self._read(self._records_off + start * size, (stop - start) * size)
+        if data is None or len(data) != (stop - start) * size:
+            raise LookupError("Stored scene was removed while it was being read")
+        return np.frombuffer(data, dtype=RECORD_DTYPE)
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "BinaryScene":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mm, _mmap=mm)
+
+    def close(self):
+        self.records = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, key) -> List[dict]:
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                start, stop, _ = key.indices(self._count)
+                return self._actors(self._rows(start, stop)[::key.step])
+            return self._actors(self._rows(key.start or 0, key.stop))
+        return self._actors(self._rows(key, key + 1 or None))[0]
+
+    def __iter__(self) -> Iterator[dict]:
+        for start in range(0, len(self), 4096):
+            yield from self._actors(self._rows(start, start + 4096))
+
+    def _actors(self, rec: np.ndarray) -> List[dict]:
+        table = self.table
+        out = []
+        for asset, _, _, x, y, z, pitch, yaw, roll, sx, sy, sz in rec.tolist():
+            cls, path, oca = table[asset]
+            out.append({
+                "AssetClass": cls,
+                "AssetClassPath": path,
+                "Transform": {
+                    "Location": {"X": x, "Y": y, "Z": z},
+                    "Rotation": {"Pitch": pitch, "Yaw": yaw, "Roll": roll},
+                    "Scale": {"X": sx, "Y": sy, "Z": sz}
+                },
+                "OcaData": dict(oca)
+            })
+        return out
+
+    def batch(self, start: int = 0, stop: int = None) -> ActorBatch:
+        """
+        Records [start:stop) as an ActorBatch (vectorized). Pitch/roll/scale/OcaData
+        are not kept by ActorBatch; use slicing for the full transform.
+        """
+        rec = self._rows(start, stop)
+        assets = np.array([ASSET_TABLE.index({"class": c, "path": p}) for c, p, _ in self.table] or [0], dtype=np.uint32)
+        stages = rec["stage"].copy()
+        stages[stages == _UNKNOWN_STAGE] = _STAGE_INDEX["placement"]
+        batch = ActorBatch()
+        batch.extend_columns(assets[rec["asset"]], rec["x"], rec["y"], rec["z"], rec["yaw"], stage="placement")
+        batch.stage = array("B", stages.tobytes())
+        return batch
+
+    def to_scene(self) -> dict:
+        """The full JSON scene document."""
+        return {"PlaceableAssets": list(self), **self.meta}
+
+
+def open_binary(path: Union[str, Path]) -> BinaryScene:
+    return BinaryScene.open(path)
+
+
+# ==============================================================================
+# CONVERSION
+# ==============================================================================
+def json_to_binary(src: Union[str, Path], dst: Union[str, Path]) -> str:
+    return write_binary(orjson.loads(Path(src).read_bytes()), dst)
+
+
+def binary_to_json(src: Union[str, Path], dst: Union[str, Path], indent: bool = True) -> str:
+    with open_binary(src) as scene:
+        doc = scene.to_scene()
+    Path(dst).write_bytes(orjson.dumps(doc, option=orjson.OPT_INDENT_2 if indent else 0))
+    return str(dst)
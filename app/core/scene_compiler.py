@@ -1,43 +1,31 @@
 # app/core/scene_compiler.py
-import random
+import functools
 import math
+import secrets
+
+import numpy as np
+
+from app.core import metrics
+from app.core.actor_batch import ActorBatch
+from app.core.asset_catalog import CATALOG, PIN, SOLID
+from app.core.occupancy import LotAllocator, OccupancyGrid
+from app.core.road_planner import RoadPlanner
 
 # ==============================================================================
 # 1. ASSET DATABASE (Strict "Pin" vs "Solid" Definitions)
 # ==============================================================================
-TYPE_SOLID = 0
-TYPE_PIN = 1
-
-ROAD_DB = {
-    # --- SOLID GROUP (Connects to Solid) ---
-    "straight":         {"id": "BP_RaceTrack_Wb_02", "type": TYPE_SOLID, "len": 900, "curve": 0, "z": 0},
-    "straight_bump":    {"id": "BP_RaceTrack_Wb_03", "type": TYPE_SOLID, "len": 900, "curve": 0, "z": 0},
-    "turn_90":          {"id": "BP_RaceTrack_Wb_04", "type": TYPE_SOLID, "len": 900, "curve": 90, "z": 0},
-    "turn_slight":      {"id": "BP_RaceTrack_Wb_12", "type": TYPE_SOLID, "len": 900, "curve": 15, "z": 0},
-    "ramp_gentle":      {"id": "BP_RaceTrack_Wb_08", "type": TYPE_SOLID, "len": 900, "curve": 0, "z": 200},
-    "ramp_steep":       {"id": "BP_RaceTrack_Wb_09", "type": TYPE_SOLID, "len": 900, "curve": 0, "z": 400},
-    "bridge_start":     {"id": "BP_RaceTrack_Wb_10", "type": TYPE_SOLID, "len": 1200, "curve": 0, "z": 100},
-    "bridge_segment":   {"id": "BP_RaceTrack_Wb_25", "type": TYPE_SOLID, "len": 1200, "curve": 0, "z": 0},
-    "loop_360":         {"id": "BP_RaceTrack_Wb_20", "type": TYPE_SOLID, "len": 2000, "curve": 0, "z": 800},
-    "u_turn":           {"id": "BP_RaceTrack_Wb_18", "type": TYPE_SOLID, "len": 900, "curve": 180, "z": 0},
-    "mercedes":         {"id": "BP_RaceTrack_Wb_23", "type": TYPE_SOLID, "len": 1200, "curve": 0, "z": 0},
-    "splitter":         {"id": "BP_RaceTrack_Wb_22", "type": TYPE_SOLID, "len": 1200, "curve": 0, "z": 0},
-    "return_loop":      {"id": "BP_RaceTrack_Wb_24", "type": TYPE_SOLID, "len": 900, "curve": 180, "z": 0},
-    
-    # --- PIN GROUP (Connects to Pin) ---
-    "pin_t_junction":   {"id": "BP_RaceTrack_Wb_14", "type": TYPE_PIN, "len": 900, "curve": 90, "z": 0}, 
-    
-    # --- ADAPTER (The Magic Piece) ---
-    # Asset 11 connects Solid to Pin (or Pin to Solid).
-    "adapter_pin":      {"id": "BP_RaceTrack_Wb_11", "type": TYPE_PIN, "len": 600, "curve": 0, "z": 0}, 
-}
-
-BUILDING_DB = {
-    "floor": [{"class": f"BP_FloorAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Floor/BP_FloorAsset_Wb_{str(i).zfill(2)}.BP_FloorAsset_Wb_{str(i).zfill(2)}_C"} for i in range(1, 12)],
-    "wall": [{"class": f"BP_WallAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Wall/BP_WallAsset_Wb_{str(i).zfill(2)}.BP_WallAsset_Wb_{str(i).zfill(2)}_C"} for i in range(1, 13)],
-    "ceiling": [{"class": "BP_CeilingAsset_Wb_01_C", "path": "/WorldBuilder/Core/Actors/Placeable/Library/Ceiling/BP_CeilingAsset_Wb_01.BP_CeilingAsset_Wb_01_C"}],
-    "decor": [{"class": f"BP_DecorAsset_Wb_{str(i).zfill(2)}_C", "path": f"/WorldBuilder/Core/Actors/Placeable/Library/Decors/BP_DecorAsset_Wb_{str(i).zfill(2)}.BP_DecorAsset_Wb_{str(i).zfill(2)}_C"} for i in range(1, 34)]
-}
+TYPE_SOLID = SOLID
+TYPE_PIN = PIN
+
+# Road keys (the LLM vocabulary) -> piece geometry; "adapter_pin" (Asset 11)
+# connects Solid to Pin (or Pin to Solid). Defined in asset_catalog.ROAD_KEYS.
+def _road_entry(name: str) -> dict:
+    t = CATALOG.track(name)
+    return {"id": t["id"], "type": t["connector"], "len": t["len"], "curve": t["curve"], "z": t["z"]}
+
+ROAD_DB = {key: _road_entry(name) for key, name in CATALOG.road_keys.items()}
+
+BUILDING_DB = {category: CATALOG.category(category) for category in ("floor", "wall", "ceiling", "decor")}
 
 # ==============================================================================
 # 2. CORE COMPILER
@@ -46,155 +34,253 @@ GRID_UNIT = 600.0
 WALL_OFFSET = 300.0
 FLOOR_HEIGHT = 400.0
 
-def _actor(asset_id, x, y, z, yaw=0.0):
-    """Generates valid JSON for an actor."""
-    # Auto-resolve path based on ID logic
-    if "BP_RaceTrack" in asset_id:
-        c_path = f"/WorldBuilder/Core/Actors/Placeable/Library/Tracks/{asset_id}.{asset_id}_C"
-    else:
-        # Fallback for manual building assets passed as dicts
-        return None 
+BUILDING_RADIUS = 2        # cells reserved around a building lot
+ROAD_RADIUS = 2            # cells reserved around each road piece
 
-    return {
-        "AssetClass": f"{asset_id}_C",
-        "AssetClassPath": c_path,
-        "Transform": {
-            "Location": {"X": float(x), "Y": float(y), "Z": float(z)},
-            "Rotation": {"Pitch": 0.0, "Yaw": float(yaw), "Roll": 0.0},
-            "Scale": {"X": 1.0, "Y": 1.0, "Z": 1.0}
-        },
-        "OcaData": {"CollisionProfile": "BlockAllDynamic", "Physics": False, "Shadow": True}
-    }
+FOREST_EXTENT = 40         # forest covers [-extent, extent) grid cells on both axes
+MAX_FOREST_EXTENT = 400
+TREE_JITTER = 200.0
 
-def _building_actor(asset_data, x, y, z, yaw=0.0):
-    """Specific helper for building parts which have complex paths."""
-    return {
-        "AssetClass": asset_data["class"],
-        "AssetClassPath": asset_data["path"],
-        "Transform": {
-            "Location": {"X": float(x), "Y": float(y), "Z": float(z)},
-            "Rotation": {"Pitch": 0.0, "Yaw": float(yaw), "Roll": 0.0},
-            "Scale": {"X": 1.0, "Y": 1.0, "Z": 1.0}
-        },
-        "OcaData": {"CollisionProfile": "BlockAllDynamic", "Physics": False, "Shadow": True}
-    }
+BUILDING_CHUNK = 64        # buildings per emitted batch
+ROAD_CHUNK = 256           # road pieces per emitted batch
+FOREST_CHUNK = 4096        # trees per emitted batch
+
+DEFAULT_ROAD = ["straight", "straight", "turn_90"]
+
+@functools.lru_cache(maxsize=None)
+def _track_asset(asset_id):
+    """Asset entry ({"class", "path"}) for a race track piece id."""
+    return CATALOG.entries[CATALOG.track(asset_id)["index"]]
+
+# Catalog record i is AssetTable index i
+_DECOR_INDEX = np.array(CATALOG.categories["decor"], dtype=np.uint32)
+
+def _forest_draw(density, extent, rng):
+    """
+    Every tree the seed puts in the extent, before occupancy is applied:
+    (cell x, cell y, ActorBatch) with one row per tree, row-major by cell.
+    """
+    side = 2 * extent
+    keep = rng.random((side, side)) < density
+
+    fx, fy = np.nonzero(keep)
+    count = len(fx)
+    jitter = rng.uniform(-TREE_JITTER, TREE_JITTER, (2, count))
+    yaw = rng.uniform(0.0, 360.0, count)
+    choice = rng.integers(0, len(BUILDING_DB["decor"]), count)
+
+    gx, gy = fx - extent, fy - extent
+    batch = ActorBatch()
+    batch.extend_columns(
+        _DECOR_INDEX[choice],
+        gx * GRID_UNIT + jitter[0],
+        gy * GRID_UNIT + jitter[1],
+        0.0,
+        yaw,
+        stage="forest",
+    )
+    return gx, gy, batch
+
+def _forest_batch(grid, density, extent, rng) -> ActorBatch:
+    """
+    Batched forest: one vectorized draw per attribute over the whole extent.
+    Tree selection is drawn for every cell before the occupancy mask is applied,
+    so a given seed always puts the same tree in the same free cell.
+    """
+    gx, gy, trees = _forest_draw(density, extent, rng)
+    occupied = grid.window(-extent, -extent, extent, extent)
+    return trees.filter(~occupied[gx + extent, gy + extent])
+
+def _building_batch(batch: ActorBatch, floors: int, lot_x: int, lot_y: int):
+    """Appends one building (walls and floor per storey, then the ceiling) on a lot."""
+    bx, by = lot_x * GRID_UNIT, lot_y * GRID_UNIT
+    for f in range(floors):
+        z = f * FLOOR_HEIGHT
+        batch.append(BUILDING_DB["floor"][4], bx, by, z, 0.0)
+        batch.append(BUILDING_DB["wall"][1], bx+300, by, z, 90.0)
+        batch.append(BUILDING_DB["wall"][1], bx-300, by, z, 270.0)
+        batch.append(BUILDING_DB["wall"][1], bx, by+300, z, 0.0)
+        batch.append(BUILDING_DB["wall"][1], bx, by-300, z, 180.0)
 
-def compile_scene(blueprint: dict) -> dict:
-    placeables = []
+    batch.append(BUILDING_DB["ceiling"][0], bx, by, floors * FLOOR_HEIGHT, 0.0)
+
+def road_start(lots) -> tuple:
+    """Initial road cursor (x, y, z, yaw, connector type): 6 cells past the last building column."""
+    cursor_x = max([0] + [lot_x for lot_x, _ in lots])
+    return (cursor_x + 6) * GRID_UNIT, 0, 0, 0.0, TYPE_SOLID
+
+def road_geometry(intent: str, cursor: tuple):
+    """
+    Where one requested piece goes: ([(asset id, x, y, z, yaw), ...], cursor after).
+    An adapter comes first when the socket types differ.
+    """
+    rx, ry, rz, r_yaw, current_connector_type = cursor
+    placements = []
+
+    # 1. Lookup Asset Logic
+    # Does the requested intent exist in our DB?
+    target_key = intent if intent in ROAD_DB else "straight"
+    target_data = ROAD_DB[target_key]
+
+    # 2. SOCKET CHECK (The Fix)
+    # If types mismatch (e.g. Current is Solid, Target is Pin), we MUST inject an adapter.
+    if current_connector_type != target_data["type"]:
+        # Inject Adapter (Asset 11)
+        adapter = ROAD_DB["adapter_pin"]
+        placements.append((adapter["id"], rx, ry, rz, r_yaw))
+
+        # Move cursor past adapter
+        rad = math.radians(r_yaw)
+        rx += math.cos(rad) * adapter["len"]
+        ry += math.sin(rad) * adapter["len"]
+
+    # 3. Place The Actual Requested Piece
+    placements.append((target_data["id"], rx, ry, rz, r_yaw))
+
+    # 4. Move Cursor
+    rad = math.radians(r_yaw)
+    length = target_data["len"]
+
+    rx += math.cos(rad) * length
+    ry += math.sin(rad) * length
+    rz += target_data["z"]
+    r_yaw += target_data["curve"]
+
+    # Type for the next piece
+    return placements, (rx, ry, rz, r_yaw, target_data["type"])
+
+def _road_piece(batch: ActorBatch, intent: str, cursor: tuple):
+    """
+    Appends one requested piece (plus an adapter when the socket types differ).
+    Returns (cursor after the piece, grid cell the piece occupies).
+    """
+    placements, cursor = road_geometry(intent, cursor)
+    for asset_id, x, y, z, yaw in placements:
+        batch.append(_track_asset(asset_id), x, y, z, yaw, stage="roads")
+    _, x, y, _, _ = placements[-1]
+    return cursor, (int(x/GRID_UNIT), int(y/GRID_UNIT))
+
+ROAD_PLANNER = RoadPlanner(ROAD_DB, road_geometry, GRID_UNIT)
+
+def _blocked_by(grid: OccupancyGrid):
+    """Planner obstacle test for the cells already taken in `grid` (buildings)."""
+    return lambda gx, gy: not grid.is_free(gx, gy)
+
+def _clamped(value, default, lo, hi):
+    """value within [lo, hi]; default when it is not a finite number (LLM / delta input)."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(value, lo), hi) if math.isfinite(value) else default
+
+def forest_params(layout: dict) -> tuple:
+    """(density, extent) of the forest a layout asks for, density in [0, 1], extent in [0, MAX_FOREST_EXTENT]."""
+    density = _clamped(layout.get("forest_density", 0.1), 0.1, 0.0, 1.0)
+    extent = int(_clamped(layout.get("forest_extent", FOREST_EXTENT), FOREST_EXTENT, 0, MAX_FOREST_EXTENT))
+    return density, extent
+
+def resolve_seed(blueprint: dict, seed=None) -> int:
+    """`seed` argument, else blueprint["seed"], else a fresh random one."""
+    if seed is None:
+        seed = blueprint.get("seed")
+    if seed is None:
+        seed = secrets.randbits(32)
+    return seed
+
+def _building_stage(building_list, grid: OccupancyGrid, lots: list):
+    """Buildings on allocated lots; the lots are appended to `lots`."""
+    if not building_list:
+        return
+    lots += LotAllocator.for_count(grid, len(building_list), radius=BUILDING_RADIUS).allocate(len(building_list))
+    batch = ActorBatch()
+    for i, (floors, (lot_x, lot_y)) in enumerate(zip(building_list, lots), 1):
+        # Draw Building
+        _building_batch(batch, floors, lot_x, lot_y)
+
+        if i % BUILDING_CHUNK == 0:
+            yield batch
+            batch = ActorBatch()
+    if len(batch):
+        yield batch
+
+def _road_stage(road_intents, grid: OccupancyGrid, lots: list):
+    # Start with a safe solid piece if list is empty
+    if not road_intents: road_intents = DEFAULT_ROAD
+
+    # We assume we start on solid ground, past the buildings
+    cursor = road_start(lots)
+    batch = ActorBatch()
+
+    # Repair the sequence so the track misses itself and the buildings
+    plan = ROAD_PLANNER.plan(road_intents, cursor, blocked=_blocked_by(grid))
+
+    for key in plan.keys:
+        cursor, (gx, gy) = _road_piece(batch, key, cursor)
+
+        # Mark grid
+        grid.mark_square(gx, gy, radius=ROAD_RADIUS)
+
+        if len(batch) >= ROAD_CHUNK:
+            yield batch
+            batch = ActorBatch()
+    if len(batch):
+        yield batch
+
+def _forest_stage(layout: dict, grid: OccupancyGrid, rng):
+    density, extent = forest_params(layout)
+
+    if density > 0.0:
+        forest = _forest_batch(grid, density, extent, rng)
+        for start in range(0, len(forest), FOREST_CHUNK):
+            yield forest[start:start + FOREST_CHUNK]
+
+def iter_scene_batches(blueprint: dict, seed: int):
+    """
+    Yields ActorBatch chunks as each stage (buildings, roads, forest) places
+    them. No actor dicts are built; see ActorBatch.to_actors / encode_batch.
+    Each stage is timed by app.core.metrics.
+    """
+    rng = np.random.default_rng(seed)
     
     # 1. EXTRACT AI INTENT
     layout = blueprint.get("layout", {})
-    building_list = layout.get("buildings", [])
-    road_intents = layout.get("road_sequence", [])
     
-    # Grid tracker
-    occupied_grid = set()
-    def mark_grid(gx, gy, radius=1):
-        for i in range(-radius, radius+1):
-            for j in range(-radius, radius+1):
-                occupied_grid.add((int(gx)+i, int(gy)+j))
+    # Grid tracker (shared by buildings, road and forest)
+    grid = OccupancyGrid()
+    lots = []
 
     # ---------------------------------------------------------
     # PART A: DYNAMIC BUILDINGS (Only if requested)
     # ---------------------------------------------------------
-    cursor_x, cursor_y = 0, 0
-    
-    if building_list:
-        for floors in building_list:
-            # Spiral Search
-            while (cursor_x, cursor_y) in occupied_grid:
-                cursor_x += 2
-                if cursor_x > 10: 
-                    cursor_x = 0
-                    cursor_y += 2
-            
-            mark_grid(cursor_x, cursor_y, radius=2)
-            
-            # Draw Building
-            bx, by = cursor_x * GRID_UNIT, cursor_y * GRID_UNIT
-            for f in range(floors):
-                z = f * FLOOR_HEIGHT
-                placeables.append(_building_actor(BUILDING_DB["floor"][4], bx, by, z))
-                placeables.append(_building_actor(BUILDING_DB["wall"][1], bx+300, by, z, 90))
-                placeables.append(_building_actor(BUILDING_DB["wall"][1], bx-300, by, z, 270))
-                placeables.append(_building_actor(BUILDING_DB["wall"][1], bx, by+300, z, 0))
-                placeables.append(_building_actor(BUILDING_DB["wall"][1], bx, by-300, z, 180))
-            
-            placeables.append(_building_actor(BUILDING_DB["ceiling"][0], bx, by, floors * FLOOR_HEIGHT))
+    yield from metrics.timed("buildings", _building_stage(layout.get("buildings", []), grid, lots))
 
     # ---------------------------------------------------------
     # PART B: DYNAMIC ROAD (The Socket Solver)
     # ---------------------------------------------------------
-    rx, ry, rz = (cursor_x + 6) * GRID_UNIT, 0, 0
-    r_yaw = 0.0
-    
-    # Start with a safe solid piece if list is empty
-    if not road_intents: road_intents = ["straight", "straight", "turn_90"]
-    
-    # State Tracking
-    current_connector_type = TYPE_SOLID # We assume we start on solid ground
-    
-    for intent in road_intents:
-        # 1. Lookup Asset Logic
-        # Does the requested intent exist in our DB?
-        target_key = intent if intent in ROAD_DB else "straight"
-        target_data = ROAD_DB[target_key]
-        
-        # 2. SOCKET CHECK (The Fix)
-        # If types mismatch (e.g. Current is Solid, Target is Pin), we MUST inject an adapter.
-        if current_connector_type != target_data["type"]:
-            # Inject Adapter (Asset 11)
-            adapter = ROAD_DB["adapter_pin"]
-            placeables.append(_actor(adapter["id"], rx, ry, rz, r_yaw))
-            
-            # Move cursor past adapter
-            rad = math.radians(r_yaw)
-            rx += math.cos(rad) * adapter["len"]
-            ry += math.sin(rad) * adapter["len"]
-            
-            # Update state (Adapter switches the type)
-            current_connector_type = target_data["type"] 
-
-        # 3. Place The Actual Requested Piece
-        placeables.append(_actor(target_data["id"], rx, ry, rz, r_yaw))
-        
-        # Mark grid
-        gx, gy = int(rx/GRID_UNIT), int(ry/GRID_UNIT)
-        mark_grid(gx, gy, radius=2)
-        
-        # 4. Move Cursor
-        rad = math.radians(r_yaw)
-        length = target_data["len"]
-        
-        rx += math.cos(rad) * length
-        ry += math.sin(rad) * length
-        rz += target_data["z"]
-        r_yaw += target_data["curve"]
-        
-        # Update type for next loop
-        current_connector_type = target_data["type"]
+    yield from metrics.timed("roads", _road_stage(layout.get("road_sequence", []), grid, lots))
 
     # ---------------------------------------------------------
     # PART C: DYNAMIC FOREST
     # ---------------------------------------------------------
-    density = layout.get("forest_density", 0.1)
-    
-    if density > 0.0:
-        for fx in range(-40, 40):
-            for fy in range(-40, 40):
-                if (fx, fy) not in occupied_grid:
-                    if random.random() < density:
-                        tx = (fx * GRID_UNIT) + random.uniform(-200, 200)
-                        ty = (fy * GRID_UNIT) + random.uniform(-200, 200)
-                        tree = random.choice(BUILDING_DB["decor"])
-                        placeables.append(_building_actor(tree, tx, ty, 0, random.uniform(0, 360)))
+    yield from metrics.timed("forest", _forest_stage(layout, grid, rng))
 
-    # ---------------------------------------------------------
-    # PART D: ENVIRONMENT
-    # ---------------------------------------------------------
+def iter_scene(blueprint: dict, seed: int):
+    """
+    Yields (stage, actor) as each stage (buildings, roads, forest) produces them.
+    Actor dicts are built lazily, one batch at a time.
+    """
+    for batch in iter_scene_batches(blueprint, seed):
+        for (stage, *_), actor in zip(batch.iter_rows(), batch.to_actors()):
+            yield stage, actor
+
+# ---------------------------------------------------------
+# PART D: ENVIRONMENT
+# ---------------------------------------------------------
+def scene_envelope(blueprint: dict, seed: int) -> dict:
+    """Everything in the scene document except PlaceableAssets."""
     env = blueprint.get("environment", {})
     return {
-        "PlaceableAssets": [p for p in placeables if p is not None],
         "GeometryAssets": [],
         "Text3DActors": [],
         "Foliage": [],
@@ -205,5 +291,113 @@ def compile_scene(blueprint: dict) -> dict:
             "SunAngle": 0,
             "Density": 0.04,
             "Height": 0.2
-        }
-    }
\ No newline at end of file
+        },
+        "Seed": seed,
+    }
+
+def compile_scene(blueprint: dict, seed=None) -> dict:
+    """
+    Compiles a blueprint into Unreal PlaceableAssets.
+    `seed` (or blueprint["seed"]) makes the output reproducible; when neither is
+    given a fresh one is drawn. The seed used is returned as "Seed".
+    PlaceableAssets is an ActorBatch; it becomes JSON at serialization time
+    (scene_encoder.encode_scene, or actor_batch.materialize_scene for dicts).
+    """
+    seed = resolve_seed(blueprint, seed)
+    return {
+        "PlaceableAssets": ActorBatch.concat(iter_scene_batches(blueprint, seed)),
+        **scene_envelope(blueprint, seed),
+    }
+
+# ==============================================================================
+# 3. STREAMING COMPILE (blueprint elements as the LLM writes them)
+# ==============================================================================
+class StreamCompiler:
+    """
+    compile_scene fed one blueprint element at a time (the events of
+    app/llm/stream_parser.py). Each call returns the ActorBatches that element
+    settles; concatenated they are exactly iter_scene_batches(blueprint, seed)
+    for the finished blueprint.
+
+    - A building goes out as soon as its lot can no longer move: lots fill row
+      by row and the row only widens as the count grows, so the first row is
+      known early. The rest follow when the list closes.
+    - Roads start once the buildings are known (the track starts past the last
+      lot); a piece goes out once the planner can no longer backtrack into it.
+    - The forest needs the finished layout and comes last.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.grid = OccupancyGrid()
+        self.lots = []
+        self.floors = []
+        self.buildings_done = False
+        self._placed = 0      # buildings emitted
+        self._roads = []      # road intents received
+        self._session = None  # road PlanSession, once the buildings are known
+        self._cursor = None
+        self._emitted = 0     # road pieces emitted
+
+    def building(self, floors: int) -> list:
+        if self.buildings_done:
+            return []
+        self.floors.append(floors)
+        # the row width for the count so far is a lower bound on the final one
+        allocator = LotAllocator.for_count(self.grid, len(self.floors), radius=BUILDING_RADIUS)
+        batch = ActorBatch()
+        while self._placed < min(len(self.floors), allocator.per_row):
+            _building_batch(batch, self.floors[self._placed], *allocator.lot_cell(self._placed))
+            self._placed += 1
+        return self._out(batch)
+
+    def end_buildings(self, floors=None) -> list:
+        if self.buildings_done:
+            return []
+        self.buildings_done = True
+        if floors is not None:
+            self.floors = list(floors)
+        batch = ActorBatch()
+        if self.floors:
+            self.lots += LotAllocator.for_count(self.grid, len(self.floors), radius=BUILDING_RADIUS).allocate(len(self.floors))
+            for floors, (lot_x, lot_y) in zip(self.floors[self._placed:], self.lots[self._placed:]):
+                _building_batch(batch, floors, lot_x, lot_y)
+            self._placed = len(self.floors)
+
+        # planned against the buildings only, as in _road_stage (road cells are marked as pieces go out)
+        self._cursor = road_start(self.lots)
+        self._session = ROAD_PLANNER.session(self._cursor, blocked=_blocked_by(self.grid.copy()))
+        return self._out(batch) + self._plan(self._roads)
+
+    def road(self, intent: str) -> list:
+        self._roads.append(intent)
+        return self._plan([intent]) if self._session is not None else []
+
+    def finish(self, blueprint: dict) -> list:
+        """The finished blueprint: whatever was not streamed, the rest of the track, the forest."""
+        layout = blueprint.get("layout", {})
+        out = self.end_buildings(layout.get("buildings", []))
+        requested = layout.get("road_sequence", [])
+        rest = requested[len(self._roads):] if requested else []
+        if not requested and not self._roads:
+            rest = DEFAULT_ROAD
+        self._roads += rest
+        self._session.extend(rest)
+        out += self._emit(len(self._session.keys))
+        rng = np.random.default_rng(self.seed)
+        return out + list(metrics.timed("forest", _forest_stage(layout, self.grid, rng)))
+
+    def _plan(self, intents) -> list:
+        return self._emit(self._session.extend(intents))
+
+    def _emit(self, upto: int) -> list:
+        batch = ActorBatch()
+        for key in self._session.keys[self._emitted:upto]:
+            self._cursor, (gx, gy) = _road_piece(batch, key, self._cursor)
+            self.grid.mark_square(gx, gy, radius=ROAD_RADIUS)
+        self._emitted = max(self._emitted, upto)
+        return self._out(batch)
+
+    @staticmethod
+    def _out(batch: ActorBatch) -> list:
+        return [batch] if len(batch) else []
@@ -0,0 +1,135 @@
+# app/core/scene_encoder.py
+"""
+Fast scene encoder.
+
+Every compiled actor shares its AssetClass/AssetClassPath, Rotation pitch/roll,
+Scale and OcaData with every other actor of the same class. Those fragments are
+pre-encoded once per AssetTable entry; encoding an ActorBatch then only formats
+the X/Y/Z and yaw columns — all of them in one orjson call — and splices the
+pieces together with a single join.
+
+Plain actor dicts (hand-built scenes) go through orjson as-is.
+"""
+from typing import Iterable, Iterator, List
+
+import numpy as np
+import orjson
+from fastapi.responses import Response
+
+from app.core.actor_batch import ASSET_TABLE, STAGES, ActorBatch
+
+OCA_DATA = {"CollisionProfile": "BlockAllDynamic", "Physics": False, "Shadow": True}
+
+_LOC_Y = b',"Y":'
+_LOC_Z = b',"Z":'
+_ROT_YAW = b'},"Rotation":{"Pitch":0.0,"Yaw":'
+_TAIL = (
+    b',"Roll":0.0},"Scale":{"X":1.0,"Y":1.0,"Z":1.0}},'
+    + orjson.dumps({"OcaData": OCA_DATA})[1:-1]
+    + b"}"
+)
+_FIXED = len(_LOC_Y) + len(_LOC_Z) + len(_ROT_YAW) + len(_TAIL)  # bytes of an actor besides head and numbers
+
+_NDJSON_PREFIX = [
+    b'{"type":"actor","stage":"' + stage.encode() + b'","actor":' for stage in STAGES
+]
+
+_HEADS: List[bytes] = []  # AssetTable index -> '{"AssetClass":..,"AssetClassPath":..,"Transform":{"Location":{"X":'
+
+
+def _heads() -> List[bytes]:
+    """Pre-encoded heads for every AssetTable entry (extended as the table grows)."""
+    for asset in ASSET_TABLE.entries[len(_HEADS):]:
+        _HEADS.append(
+            orjson.dumps({"AssetClass": asset["class"], "AssetClassPath": asset["path"]})[:-1]
+            + b',"Transform":{"Location":{"X":'
+        )
+    return _HEADS
+
+
+def _numbers(batch: ActorBatch) -> List[bytes]:
+    """X, Y, Z, yaw of every actor, encoded by one orjson call."""
+    cols = batch.columns()
+    flat = np.column_stack((cols["x"], cols["y"], cols["z"], cols["yaw"])).ravel()
+    return orjson.dumps(flat, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].split(b",")
+
+
+def encode_batch(batch: ActorBatch, ndjson: bool = False) -> bytes:
+    """
+    Default: comma-joined actor objects (no brackets).
+    ndjson=True: one '{"type":"actor","stage":..,"actor":{..}}' line per actor.
+    """
+    n = len(batch)
+    if n == 0:
+        return b""
+    table = _heads()
+    if ndjson:
+        heads = [_NDJSON_PREFIX[s] + table[a] for s, a in zip(batch.stage, batch.asset)]
+    else:
+        heads = [table[a] for a in batch.asset]
+    nums = _numbers(batch)
+
+    parts = [b""] * (9 * n)
+    parts[0::9] = heads
+    parts[1::9] = nums[0::4]
+    parts[2::9] = [_LOC_Y] * n
+    parts[3::9] = nums[1::4]
+    parts[4::9] = [_LOC_Z] * n
+    parts[5::9] = nums[2::4]
+    parts[6::9] = [_ROT_YAW] * n
+    parts[7::9] = nums[3::4]
+    parts[8::9] = [_TAIL + (b"}\n" if ndjson else b",")] * n
+    body = b"".join(parts)
+    return body if ndjson else body[:-1]
+
+
+def encoded_sizes(batch: ActorBatch) -> np.ndarray:
+    """Bytes of each actor in encode_batch(batch) (without the joining comma), without encoding the batch."""
+    n = len(batch)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    heads = np.fromiter(map(len, _heads()), dtype=np.int64)
+    numbers = np.fromiter(map(len, _numbers(batch)), dtype=np.int64, count=4 * n).reshape(n, 4).sum(axis=1)
+    return heads[batch.columns()["asset"]] + numbers + _FIXED
+
+
+def encode_actors(actors) -> bytes:
+    """Comma-joined actors (no brackets) from an ActorBatch or a list of dicts."""
+    if isinstance(actors, ActorBatch):
+        return encode_batch(actors)
+    return orjson.dumps(list(actors))[1:-1]
+
+
+def encode_array_close(envelope: dict) -> bytes:
+    """Closes PlaceableAssets and appends the envelope keys: '],"GeometryAssets":[],...}'."""
+    return b"]," + orjson.dumps(envelope)[1:] if envelope else b"]}"
+
+
+def encode_scene(scene: dict) -> bytes:
+    envelope = {k: v for k, v in scene.items() if k != "PlaceableAssets"}
+    return (
+        b'{"PlaceableAssets":['
+        + encode_actors(scene.get("PlaceableAssets", []))
+        + encode_array_close(envelope)
+    )
+
+
+def iter_encoded_batches(batches: Iterable[ActorBatch], envelope: dict) -> Iterator[bytes]:
+    """Scene document, one chunk per batch."""
+    yield b'{"PlaceableAssets":['
+    first = True
+    for batch in batches:
+        if len(batch):
+            yield (b"" if first else b",") + encode_batch(batch)
+            first = False
+    yield encode_array_close(envelope)
+
+
+class SceneResponse(Response):
+    """Serves an already-encoded scene (bytes) or encodes a scene dict."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return encode_scene(content)
@@ -0,0 +1,312 @@
+# app/core/scene_state.py
+"""
+Editable scenes.
+
+A SceneState keeps a compiled scene together with everything needed to change
+it without recompiling from scratch: the blueprint and seed, the building lot
+allocator and its occupancy, the road cursor before every piece, and the
+seeded forest draw. apply() merges a blueprint delta, recomputes only the
+stages it affects and returns an actor diff keyed by stable actor ids:
+
+    b<building>.<n>   n-th actor of a building
+    r<piece>.<n>      n-th actor of a road piece (adapter first, when injected)
+    f<gx>,<gy>        the tree in grid cell (gx, gy)
+
+Existing placements never move on an edit: new buildings take the next free
+lots of the original block, so an edited scene can differ from a fresh
+compile of the final blueprint. That is why a stored scene is its starting
+blueprint, seed and the deltas applied since (to_record), and loading one
+replays them: the record is plain JSON, readable by any later version of
+this class.
+"""
+import copy
+from typing import List, Tuple
+
+import numpy as np
+import orjson
+
+from app.core.actor_batch import ActorBatch
+from app.core.occupancy import LotAllocator, OccupancyGrid
+from app.core.road_planner import SpatialHash
+from app.core.scene_compiler import (
+    BUILDING_RADIUS, DEFAULT_ROAD, ROAD_PLANNER, ROAD_RADIUS,
+    _blocked_by, _building_batch, _forest_draw, _road_piece, forest_params, road_start, scene_envelope,
+)
+
+# Delta keys besides partial "layout"/"environment" overrides
+APPEND_KEYS = ("buildings", "road_sequence")
+
+
+def merge_blueprint(blueprint: dict, delta: dict) -> dict:
+    """
+    delta = {
+        "layout": {...},          keys replace the current values
+        "environment": {...},     keys replace the current values
+        "append": {"buildings": [...], "road_sequence": [...]},
+        "remove_buildings": n,    drops the last n buildings
+    }
+    """
+    merged = copy.deepcopy(blueprint)
+    layout = merged.setdefault("layout", {})
+    layout.update(copy.deepcopy(delta.get("layout", {})))
+    merged.setdefault("environment", {}).update(delta.get("environment", {}))
+    for key in APPEND_KEYS:
+        extra = delta.get("append", {}).get(key)
+        if extra:
+            layout[key] = list(layout.get(key, [])) + list(extra)
+    remove = int(delta.get("remove_buildings", 0))
+    if remove > 0:
+        buildings = list(layout.get("buildings", []))
+        layout["buildings"] = buildings[:max(len(buildings) - remove, 0)]
+    return merged
+
+
+def _ids(prefix: str, batch: ActorBatch) -> List[str]:
+    return [f"{prefix}.{n}" for n in range(len(batch))]
+
+
+class _RoadPiece:
+    __slots__ = ("intent", "cursor", "cell", "batch", "footprint")
+
+    def __init__(self, intent, cursor, cell, batch, footprint):
+        self.intent = intent        # requested; the placed piece may be a planner substitute
+        self.cursor = cursor        # road cursor after this piece
+        self.cell = cell
+        self.batch = batch
+        self.footprint = footprint  # planner cells, for collision checks of later pieces
+
+
+class SceneState:
+    def __init__(self, blueprint: dict, seed: int):
+        self.origin = copy.deepcopy(blueprint)
+        self.blueprint = copy.deepcopy(blueprint)
+        self.seed = seed
+        self.version = 0
+        self.deltas: List[dict] = []  # applied since `origin`; version == len(deltas)
+        layout = self.blueprint.get("layout", {})
+
+        # Buildings: lots come from an allocator over a buildings-only grid, as in compile_scene
+        floors = list(layout.get("buildings", []))
+        self.allocator = LotAllocator.for_count(OccupancyGrid(), max(len(floors), 1), radius=BUILDING_RADIUS)
+        self.lots: List[Tuple[int, int]] = []
+        self.buildings: List[ActorBatch] = []
+        self._add_buildings(floors)
+
+        # Roads
+        self.road_origin = road_start(self.lots)
+        self.roads: List[_RoadPiece] = []
+        self.road_grid = OccupancyGrid()
+        self._extend_roads(layout.get("road_sequence") or DEFAULT_ROAD, self.road_origin)
+
+        # Forest (derived from the seed)
+        self._forest = None
+        self._refresh_forest()
+
+    # ------------------------------------------------------------------
+    # STAGES
+    # ------------------------------------------------------------------
+    def _add_buildings(self, floors: List[int]):
+        for lot, count in zip(self.allocator.allocate(len(floors)), floors):
+            batch = ActorBatch()
+            _building_batch(batch, count, *lot)
+            self.lots.append(lot)
+            self.buildings.append(batch)
+
+    def _drop_buildings(self, keep: int):
+        """Keeps the first `keep` buildings and frees the other lots."""
+        del self.lots[keep:], self.buildings[keep:]
+        grid = OccupancyGrid()
+        for gx, gy in self.lots:
+            grid.mark_square(gx, gy, self.allocator.radius)
+        self.allocator.grid = grid
+        self.allocator._next = self._lot_index(self.lots[-1]) + 1 if self.lots else 0
+
+    def _lot_index(self, lot: Tuple[int, int]) -> int:
+        a = self.allocator
+        col = (lot[0] - a.origin[0]) // a.pitch
+        row = (lot[1] - a.origin[1]) // a.pitch
+        return row * a.per_row + col
+
+    def _extend_roads(self, intents: List[str], cursor: tuple):
+        track = SpatialHash()
+        for owner, piece in enumerate(self.roads):
+            track.add(piece.footprint, owner)
+        plan = ROAD_PLANNER.plan(
+            intents, cursor, blocked=_blocked_by(self.allocator.grid),
+            track=track, first_owner=len(self.roads), start=self.road_origin,
+        )
+        for intent, key, footprint in zip(intents, plan.keys, plan.footprints):
+            batch = ActorBatch()
+            cursor, cell = _road_piece(batch, key, cursor)
+            self.road_grid.mark_square(*cell, radius=ROAD_RADIUS)
+            self.roads.append(_RoadPiece(intent, cursor, cell, batch, footprint))
+
+    def _truncate_roads(self, keep: int):
+        del self.roads[keep:]
+        self.road_grid = OccupancyGrid()
+        for piece in self.roads:
+            self.road_grid.mark_square(*piece.cell, radius=ROAD_RADIUS)
+
+    def _occupied(self, extent: int) -> np.ndarray:
+        window = (-extent, -extent, extent, extent)
+        return self.allocator.grid.window(*window) | self.road_grid.window(*window)
+
+    def _refresh_forest(self, redraw: bool = False) -> np.ndarray:
+        """Re-applies occupancy to the forest draw (redrawing it when asked or missing); returns the visible mask."""
+        density, extent = forest_params(self.blueprint.get("layout", {}))
+        if self._forest is None or redraw:
+            if density > 0.0:
+                gx, gy, trees = _forest_draw(density, extent, np.random.default_rng(self.seed))
+            else:
+                gx = gy = np.zeros(0, dtype=np.int64)
+                trees = ActorBatch()
+            self._forest = {"extent": extent, "gx": gx, "gy": gy, "trees": trees}
+        f = self._forest
+        f["visible"] = ~self._occupied(f["extent"])[f["gx"] + f["extent"], f["gy"] + f["extent"]]
+        return f["visible"]
+
+    # ------------------------------------------------------------------
+    # OUTPUT
+    # ------------------------------------------------------------------
+    def forest(self) -> ActorBatch:
+        return self._forest["trees"].filter(self._forest["visible"])
+
+    def _forest_ids(self, mask) -> List[str]:
+        f = self._forest
+        return [f"f{x},{y}" for x, y in zip(f["gx"][mask].tolist(), f["gy"][mask].tolist())]
+
+    def actor_ids(self) -> List[str]:
+        ids = [f"b{i}.{n}" for i, b in enumerate(self.buildings) for n in range(len(b))]
+        ids += [f"r{i}.{n}" for i, p in enumerate(self.roads) for n in range(len(p.batch))]
+        return ids + self._forest_ids(self._forest["visible"])
+
+    def scene(self) -> dict:
+        """Scene document, same shape as compile_scene."""
+        actors = ActorBatch.concat(self.buildings + [p.batch for p in self.roads] + [self.forest()])
+        return {"PlaceableAssets": actors, **scene_envelope(self.blueprint, self.seed)}
+
+    # ------------------------------------------------------------------
+    # EDITING
+    # ------------------------------------------------------------------
+    def apply(self, delta: dict) -> dict:
+        """
+        Applies a blueprint delta (see merge_blueprint); returns the actor diff.
+        The edit runs on a draft that replaces this state only once every stage
+        succeeded, so a failing delta leaves the scene as it was.
+        """
+        draft, diff = self.edited(delta)
+        self.__dict__.update(draft.__dict__)
+        return diff
+
+    def edited(self, delta: dict) -> Tuple["SceneState", dict]:
+        """(new state, actor diff) for a delta; this state is left unchanged."""
+        draft = self._draft()
+        return draft, draft._apply(delta)
+
+    def _draft(self) -> "SceneState":
+        """Copy for an edit. Actor batches are shared: stages replace them, never modify them."""
+        draft = copy.copy(self)
+        draft.allocator = copy.deepcopy(self.allocator)
+        draft.lots = list(self.lots)
+        draft.buildings = list(self.buildings)
+        draft.roads = list(self.roads)
+        draft.deltas = list(self.deltas)
+        draft.road_grid = copy.deepcopy(self.road_grid)
+        draft._forest = dict(self._forest)
+        return draft
+
+    def _apply(self, delta: dict) -> dict:
+        old = self.blueprint.get("layout", {})
+        self.blueprint = merge_blueprint(self.blueprint, delta)
+        new = self.blueprint.get("layout", {})
+        removed: List[str] = []
+        added: List[Tuple[List[str], ActorBatch]] = []
+        stages: List[str] = []
+
+        # --- buildings: changed floors rebuild in place, extra ones take new lots
+        old_floors, new_floors = list(old.get("buildings", [])), list(new.get("buildings", []))
+        if old_floors != new_floors:
+            stages.append("buildings")
+            common = min(len(old_floors), len(new_floors))
+            for i in range(common):
+                if old_floors[i] != new_floors[i]:
+                    removed += [f"b{i}.{n}" for n in range(len(self.buildings[i]))]
+                    batch = ActorBatch()
+                    _building_batch(batch, new_floors[i], *self.lots[i])
+                    self.buildings[i] = batch
+                    added.append((_ids(f"b{i}", batch), batch))
+            if len(new_floors) < len(old_floors):
+                for i in range(common, len(old_floors)):
+                    removed += [f"b{i}.{n}" for n in range(len(self.buildings[i]))]
+                self._drop_buildings(common)
+            elif len(new_floors) > len(old_floors):
+                self._add_buildings(new_floors[common:])
+                added += [(_ids(f"b{i}", b), b) for i, b in enumerate(self.buildings[common:], common)]
+
+        # --- roads: rebuilt from the first changed piece (all of them if the start moved)
+        origin = road_start(self.lots)
+        intents = new.get("road_sequence") or DEFAULT_ROAD
+        first = 0
+        if origin == self.road_origin:
+            while first < min(len(intents), len(self.roads)) and intents[first] == self.roads[first].intent:
+                first += 1
+        if first < len(self.roads) or first < len(intents):
+            stages.append("roads")
+            for i in range(first, len(self.roads)):
+                removed += [f"r{i}.{n}" for n in range(len(self.roads[i].batch))]
+            self._truncate_roads(first)
+            self.road_origin = origin
+            self._extend_roads(intents[first:], self.roads[-1].cursor if self.roads else origin)
+            added += [(_ids(f"r{i}", p.batch), p.batch) for i, p in enumerate(self.roads[first:], first)]
+
+        # --- forest: redraw when its parameters change, else only re-mask
+        redraw = forest_params(old) != forest_params(new)
+        if redraw or "buildings" in stages or "roads" in stages:
+            before = self._forest["visible"]
+            if redraw:
+                gone = before
+                removed += self._forest_ids(gone)
+                new_mask = self._refresh_forest(redraw=True)
+            else:
+                visible = self._refresh_forest()
+                gone, new_mask = before & ~visible, visible & ~before
+                removed += self._forest_ids(gone)
+            if redraw or gone.any() or new_mask.any():
+                stages.append("forest")
+            added.append((self._forest_ids(new_mask), self._forest["trees"].filter(new_mask)))
+
+        self.deltas.append(copy.deepcopy(delta))
+        self.version += 1
+        diff = {"version": self.version, "stages": stages, "removed": removed, "added": self._encode_added(added)}
+        if delta.get("environment"):
+            diff["DefaultProperties"] = scene_envelope(self.blueprint, self.seed)["DefaultProperties"]
+        return diff
+
+    @staticmethod
+    def _encode_added(added) -> List[dict]:
+        return [
+            {"Id": actor_id, **actor}
+            for ids, batch in added
+            for actor_id, actor in zip(ids, batch.to_actors())
+        ]
+
+    # ------------------------------------------------------------------
+    # PERSISTENCE
+    # ------------------------------------------------------------------
+    def to_record(self) -> dict:
+        return {"blueprint": self.origin, "seed": self.seed, "version": self.version, "deltas": self.deltas}
+
+    @classmethod
+    def from_record(cls, record: dict) -> "SceneState":
+        """Rebuilds a state by replaying its deltas; the same placements and actor ids as when it was saved."""
+        state = cls(record["blueprint"], record["seed"])
+        for delta in record["deltas"]:
+            state._apply(delta)
+        return state
+
+    def dumps(self) -> bytes:
+        return orjson.dumps(self.to_record())
+
+    @classmethod
+    def loads(cls, payload: bytes) -> "SceneState":
+        return cls.from_record(orjson.loads(payload))
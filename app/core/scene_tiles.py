@@ -0,0 +1,96 @@
+# app/core/scene_tiles.py
+"""
+World tiles for chunked loading of job results.
+
+A tile is a square of `cells` x `cells` GRID_UNIT cells. An actor at (x, y)
+sits in grid cell round(x / GRID_UNIT) (the occupancy grid convention) and in
+tile floor(cell / cells). tile_scene() reorders PlaceableAssets so every tile
+is one contiguous run of actors (a stable sort, so stages keep their order
+inside a tile) and adds the manifest under "Tiles":
+
+    {"cells": 16, "size": 9600.0, "count": N, "tiles": [
+        {"x": tx, "y": ty, "offset": first actor, "actors": n,
+         "bytes": size of the tile's PlaceableAssets as JSON,
+         "cells": [gx0, gy0, gx1, gy1],            # half-open grid rectangle
+         "bounds": {"min": [x, y, z], "max": [x, y, z]}},   # of the actors
+        ...]}
+
+Tiles are listed in actor order: row by row, y then x. A tile is read back
+from a stored result by slicing records [offset, offset + actors).
+"""
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.actor_batch import ActorBatch
+from app.core.scene_compiler import GRID_UNIT
+from app.core.scene_encoder import encoded_sizes
+
+
+def tile_keys(batch: ActorBatch, cells: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(tx, ty) of every actor."""
+    cols = batch.columns()
+    gx = np.floor(cols["x"] / GRID_UNIT + 0.5).astype(np.int64)
+    gy = np.floor(cols["y"] / GRID_UNIT + 0.5).astype(np.int64)
+    return gx // cells, gy // cells
+
+
+def tile_scene(scene: dict, cells: int) -> dict:
+    """Scene with PlaceableAssets grouped by tile and the "Tiles" manifest."""
+    batch = scene["PlaceableAssets"]
+    tx, ty = tile_keys(batch, cells)
+    order = np.lexsort((tx, ty))  # stable
+    batch = batch.take(order)
+    tx, ty = tx[order], ty[order]
+    cols = batch.columns()
+
+    tiles = []
+    if len(batch):
+        starts = np.flatnonzero(np.r_[True, (tx[1:] != tx[:-1]) | (ty[1:] != ty[:-1])])
+        ends = np.r_[starts[1:], len(batch)]
+        # JSON size of each tile's actors, comma-joined
+        sizes = np.add.reduceat(encoded_sizes(batch), starts) + (ends - starts - 1)
+        for start, end, size in zip(starts.tolist(), ends.tolist(), sizes.tolist()):
+            x, y = int(tx[start]), int(ty[start])
+            xyz = np.column_stack((cols["x"][start:end], cols["y"][start:end], cols["z"][start:end]))
+            tiles.append({
+                "x": x,
+                "y": y,
+                "offset": start,
+                "actors": end - start,
+                "bytes": size,
+                "cells": [x * cells, y * cells, (x + 1) * cells, (y + 1) * cells],
+                "bounds": {"min": xyz.min(axis=0).tolist(), "max": xyz.max(axis=0).tolist()},
+            })
+    manifest = {"cells": cells, "size": cells * GRID_UNIT, "count": len(batch), "tiles": tiles}
+    return {**scene, "PlaceableAssets": batch, "Tiles": manifest}
+
+
+# ==============================================================================
+# LOOKUP
+# ==============================================================================
+def find_tile(manifest: dict, x: int, y: int) -> Optional[dict]:
+    return next((t for t in manifest["tiles"] if t["x"] == x and t["y"] == y), None)
+
+
+def select_tiles(
+    manifest: dict,
+    rect: Optional[Tuple[int, int, int, int]] = None,
+    near: Optional[Tuple[float, float]] = None,
+) -> List[dict]:
+    """
+    Tiles inside `rect` (tile coordinates x0, y0, x1, y1, inclusive; None =
+    all), nearest first to the world position `near` when given.
+    """
+    tiles = manifest["tiles"]
+    if rect is not None:
+        x0, y0, x1, y1 = rect
+        tiles = [t for t in tiles if x0 <= t["x"] <= x1 and y0 <= t["y"] <= y1]
+    if near is not None:
+        # a tile spans cells [x*cells, (x+1)*cells), i.e. world [(x*cells - 0.5), ((x+1)*cells - 0.5)) * GRID_UNIT
+        half = manifest["cells"] / 2 - 0.5
+        tiles = sorted(tiles, key=lambda t: math.dist(
+            ((t["x"] * manifest["cells"] + half) * GRID_UNIT, (t["y"] * manifest["cells"] + half) * GRID_UNIT), near,
+        ))
+    return tiles
@@ -1,6 +1,7 @@
 # app/llm/base.py
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Dict
 
 
 class BaseLLMClient(ABC):
@@ -15,3 +16,12 @@ class BaseLLMClient(ABC):
         Takes sanitized user text and returns structured intent JSON.
         """
         pass
+
+    fmt = "json"  # what stream_intent() writes: "json" or "dsl"
+
+    async def stream_intent(self, text: str) -> AsyncIterator[str]:
+        """
+        The completion as text chunks while it is being written (see
+        app/llm/stream_parser.py). Providers without streaming send it whole.
+        """
+        yield json.dumps(await self.parse_intent(text))
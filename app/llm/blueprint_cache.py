@@ -0,0 +1,218 @@
+# app/llm/blueprint_cache.py
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+
+
+def make_key(text: str, model: str, prompt_version: str) -> str:
+    """Cache key for a sanitized prompt under a given model + system prompt."""
+    raw = f"{model}\x00{prompt_version}\x00{text}".encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+class BlueprintCache:
+    """
+    Prompt -> blueprint cache in front of the LLM.
+
+    Memory tier: LRU ordered dict of encoded blueprints with TTL, bounded by
+    entry count and by total payload bytes.
+    Disk tier (optional): one JSON file per key so entries survive worker restarts.
+    Concurrent misses for the same key share a single in-flight load.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl: float = 3600.0,
+        disk_dir: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.clock = clock  # memory-tier expiry (the disk tier ages files by mtime)
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, payload)
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._counters = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # MEMORY TIER
+    # ------------------------------------------------------------------
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < self.clock():
+            self._drop(key)
+            self._counters["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def _put_memory(self, key: str, payload: bytes, ttl: Optional[float] = None):
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), payload)
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._counters["evictions"] += 1
+
+    def _drop(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    # ------------------------------------------------------------------
+    # DISK TIER
+    # ------------------------------------------------------------------
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        """Returns (payload, remaining_ttl) or None."""
+        path = self._disk_path(key)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes(), self.ttl - age
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, payload: bytes):
+        path = self._disk_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(payload)
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is best effort; memory still holds the entry.
+            tmp.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # PUBLIC API
+    # ------------------------------------------------------------------
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self._get_memory(key)
+        if payload is not None:
+            self._counters["hits"] += 1
+            return orjson.loads(payload)
+
+        if self.disk_dir is not None:
+            found = await asyncio.to_thread(self._read_disk, key)
+            if found is not None:
+                payload, remaining = found
+                self._put_memory(key, payload, ttl=remaining)
+                self._counters["disk_hits"] += 1
+                return orjson.loads(payload)
+        return None
+
+    async def put(self, key: str, blueprint: Dict[str, Any]):
+        await self._store(key, orjson.dumps(blueprint))
+
+    async def _store(self, key: str, payload: bytes):
+        self._put_memory(key, payload)
+        if self.disk_dir is not None:
+            await asyncio.to_thread(self._write_disk, key, payload)
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Returns the cached blueprint or awaits `loader` once per key.
+        Identical concurrent requests wait on the same load. Failed loads are
+        not cached; every waiter sees the exception.
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self.inflight(key)
+        if pending is not None:
+            return await self.join(pending)
+
+        future = self.lead(key)
+        try:
+            payload = orjson.dumps(await loader())
+        except BaseException as e:
+            self.settle(key, future, error=e)
+            raise
+        self._put_memory(key, payload)
+        self.settle(key, future, payload)
+
+        if self.disk_dir is not None:
+            await asyncio.to_thread(self._write_disk, key, payload)
+        return orjson.loads(payload)
+
+    # ------------------------------------------------------------------
+    # IN-FLIGHT LOADS (get_or_load, or callers that produce the blueprint
+    # themselves, like streamed LLM answers)
+    # ------------------------------------------------------------------
+    def inflight(self, key: str) -> Optional[asyncio.Future]:
+        """The load of `key` in progress, if any; wait for it with join()."""
+        return self._inflight.get(key)
+
+    async def join(self, pending: asyncio.Future) -> Dict[str, Any]:
+        self._counters["coalesced"] += 1
+        return orjson.loads(await asyncio.shield(pending))
+
+    def lead(self, key: str) -> asyncio.Future:
+        """Registers the caller's load of a missed key; callers join() it until settle()."""
+        self._counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def settle(self, key: str, future: asyncio.Future, payload: Optional[bytes] = None,
+               error: Optional[BaseException] = None):
+        """
+        Ends a lead(): waiters get `payload` (the encoded blueprint; storing it
+        is the caller's) or `error`. A load abandoned other than by an Exception
+        (cancelled, generator closed) cancels the waiters.
+        """
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if error is None:
+            future.set_result(payload)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+            future.exception()  # nobody may be waiting; mark the exception as retrieved
+        else:
+            future.cancel()
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "inflight": len(self._inflight),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
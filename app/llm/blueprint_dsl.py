@@ -0,0 +1,292 @@
+# app/llm/blueprint_dsl.py
+"""
+Compact blueprint grammar for LLM output (LLM_BLUEPRINT_FORMAT=dsl).
+
+    B 3*2,5,1; R S*6 T (S*2 TS)*3 U; F .2; E 14 10
+
+    B  building floor counts, comma separated; n*k = k buildings of n floors
+    R  road pieces, space separated: CODE, CODE*k, (group)*k (groups nest);
+       codes below, full road keys are accepted too
+    F  forest_density (0-1)
+    E  time of day (0-24) and brightness (0-10)
+
+Sections are separated by ";" or newlines and may come in any order; only R
+is required. expand() turns the text into the blueprint dict compile_scene
+consumes and raises DSLError on anything malformed or out of range;
+compact() is the inverse (used for prompt examples and offline replay).
+validate_blueprint() holds a JSON completion to the same limits.
+A 25-piece blueprint is ~45 output tokens here against ~250 as indented JSON
+(benchmarks/bench_dsl.py).
+"""
+import re
+from typing import Dict, List, Tuple
+
+from app.core.asset_catalog import ROAD_KEYS
+
+PIECE_CODES = {
+    "S": "straight",
+    "T": "turn_90",
+    "TS": "turn_slight",
+    "C": "curve_sharp",
+    "RG": "ramp_gentle",
+    "RS": "ramp_steep",
+    "BR": "bridge_start",
+    "L": "loop_360",
+    "U": "u_turn",
+    "M": "mercedes",
+    "SP": "splitter",
+}
+CODE_OF = {key: code for code, key in PIECE_CODES.items()}
+ROAD_NAMES = set(PIECE_CODES.values()) | set(ROAD_KEYS)
+DEFAULT_PIECE = "straight"  # what the road planner lays for a name it does not know
+
+MAX_ROAD_PIECES = 2000
+MAX_BUILDINGS = 200
+MAX_FLOORS = 50
+MAX_GROUP = 8  # longest repeated group compact() looks for
+
+DEFAULT_FOREST = 0.1
+DEFAULT_ENVIRONMENT = {"time": 14.0, "brightness": 10.0}
+
+
+class DSLError(ValueError):
+    """Malformed or out-of-range blueprint text."""
+
+
+# ==============================================================================
+# EXPANDER
+# ==============================================================================
+_SECTION = re.compile(r"\s*([BRFE])\b\s*(.*?)\s*$", re.S)
+_ROAD_TOKEN = re.compile(r"\s+|\(|\)(?:\*(\d+))?|([A-Za-z][A-Za-z0-9_]*)(?:\*(\d+))?")
+
+
+def _number(text: str, what: str, lo: float, hi: float) -> float:
+    try:
+        value = float(text)
+    except ValueError:
+        raise DSLError(f"{what}: not a number: {text!r}") from None
+    if not lo <= value <= hi:
+        raise DSLError(f"{what}: {value} outside [{lo}, {hi}]")
+    return value
+
+
+def _buildings(body: str) -> List[int]:
+    floors: List[int] = []
+    for item in filter(None, (part.strip() for part in body.split(","))):
+        value, _, repeat = item.partition("*")
+        n = int(_number(value, "floors", 1, MAX_FLOORS))
+        floors += [n] * (int(_number(repeat, "building repeat", 1, MAX_BUILDINGS)) if repeat else 1)
+        if len(floors) > MAX_BUILDINGS:
+            raise DSLError(f"more than {MAX_BUILDINGS} buildings")
+    return floors
+
+
+def _road(body: str) -> List[str]:
+    stack: List[List[str]] = [[]]
+    total, pos = 0, 0  # pieces so far; checked before every repeat is multiplied out
+
+    def repeated(items: List[str], count) -> List[str]:
+        nonlocal total
+        k = int(count) if count else 1
+        total += len(items) * (k - 1)
+        if total > MAX_ROAD_PIECES:
+            raise DSLError(f"road: more than {MAX_ROAD_PIECES} pieces")
+        return items * k
+
+    while pos < len(body):
+        m = _ROAD_TOKEN.match(body, pos)
+        if m is None:
+            raise DSLError(f"road: unexpected {body[pos:pos + 12]!r}")
+        token, pos = m.group(0), m.end()
+        if token == "(":
+            stack.append([])
+        elif token.startswith(")"):
+            if len(stack) == 1:
+                raise DSLError("road: unbalanced ')'")
+            group = stack.pop()
+            stack[-1] += repeated(group, m.group(1))
+        elif m.group(2):
+            code = m.group(2)
+            name = PIECE_CODES.get(code.upper(), code)
+            if name not in ROAD_NAMES:
+                raise DSLError(f"road: unknown piece {code!r}")
+            total += 1
+            stack[-1] += repeated([name], m.group(3))
+    if len(stack) != 1:
+        raise DSLError("road: unbalanced '('")
+    return stack[0]
+
+
+def expand(text: str) -> dict:
+    """Blueprint text -> {"layout": {...}, "environment": {...}}."""
+    sections: Dict[str, str] = {}
+    for part in re.split(r"[;\n]", text.strip().strip("`")):
+        if not part.strip():
+            continue
+        m = _SECTION.match(part)
+        if m is None:
+            raise DSLError(f"unknown section: {part.strip()[:20]!r}")
+        if m.group(1) in sections:
+            raise DSLError(f"section {m.group(1)} given twice")
+        sections[m.group(1)] = m.group(2)
+    if "R" not in sections:
+        raise DSLError("missing road section R")
+
+    env = dict(DEFAULT_ENVIRONMENT)
+    if "E" in sections:
+        values = sections["E"].split()
+        if len(values) != 2:
+            raise DSLError("E takes time and brightness")
+        env = {"time": _number(values[0], "time", 0, 24), "brightness": _number(values[1], "brightness", 0, 10)}
+    forest = _number(sections["F"], "forest", 0, 1) if "F" in sections else DEFAULT_FOREST
+    return validate_blueprint({
+        "layout": {
+            "buildings": _buildings(sections.get("B", "")),
+            "road_sequence": _road(sections["R"]),
+            "forest_density": forest,
+        },
+        "environment": env,
+    })
+
+
+# ==============================================================================
+# VALIDATION
+# ==============================================================================
+def _bounded(value, what: str, lo: float, hi: float, integer: bool = False):
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)):
+        raise DSLError(f"{what}: not {'an integer' if integer else 'a number'}: {value!r}")
+    if not lo <= value <= hi:
+        raise DSLError(f"{what}: {value} outside [{lo}, {hi}]")
+    return value
+
+
+def check_floors(floors) -> int:
+    """One layout.buildings entry; DSLError unless an integer in [1, MAX_FLOORS]."""
+    return _bounded(floors, "floors", 1, MAX_FLOORS, integer=True)
+
+
+def check_piece(piece) -> str:
+    """One layout.road_sequence entry; any name (the planner lays DEFAULT_PIECE for unknown ones)."""
+    if not isinstance(piece, str):
+        raise DSLError(f"road: piece {piece!r} is not a name")
+    return piece
+
+
+def _list(value, what: str, limit: int) -> list:
+    if not isinstance(value, list):
+        raise DSLError(f"{what}: not a list")
+    if len(value) > limit:
+        raise DSLError(f"{what}: more than {limit} entries")
+    return value
+
+
+def validate_blueprint(blueprint) -> dict:
+    """
+    `blueprint` (a parsed JSON completion) held to expand()'s limits: at most
+    MAX_BUILDINGS buildings of 1-MAX_FLOORS floors, MAX_ROAD_PIECES named road
+    pieces, forest and environment values in range. Returns it; DSLError otherwise.
+    """
+    if not isinstance(blueprint, dict):
+        raise DSLError("blueprint: not an object")
+    layout, env = blueprint.get("layout", {}), blueprint.get("environment", {})
+    if not isinstance(layout, dict) or not isinstance(env, dict):
+        raise DSLError("layout and environment must be objects")
+    for floors in _list(layout.get("buildings", []), "buildings", MAX_BUILDINGS):
+        check_floors(floors)
+    for piece in _list(layout.get("road_sequence") or [], "road_sequence", MAX_ROAD_PIECES):
+        check_piece(piece)
+    if "forest_density" in layout:
+        _bounded(layout["forest_density"], "forest", 0, 1)
+    for key, hi in (("time", 24), ("brightness", 10)):
+        if key in env:
+            _bounded(env[key], key, 0, hi)
+    return blueprint
+
+
+# ==============================================================================
+# COMPACTOR
+# ==============================================================================
+def _num(value: float) -> str:
+    text = f"{value:g}"
+    return text[1:] if text.startswith("0.") else text
+
+
+def _best_repeat(seq: List[str], i: int) -> Tuple[int, int]:
+    """(period, repeats) of the longest run of a repeated block starting at i."""
+    best = (1, 1)
+    for period in range(1, min(MAX_GROUP, (len(seq) - i) // 2) + 1):
+        block = seq[i:i + period]
+        k = 1
+        while seq[i + k * period:i + (k + 1) * period] == block:
+            k += 1
+        if k > 1 and period * k > best[0] * best[1]:
+            best = (period, k)
+    return best
+
+
+def _compact_road(seq: List[str]) -> str:
+    out, i = [], 0
+    while i < len(seq):
+        period, k = _best_repeat(seq, i)
+        if period == 1:
+            piece = CODE_OF.get(seq[i], seq[i])
+            out.append(f"{piece}*{k}" if k > 1 else piece)
+        else:
+            out.append(f"({_compact_road(seq[i:i + period])})*{k}")
+        i += period * k
+    return " ".join(out)
+
+
+def _road_name(piece) -> str:
+    return piece if isinstance(piece, str) and piece in ROAD_NAMES else DEFAULT_PIECE
+
+
+def compact(blueprint: dict) -> str:
+    """
+    Blueprint dict -> blueprint text (expand(compact(b)) reproduces b). Road
+    names expand() would reject are written as DEFAULT_PIECE, the piece
+    compile_scene lays for them anyway.
+    """
+    layout = blueprint.get("layout", {})
+    env = {**DEFAULT_ENVIRONMENT, **blueprint.get("environment", {})}
+    floors = list(layout.get("buildings", []))
+    runs, i = [], 0
+    while i < len(floors):
+        k = 1
+        while i + k < len(floors) and floors[i + k] == floors[i]:
+            k += 1
+        runs.append(f"{floors[i]}*{k}" if k > 1 else str(floors[i]))
+        i += k
+    parts = []
+    if runs:
+        parts.append("B " + ",".join(runs))
+    parts.append("R " + _compact_road([_road_name(piece) for piece in layout.get("road_sequence", [])]))
+    parts.append("F " + _num(layout.get("forest_density", DEFAULT_FOREST)))
+    parts.append(f"E {_num(env['time'])} {_num(env['brightness'])}")
+    return "; ".join(parts)
+
+
+# ==============================================================================
+# TOKEN ESTIMATE
+# ==============================================================================
+_TOKEN = re.compile(r"[A-Za-z]{1,4}|\d{1,3}|\s?[^\sA-Za-z\d]|\s+")
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # not installed / no encodings offline
+    _ENCODING = None
+
+
+def split_tokens(text: str) -> List[str]:
+    """text as the pieces a model would emit it in ("".join gives it back)."""
+    if _ENCODING is not None:
+        return [_ENCODING.decode([t]) for t in _ENCODING.encode(text)]
+    return _TOKEN.findall(text)
+
+
+def count_tokens(text: str) -> int:
+    """o200k token count when tiktoken is available, else a BPE-like estimate."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(_TOKEN.findall(text))
@@ -0,0 +1,138 @@
+# app/llm/offline_client.py
+"""
+Offline LLM stand-in for load tests and local development (LLM_BACKEND=offline).
+
+Blueprints are replayed from a JSONL recording ({"text": ..., "blueprint": ...}
+per line, as written by OpenAIClient when LLM_RECORD_PATH is set) or, for
+prompts that were not recorded, synthesized deterministically from the prompt
+text. Each call sleeps for a latency drawn from a configurable distribution,
+plus token_ms per output token of the blueprint as the model would write it
+(fmt "json" or "dsl"), and fails with a configurable probability, so capacity
+can be measured without a network or API key.
+
+Latency specs:
+    fixed:<ms>
+    uniform:<lo_ms>,<hi_ms>
+    lognormal:<median_ms>,<sigma>
+"""
+import asyncio
+import hashlib
+import math
+import random
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import orjson
+
+from app.llm.base import BaseLLMClient
+from app.llm.blueprint_dsl import compact, count_tokens, expand, split_tokens, validate_blueprint
+
+# The road vocabulary the system prompt gives the real model
+ROAD_KEYS = [
+    "straight", "turn_90", "turn_slight", "curve_sharp", "ramp_gentle", "ramp_steep",
+    "bridge_start", "loop_360", "u_turn", "mercedes", "splitter",
+]
+
+
+class OfflineLLMError(RuntimeError):
+    """Injected failure (error_rate)."""
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency spec -> sampler returning seconds."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        lo, hi = values
+        return lambda rng: rng.uniform(lo, hi) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+def load_recordings(path: str) -> Dict[str, dict]:
+    recordings: Dict[str, dict] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                entry = orjson.loads(line)
+                recordings[entry["text"]] = entry["blueprint"]
+    return recordings
+
+
+def synthesize_blueprint(text: str) -> Dict[str, Any]:
+    """Plausible blueprint, a pure function of the prompt text."""
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    buildings = [] if rng.random() < 0.3 else [rng.randint(1, 6) for _ in range(rng.randint(1, 8))]
+    return {
+        "layout": {
+            "buildings": buildings,
+            "road_sequence": [rng.choice(ROAD_KEYS) for _ in range(rng.randint(4, 30))],
+            "forest_density": round(rng.choice([0.0, 0.1, 0.2, 0.4]), 2),
+        },
+        "environment": {"time": round(rng.uniform(0, 24), 1), "brightness": round(rng.uniform(3, 10), 1)},
+    }
+
+
+class OfflineLLMClient(BaseLLMClient):
+    model = "offline"
+
+    def __init__(
+        self,
+        recordings: Optional[str] = None,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        max_concurrency: int = 64,
+        seed: Optional[int] = None,
+        fmt: str = "json",
+        token_ms: float = 0.0,
+    ):
+        self.recordings = load_recordings(recordings) if recordings else {}
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.fmt = fmt
+        self.token_ms = token_ms
+        self.counters = {"replayed": 0, "synthesized": 0, "errors": 0}
+
+    def render(self, blueprint: dict) -> str:
+        """The blueprint as the model would write it."""
+        return compact(blueprint) if self.fmt == "dsl" else orjson.dumps(blueprint, option=orjson.OPT_INDENT_2).decode()
+
+    async def parse_intent(self, text: str) -> Dict[str, Any]:
+        blueprint = self.recordings.get(text)
+        if blueprint is not None:
+            self.counters["replayed"] += 1
+        else:
+            self.counters["synthesized"] += 1
+            blueprint = synthesize_blueprint(text)
+        output = self.render(blueprint)
+        async with self._slots:
+            await asyncio.sleep(self.latency(self._rng) + count_tokens(output) * self.token_ms / 1000)
+        if self._rng.random() < self.error_rate:
+            self.counters["errors"] += 1
+            raise OfflineLLMError("injected LLM failure")
+        return expand(output) if self.fmt == "dsl" else validate_blueprint(orjson.loads(output))
+
+    async def stream_intent(self, text: str) -> AsyncIterator[str]:
+        """Same answer as parse_intent: the latency before the first token, then token_ms per token."""
+        blueprint = self.recordings.get(text)
+        self.counters["replayed" if blueprint is not None else "synthesized"] += 1
+        output = self.render(blueprint if blueprint is not None else synthesize_blueprint(text))
+        async with self._slots:
+            await asyncio.sleep(self.latency(self._rng))
+            if self._rng.random() < self.error_rate:
+                self.counters["errors"] += 1
+                raise OfflineLLMError("injected LLM failure")
+            if not self.token_ms:
+                yield output
+                return
+            for piece in split_tokens(output):
+                await asyncio.sleep(self.token_ms / 1000)
+                yield piece
+
+    async def aclose(self):
+        pass
@@ -1,29 +1,38 @@
 # app/llm/openai_client.py
+import asyncio
+import copy
+import hashlib
 import json
 import logging
-from openai import OpenAI
+import time
+from typing import AsyncIterator
+
+import httpx
+import orjson
+
+from app.core import metrics
+from app.llm.base import BaseLLMClient
+from app.llm.blueprint_cache import BlueprintCache, make_key
+from app.llm.blueprint_dsl import expand, validate_blueprint
+from app.llm.offline_client import OfflineLLMClient
+from app.llm.stream_parser import Event, stream_parser
 from app.settings import settings
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 logger = logging.getLogger("cobox-ai.llm")
 
-def generate_spatial_layout(text: str):
-    """
-    Translates user text into a strict Construction Blueprint.
-    """
-    SYSTEM_PROMPT = """
+SYSTEM_PROMPT = """
     You are a Technical Level Designer for a Racing Game.
     Convert the user's prompt into a structural JSON blueprint.
-    
+
     ASSET LIBRARY (Strict):
     - Roads: "straight", "turn_90", "turn_slight", "curve_sharp", "ramp_gentle", "ramp_steep", "bridge_start", "loop_360", "u_turn", "mercedes", "splitter"
     - Buildings: List of floor counts (e.g. [2, 5, 1]).
-    
+
     LOGIC RULES:
     1. If user asks for "Roads Only", return "buildings": [].
     2. If user asks for "Complex Road", generates a list of 20-30 road segments mixing straights, turns, and ramps.
     3. If user asks for "Circular/Loop", include "turn_90" or "loop_360".
-    
+
     OUTPUT SCHEMA:
     {
       "layout": {
@@ -37,26 +46,228 @@ def generate_spatial_layout(text: str):
       }
     }
     """
-    
-    try:
-        response = client.chat.completions.create(
+
+# Same blueprint in the compact grammar of app/llm/blueprint_dsl.py (~5x fewer output tokens)
+SYSTEM_PROMPT_DSL = """
+    You are a Technical Level Designer for a Racing Game.
+    Convert the user's prompt into a blueprint written in this exact one-line grammar:
+
+    B <floors>,<floors>,...; R <pieces>; F <forest 0-1>; E <time 0-24> <brightness 0-10>
+
+    Pieces (space separated): S straight, T turn_90, TS turn_slight, C curve_sharp,
+    RG ramp_gentle, RS ramp_steep, BR bridge_start, L loop_360, U u_turn, M mercedes, SP splitter.
+    Repeat with *n: "S*4" is four straights, "(S*2 T)*4" repeats the group four times.
+    Buildings: floor counts, "3*5" is five 3-floor buildings. Omit B when there are no buildings.
+
+    LOGIC RULES:
+    1. If user asks for "Roads Only", omit B.
+    2. If user asks for "Complex Road", use 20-30 pieces mixing straights, turns, and ramps.
+    3. If user asks for "Circular/Loop", include T or L.
+
+    EXAMPLE: B 2,5*3; R S*3 (T S*2)*4 RG L; F .2; E 19 5
+    Output the blueprint line only.
+    """
+
+SYSTEM_PROMPTS = {"json": SYSTEM_PROMPT, "dsl": SYSTEM_PROMPT_DSL}
+MAX_OUTPUT_TOKENS = {"json": 2000, "dsl": 300}
+
+# Bumps automatically whenever the prompt text changes, invalidating cached blueprints.
+PROMPT_VERSION = hashlib.sha1(SYSTEM_PROMPTS[settings.LLM_BLUEPRINT_FORMAT].encode()).hexdigest()[:12]
+
+# Minimal Fallback (Safe Mode)
+FALLBACK_BLUEPRINT = {
+    "layout": {
+        "buildings": [],
+        "road_sequence": ["straight", "straight", "turn_90", "straight"],
+        "forest_density": 0.1
+    },
+    "environment": {"time": 12.0, "brightness": 10.0}
+}
+
+
+class OpenAIClient(BaseLLMClient):
+    """
+    Async OpenAI backend.
+    One pooled HTTP client per worker process, created on first use so it binds
+    to the worker's event loop. A semaphore caps in-flight completions.
+    """
+
+    model = settings.OPENAI_MODEL
+
+    def __init__(self, record_path=None, fmt: str = "json"):
+        self._client = None
+        self._slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self.record_path = record_path  # append {"text", "blueprint"} lines for OfflineLLMClient replay
+        self.fmt = fmt                  # "json" or "dsl" (blueprint_dsl grammar)
+
+    def _get_client(self) -> "AsyncOpenAI":
+        if self._client is None:
+            if not settings.OPENAI_API_KEY:
+                raise RuntimeError("OPENAI_API_KEY is not set")
+            from openai import AsyncOpenAI  # ~0.7s import: paid by the first call, or once in the preloading master
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                ),
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+            )
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                http_client=http_client,
+                max_retries=settings.LLM_MAX_RETRIES,
+            )
+        return self._client
+
+    def _request(self, text: str) -> dict:
+        return dict(
             model=settings.OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": SYSTEM_PROMPT}, 
+                {"role": "system", "content": SYSTEM_PROMPTS[self.fmt]},
                 {"role": "user", "content": f"Generate Blueprint: {text}"}
             ],
-            response_format={"type": "json_object"},
-            max_tokens=2000
+            max_tokens=MAX_OUTPUT_TOKENS[self.fmt],
+            timeout=settings.LLM_TIMEOUT,
+            **({"response_format": {"type": "json_object"}} if self.fmt == "json" else {}),
         )
-        return json.loads(response.choices[0].message.content)
+
+    @staticmethod
+    def _observe(start: float, usage):
+        if metrics.ENABLED:
+            metrics.LLM_SECONDS.observe(time.perf_counter() - start, model=settings.OPENAI_MODEL)
+            if usage is not None:
+                metrics.LLM_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+                metrics.LLM_TOKENS.inc(usage.completion_tokens, kind="completion")
+
+    async def parse_intent(self, text: str):
+        client = self._get_client()
+        async with self._slots:
+            start = time.perf_counter()
+            with metrics.stage("llm"):
+                response = await client.chat.completions.create(**self._request(text))
+        self._observe(start, response.usage)
+        content = response.choices[0].message.content
+        blueprint = expand(content) if self.fmt == "dsl" else validate_blueprint(json.loads(content))
+        if self.record_path:
+            await asyncio.to_thread(self._record, text, blueprint)
+        return blueprint
+
+    async def stream_intent(self, text: str):
+        client = self._get_client()
+        async with self._slots:
+            start = time.perf_counter()
+            usage = None
+            stream = await client.chat.completions.create(
+                **self._request(text), stream=True, stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                usage = chunk.usage or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        self._observe(start, usage)
+
+    def _record(self, text: str, blueprint: dict):
+        with open(self.record_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"text": text, "blueprint": blueprint}) + "\n")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def build_llm_client(backend: str) -> BaseLLMClient:
+    if backend == "openai":
+        return OpenAIClient(record_path=settings.LLM_RECORD_PATH, fmt=settings.LLM_BLUEPRINT_FORMAT)
+    if backend == "offline":
+        return OfflineLLMClient(
+            recordings=settings.LLM_OFFLINE_RECORDINGS,
+            latency=settings.LLM_OFFLINE_LATENCY,
+            error_rate=settings.LLM_OFFLINE_ERROR_RATE,
+            fmt=settings.LLM_BLUEPRINT_FORMAT,
+            token_ms=settings.LLM_OFFLINE_TOKEN_MS,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            seed=settings.LLM_OFFLINE_SEED,
+        )
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+
+llm_client = build_llm_client(settings.LLM_BACKEND)
+
+blueprint_cache = BlueprintCache(
+    max_entries=settings.BLUEPRINT_CACHE_ENTRIES,
+    max_bytes=settings.BLUEPRINT_CACHE_MAX_BYTES,
+    ttl=settings.BLUEPRINT_CACHE_TTL,
+    disk_dir=settings.BLUEPRINT_CACHE_DIR,
+)
+
+
+async def stream_spatial_layout(text: str) -> AsyncIterator[Event]:
+    """
+    generate_spatial_layout for streaming compiles: yields the events of
+    app/llm/stream_parser.py while the model writes, ending with
+    ("blueprint", ...). A cached blueprint is that one event, and so is the
+    answer to the same prompt already being streamed for another request
+    (the cache's single flight). A failure before the first element falls
+    back like generate_spatial_layout; after it the error is raised, as actors
+    from the partial answer are already out.
+    """
+    key = make_key(text, llm_client.model, PROMPT_VERSION)
+    while True:
+        cached = await blueprint_cache.get(key)
+        if cached is not None:
+            yield "blueprint", cached
+            return
+        pending = blueprint_cache.inflight(key)
+        if pending is None:
+            break
+        try:
+            blueprint = await blueprint_cache.join(pending)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            continue  # the leading request went away before the answer
+        except Exception as e:
+            logger.error(f"LLM Error: {e}")
+            blueprint = copy.deepcopy(FALLBACK_BLUEPRINT)
+        yield "blueprint", blueprint
+        return
+
+    future = blueprint_cache.lead(key)
+    parser = stream_parser(llm_client.fmt)
+    started = False
+    try:
+        async for chunk in llm_client.stream_intent(text):
+            for event in parser.feed(chunk):
+                started = True
+                yield event
+        events = parser.close()
+    except BaseException as e:
+        blueprint_cache.settle(key, future, error=e)
+        if started or not isinstance(e, Exception):
+            raise
+        logger.error(f"LLM Error: {e}")
+        yield "blueprint", copy.deepcopy(FALLBACK_BLUEPRINT)
+        return
+
+    blueprint = events[-1][1]
+    blueprint_cache.settle(key, future, orjson.dumps(blueprint))
+    if parser.complete:  # a truncated answer is used by the requests waiting on it, never cached
+        await blueprint_cache.put(key, blueprint)
+        if getattr(llm_client, "record_path", None):
+            await asyncio.to_thread(llm_client._record, text, blueprint)
+    for event in events:
+        yield event
+
+
+async def generate_spatial_layout(text: str):
+    """
+    Translates user text into a strict Construction Blueprint.
+    `text` is expected to be the sanitize_text output; it is the cache key.
+    """
+    key = make_key(text, llm_client.model, PROMPT_VERSION)
+    try:
+        return await blueprint_cache.get_or_load(key, lambda: llm_client.parse_intent(text))
     except Exception as e:
         logger.error(f"LLM Error: {e}")
-        # Minimal Fallback (Safe Mode)
-        return {
-            "layout": {
-                "buildings": [],
-                "road_sequence": ["straight", "straight", "turn_90", "straight"],
-                "forest_density": 0.1
-            },
-            "environment": {"time": 12.0, "brightness": 10.0}
-        }
\ No newline at end of file
+        return copy.deepcopy(FALLBACK_BLUEPRINT)
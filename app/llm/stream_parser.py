@@ -0,0 +1,281 @@
+# app/llm/stream_parser.py
+"""
+Incremental blueprint parsing for streamed completions.
+
+Both parsers take text chunks as the model writes them and return blueprint
+events as soon as each element is complete:
+
+    ("building", floors)         one layout.buildings entry
+    ("buildings", [floors...])   the buildings list is complete
+    ("road", key)                one layout.road_sequence entry
+    ("road_sequence", [keys...]) the road list is complete
+    ("blueprint", {...})         the whole blueprint (from close())
+
+JSONStreamParser is tolerant the way the model's output needs: prose or a
+``` fence before the object and anything after it are ignored, trailing
+commas are accepted, and a completion cut off by max_tokens is closed where
+it stopped (`complete` tells whether it closed on its own). Entries and the
+final blueprint are held to validate_blueprint()'s limits as they arrive.
+DSLStreamParser reads the app/llm/blueprint_dsl.py grammar; when streaming,
+B has to come before R (a road section with no B before it means no
+buildings).
+"""
+import json
+import re
+from typing import Any, List, Tuple
+
+from app.llm.blueprint_dsl import (
+    MAX_BUILDINGS, MAX_ROAD_PIECES, DSLError, _buildings, _road, check_floors, check_piece, expand, validate_blueprint,
+)
+
+Event = Tuple[str, Any]
+
+
+class StreamParseError(ValueError):
+    """The streamed text can not be a blueprint."""
+
+
+# ==============================================================================
+# JSON
+# ==============================================================================
+_JSON_TOKEN = re.compile(r'\s*(?:([{}\[\]:,])|"((?:[^"\\]|\\.)*)"|(-?[\d.eE+-]+|true|false|null))')
+_LITERALS = {"true": True, "false": False, "null": None}
+
+# json path -> event, for scalars inside and containers closing at that path
+_ITEM_EVENTS = {("layout", "buildings"): "building", ("layout", "road_sequence"): "road"}
+_CLOSE_EVENTS = {("layout", "buildings"): "buildings", ("layout", "road_sequence"): "road_sequence"}
+
+
+class JSONStreamParser:
+    def __init__(self):
+        self._buf = ""
+        self._stack: List[list] = []  # [container, pending key, expecting a key]
+        self._path: List[Any] = []    # key / index of each open container in its parent
+        self.root = None
+        self.complete = False
+        self._items = {"building": 0, "road": 0}
+
+    def feed(self, chunk: str) -> List[Event]:
+        events: List[Event] = []
+        if self.complete:
+            return events
+        buf = self._buf + chunk
+        pos = 0
+        if self.root is None:
+            pos = buf.find("{")
+            if pos < 0:
+                self._buf = ""
+                return events
+        while pos < len(buf) and not self.complete:
+            m = _JSON_TOKEN.match(buf, pos)
+            if m is None:
+                if buf[pos:].strip() and not buf[pos:].lstrip().startswith('"') and not _partial_literal(buf[pos:]):
+                    raise StreamParseError(f"unexpected {buf[pos:pos + 12]!r}")
+                break  # an unterminated string or literal: wait for more
+            if m.group(3) is not None and m.end() == len(buf):
+                break  # a number may continue in the next chunk
+            pos = m.end()
+            punct, string, literal = m.groups()
+            if punct:
+                self._punct(punct, events)
+            elif string is not None:
+                self._scalar(json.loads(f'"{string}"'), events)
+            else:
+                self._scalar(_LITERALS[literal] if literal in _LITERALS else _number(literal), events)
+        self._buf = "" if self.complete else buf[pos:]
+        return events
+
+    def close(self) -> List[Event]:
+        """End of the completion: flushes a trailing number, closes what is still open."""
+        events = self.feed(" ") if not self.complete else []
+        complete = self.complete  # closing what is open below is not the model closing it
+        while self._stack:
+            self._close(events)
+        self.complete = complete
+        if self.root is None:
+            raise StreamParseError("no JSON object in the completion")
+        try:
+            validate_blueprint(self.root)
+        except DSLError as e:
+            raise StreamParseError(str(e)) from None
+        return events + [("blueprint", self.root)]
+
+    # ------------------------------------------------------------------
+    def _punct(self, p: str, events: List[Event]):
+        if p in "{[":
+            container = {} if p == "{" else []
+            if self._stack:
+                self._path.append(self._slot(container))
+            elif self.root is None:
+                self.root = container
+            self._stack.append([container, None, p == "{"])
+        elif p in "}]":
+            if not self._stack:
+                raise StreamParseError(f"unbalanced {p!r}")
+            self._close(events)
+        elif p == "," and self._stack and isinstance(self._stack[-1][0], dict):
+            self._stack[-1][2] = True
+        # ":" and list commas carry no information
+
+    def _slot(self, value) -> Any:
+        """Stores value in the open container; returns its key or index."""
+        frame = self._stack[-1]
+        container = frame[0]
+        if isinstance(container, list):
+            container.append(value)
+            return len(container) - 1
+        if frame[1] is None:
+            raise StreamParseError("object value without a key")
+        key, frame[1] = frame[1], None
+        container[key] = value
+        return key
+
+    def _scalar(self, value, events: List[Event]):
+        if not self._stack:
+            raise StreamParseError("value outside the object")
+        frame = self._stack[-1]
+        if frame[2]:
+            if not isinstance(value, str):
+                raise StreamParseError(f"object key {value!r} is not a string")
+            frame[1], frame[2] = value, False
+            return
+        self._slot(value)
+        name = _ITEM_EVENTS.get(tuple(self._path))
+        if name is not None:
+            events.append((name, self._item(name, value)))
+
+    def _item(self, name: str, value):
+        """A buildings / road_sequence entry, checked before anything is compiled from it."""
+        self._items[name] += 1
+        limit = MAX_BUILDINGS if name == "building" else MAX_ROAD_PIECES
+        try:
+            if self._items[name] > limit:
+                raise DSLError(f"{name}: more than {limit} entries")
+            return check_floors(value) if name == "building" else check_piece(value)
+        except DSLError as e:
+            raise StreamParseError(str(e)) from None
+
+    def _close(self, events: List[Event]):
+        container = self._stack.pop()[0]
+        if not self._stack:
+            self.complete = True
+            return
+        name = _CLOSE_EVENTS.get(tuple(self._path))
+        self._path.pop()
+        if name is not None:
+            events.append((name, container))
+
+
+def _partial_literal(text: str) -> bool:
+    text = text.lstrip()
+    return any(word.startswith(text) for word in _LITERALS)
+
+
+def _number(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            raise StreamParseError(f"bad number {text!r}") from None
+
+
+# ==============================================================================
+# DSL
+# ==============================================================================
+def _road_items(body: str, complete: bool) -> List[str]:
+    """R body split on whitespace outside groups; the last item only once it is followed by space."""
+    items, depth, start = [], 0, None
+    for i, ch in enumerate(body):
+        if ch.isspace() and depth == 0:
+            if start is not None:
+                items.append(body[start:i])
+                start = None
+            continue
+        if start is None:
+            start = i
+        depth += (ch == "(") - (ch == ")")
+    if complete and start is not None:
+        items.append(body[start:])
+    return items
+
+
+class DSLStreamParser:
+    def __init__(self):
+        self._text = ""
+        self._done = 0      # characters of complete sections already handled
+        self._seen = set()  # sections completed or started
+        self.complete = False
+        self._emitted = 0   # items of the open section already emitted
+        self._roads = 0
+
+    def feed(self, chunk: str) -> List[Event]:
+        events: List[Event] = []
+        self._text += chunk
+        while True:
+            m = re.search(r"[;\n]", self._text[self._done:])
+            if m is None:
+                break
+            section = self._text[self._done:self._done + m.start()]
+            self._done += m.end()
+            self._section(section, True, events)
+        self._section(self._text[self._done:], False, events)
+        return events
+
+    def close(self) -> List[Event]:
+        events: List[Event] = []
+        self._section(self._text[self._done:], True, events)
+        self._done = len(self._text)
+        try:
+            blueprint = expand(self._text)
+        except DSLError as e:
+            raise StreamParseError(str(e)) from None
+        if "B" not in self._seen:
+            events.append(("buildings", []))
+        self.complete = True
+        return events + [("blueprint", blueprint)]
+
+    def _section(self, text: str, complete: bool, events: List[Event]):
+        body = text.lstrip().lstrip("`")
+        if complete:
+            body = body.rstrip().rstrip("`")
+        if not body or body[0] not in "BR" or (len(body) > 1 and not body[1].isspace()):
+            if complete:
+                self._emitted = 0
+            return
+        name, body = body[0], body[1:]
+        if name == "B" and "R" in self._seen:
+            raise StreamParseError("B must come before R when streaming")
+        if name == "R" and "B" not in self._seen:
+            self._seen.add("B")
+            events.append(("buildings", []))
+        self._seen.add(name)
+
+        if name == "B":
+            items = body.split(",")
+            ready = items if complete else items[:-1]
+            for item in ready[self._emitted:]:
+                for floors in _buildings(item):
+                    events.append(("building", floors))
+            self._emitted = len(ready)
+            if complete:
+                events.append(("buildings", _buildings(body)))
+        else:
+            ready = _road_items(body, complete)
+            for item in ready[self._emitted:]:
+                pieces = _road(item)
+                self._roads += len(pieces)
+                if self._roads > MAX_ROAD_PIECES:
+                    raise StreamParseError(f"road: more than {MAX_ROAD_PIECES} pieces")
+                events += [("road", key) for key in pieces]
+            self._emitted = len(ready)
+            if complete:
+                events.append(("road_sequence", _road(body)))
+        if complete:
+            self._emitted = 0
+
+
+def stream_parser(fmt: str):
+    """Parser for a completion in LLM_BLUEPRINT_FORMAT `fmt`."""
+    return DSLStreamParser() if fmt == "dsl" else JSONStreamParser()
@@ -1,7 +1,19 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from slowapi.errors import RateLimitExceeded
 from app.api.routes import router
+from app.core import metrics
+from app.core.executor import executor, QueueFull
+from app.core.job_manager import evict_periodically
 from app.core.asset_registry import get_production_assets
+from app.llm.openai_client import llm_client
+from app.middleware.admission import Overloaded, retry_after_header
+from app.middleware.rate_limit import limiter
+from app.settings import settings
 
 app = FastAPI(title="Cobox AI Game Gen", version="1.0.0")
 
@@ -9,6 +21,67 @@ app = FastAPI(title="Cobox AI Game Gen", version="1.0.0")
 app.state.asset_index = get_production_assets()
 
 app.include_router(router)
+app.state.limiter = limiter
+
+@app.on_event("startup")
+async def start_executor():
+    await executor.start()
+
+@app.on_event("shutdown")
+async def stop_executor():
+    await executor.stop()
+
+@app.on_event("startup")
+async def start_job_eviction():
+    app.state.job_eviction = asyncio.create_task(evict_periodically(settings.JOB_EVICT_INTERVAL))
+
+@app.on_event("shutdown")
+async def stop_job_eviction():
+    app.state.job_eviction.cancel()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_client.aclose()
+
+@app.exception_handler(QueueFull)
+async def queue_full(request: Request, exc: QueueFull):
+    return JSONResponse({"detail": "Server busy, job queue is full"}, status_code=429, headers={"Retry-After": "1"})
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    retry_after = retry_after_header(exc.retry_after)
+    return JSONResponse(
+        {"detail": "Server busy" if exc.reason == "busy" else "Client over its request budget", "retry_after": int(retry_after)},
+        status_code=429,
+        headers={"Retry-After": retry_after},
+    )
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limited(request: Request, exc: RateLimitExceeded):
+    limit, args = request.state.view_rate_limit
+    reset = limiter.limiter.get_window_stats(limit, *args).reset_time
+    return JSONResponse(
+        {"detail": f"Rate limit exceeded: {exc.detail}"},
+        status_code=429,
+        headers={"Retry-After": retry_after_header(reset - time.time())},
+    )
+
+if metrics.ENABLED:
+    @app.middleware("http")
+    async def timing(request: Request, call_next):
+        timings = metrics.begin_request()
+        start = time.perf_counter()
+        response = await call_next(request)
+        total = time.perf_counter() - start
+        route = request.scope.get("route")
+        metrics.REQUEST_SECONDS.observe(total, route=getattr(route, "path", "unmatched"), method=request.method)
+        # streamed bodies: only the stages finished before the headers went out
+        response.headers["Server-Timing"] = metrics.server_timing(timings, total)
+        return response
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 def health():
@@ -0,0 +1,247 @@
+# app/middleware/admission.py
+"""
+Cost-aware admission control (per worker).
+
+Generating requests are priced before any work starts, in cost units:
+
+    cost = 1 + projected actors / ADMISSION_ACTORS_PER_UNIT
+             + LLM tokens / ADMISSION_TOKENS_PER_UNIT
+
+Projected actors come from the local rules' reading of the prompt even when
+they are not confident enough to skip the LLM, so "a city in a dense forest"
+is priced as a dense forest. LLM tokens (system prompt, prompt and a typical
+answer in LLM_BLUEPRINT_FORMAT) count only when the rules would hand the
+prompt to the model.
+
+A request is admitted when the worker's in-flight budget (ADMISSION_MAX_INFLIGHT
+units, held until the response body is written or the job finishes) has room
+for it and the client's token bucket (ADMISSION_CLIENT_BURST units refilled at
+ADMISSION_CLIENT_RATE units/s, clients keyed like the slowapi limiter) holds
+it. Otherwise Overloaded is raised, which the API answers 429 with Retry-After
+— at once, instead of queueing until gunicorn's timeout. A cost above either
+limit is clamped to it: such a request waits for a full bucket / an idle
+worker instead of never fitting.
+"""
+import asyncio
+import functools
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core import metrics
+from app.core.intent_parser import parse_local
+from app.core.scene_compiler import DEFAULT_ROAD, forest_params
+from app.core.scene_state import merge_blueprint
+from app.llm.blueprint_dsl import count_tokens
+from app.llm.openai_client import SYSTEM_PROMPTS
+from app.middleware.rate_limit import client_key
+from app.settings import settings
+
+STOREY_ACTORS = 5          # floor + 4 walls per storey, one ceiling per building (scene_compiler._building_batch)
+ROAD_PIECE_ACTORS = 2      # the piece, at most one adapter
+TYPICAL_OUTPUT_TOKENS = {"json": 250, "dsl": 45}  # a ~25-piece blueprint (app/llm/blueprint_dsl.py)
+DEFAULT_BLUEPRINT = {"layout": {}}  # what the LLM answer is priced as when the rules find nothing
+
+
+class Overloaded(Exception):
+    """Admission refused; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}: retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ==============================================================================
+# COST ESTIMATE
+# ==============================================================================
+def projected_actors(blueprint: dict) -> float:
+    """Actors compile_scene will place for `blueprint`, before occupancy removes trees."""
+    layout = blueprint.get("layout", {})
+    density, extent = forest_params(layout)
+    buildings = sum(STOREY_ACTORS * floors + 1 for floors in layout.get("buildings", []))
+    roads = ROAD_PIECE_ACTORS * len(layout.get("road_sequence") or DEFAULT_ROAD)
+    return buildings + roads + max(density, 0.0) * (2 * extent) ** 2
+
+
+@functools.lru_cache(maxsize=None)
+def _llm_overhead(fmt: str) -> int:
+    return count_tokens(SYSTEM_PROMPTS[fmt]) + TYPICAL_OUTPUT_TOKENS[fmt]
+
+
+def llm_tokens(text: str) -> int:
+    """Tokens one LLM call for `text` is expected to use."""
+    return _llm_overhead(settings.LLM_BLUEPRINT_FORMAT) + count_tokens(text)
+
+
+def estimate_cost(text: str) -> float:
+    """Cost units of generating a scene for `text` (sanitize_text output)."""
+    blueprint, confidence = parse_local(text)
+    tokens = 0 if blueprint is not None and confidence >= settings.LOCAL_INTENT_MIN_CONFIDENCE else llm_tokens(text)
+    actors = projected_actors(blueprint or DEFAULT_BLUEPRINT)
+    return 1.0 + actors / settings.ADMISSION_ACTORS_PER_UNIT + tokens / settings.ADMISSION_TOKENS_PER_UNIT
+
+
+def estimate_batch_cost(texts: Iterable[str]) -> float:
+    return sum(estimate_cost(text) for text in texts)
+
+
+def estimate_edit_cost(blueprint: dict, delta: dict) -> float:
+    """Cost units of applying a scene delta to `blueprint` (priced as the whole edited scene)."""
+    return 1.0 + projected_actors(merge_blueprint(blueprint, delta)) / settings.ADMISSION_ACTORS_PER_UNIT
+
+
+# ==============================================================================
+# LIMITS
+# ==============================================================================
+class ClientBuckets:
+    """Token bucket per client key; the least recently seen clients are dropped past max_clients."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, stamp)
+
+    def take(self, key: str, cost: float, now: float) -> float:
+        """Takes `cost` from key's bucket; 0.0, or the seconds until it would fit."""
+        cost = min(cost, self.burst)
+        tokens, stamp = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class Lease:
+    """A request's share of the in-flight budget; release() is idempotent."""
+    __slots__ = ("_owner", "cost", "started", "_held")
+
+    def __init__(self, owner: Optional["AdmissionControl"], cost: float):
+        self._owner = owner
+        self.cost = cost
+        self.started = time.monotonic()
+        self._held = False
+
+    def release(self):
+        owner, self._owner = self._owner, None
+        if owner is not None:
+            owner._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if not self._held or exc_type is not None:
+            self.release()
+
+    def release_after_body(self, response: Response) -> Response:
+        """Keeps the lease until `response` is sent instead of until the with block ends."""
+        self._held = True
+        return _LeasedResponse(response, self)
+
+    def release_when_done(self, job: asyncio.Future) -> asyncio.Future:
+        """Keeps the lease until `job` (a queued job's future) is done: finished, failed or cancelled, queued or running."""
+        job.add_done_callback(lambda _: self.release())
+        return job
+
+
+class _LeasedResponse(Response):
+    """`response` as sent by Starlette; the lease is released however sending ends,
+    including a disconnect or cancellation before the body is started."""
+
+    def __init__(self, response: Response, lease: Lease):
+        self.__dict__.update(response.__dict__)  # status, headers and background read as the wrapped response's
+        self._response = response
+        self._lease = lease
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self._response(scope, receive, send)
+        finally:
+            self._lease.release()
+
+
+class AdmissionControl:
+    def __init__(self, max_inflight: float, client_rate: float, client_burst: float, max_clients: int = 10000):
+        self.max_inflight = max_inflight
+        self.clients = ClientBuckets(client_rate, client_burst, max_clients)
+        self.inflight = 0.0
+        self.leases = 0
+        self.hold_seconds = 1.0  # EWMA of how long a lease is held
+        self.counters: Dict[str, int] = {"admitted": 0, "rejected_busy": 0, "rejected_client": 0}
+
+    def admit(self, key: str, cost: float) -> Lease:
+        """Lease for `cost` units, or Overloaded."""
+        cost = min(cost, self.max_inflight)
+        free = self.max_inflight - self.inflight
+        if cost > free and self.leases:
+            # in-flight work drains at about inflight / hold_seconds units per second
+            # (inflight can round to ~0 while leases are out: never drain slower than `cost` at a time)
+            self._reject("busy")
+            raise Overloaded("busy", self.hold_seconds * (cost - free) / max(self.inflight, cost))
+        wait = self.clients.take(key, cost, time.monotonic())
+        if wait > 0.0:
+            self._reject("client")
+            raise Overloaded("client", wait)
+        self.inflight += cost
+        self.leases += 1
+        self.counters["admitted"] += 1
+        return Lease(self, cost)
+
+    def _reject(self, reason: str):
+        self.counters[f"rejected_{reason}"] += 1
+        if metrics.ENABLED:
+            ADMISSION_REJECTED.inc(reason=reason)
+
+    def _release(self, lease: Lease):
+        self.inflight = max(0.0, self.inflight - lease.cost)
+        self.leases -= 1
+        self.hold_seconds += 0.1 * (time.monotonic() - lease.started - self.hold_seconds)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "max_inflight": self.max_inflight,
+            "inflight": round(self.inflight, 3),
+            "leases": self.leases,
+            "clients": len(self.clients),
+            "avg_hold_ms": round(self.hold_seconds * 1000, 3),
+            **self.counters,
+        }
+
+
+admission = AdmissionControl(
+    max_inflight=settings.ADMISSION_MAX_INFLIGHT,
+    client_rate=settings.ADMISSION_CLIENT_RATE,
+    client_burst=settings.ADMISSION_CLIENT_BURST,
+    max_clients=settings.ADMISSION_MAX_CLIENTS,
+)
+
+ADMISSION_REJECTED = metrics.counter("cobox_admission_rejected_total", "Requests refused by admission control")
+metrics.gauge("cobox_admission_inflight_cost", "Cost units admitted and not finished", lambda: {(): admission.inflight})
+
+
+def admit(request: Request, cost: float) -> Lease:
+    """Admits `cost` units for the request's client (no-op lease when ADMISSION_ENABLED is off)."""
+    if not settings.ADMISSION_ENABLED:
+        return Lease(None, cost)
+    return admission.admit(client_key(request), cost)
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After value: whole seconds, at least 1."""
+    return str(max(1, math.ceil(seconds)))
@@ -1,4 +1,12 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from app.settings import settings
+
+# Clients are told apart by address, here and in app/middleware/admission.py
+client_key = get_remote_address
+
+# Plain request count per client, shared by the generating routes (RATE_LIMIT;
+# empty = off). Cost-weighted admission is app/middleware/admission.py
+limiter = Limiter(key_func=client_key, storage_uri=settings.RATE_LIMIT_STORAGE, enabled=bool(settings.RATE_LIMIT))
+generate_limit = limiter.shared_limit(settings.RATE_LIMIT or "1/second", scope="generate")  # not checked while off
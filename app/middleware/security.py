@@ -1,4 +1,12 @@
+from app.core.actor_batch import ActorBatch
+
+MAX_SCENE_ACTORS = 800
+
 def limit_scene(scene: dict):
-    if len(scene.get("actors", [])) > 800:
-        scene["actors"] = scene["actors"][:800]
+    actors = scene.get("actors", [])
+    if len(actors) > MAX_SCENE_ACTORS:
+        if isinstance(actors, ActorBatch):
+            actors.truncate(MAX_SCENE_ACTORS)
+        else:
+            scene["actors"] = actors[:MAX_SCENE_ACTORS]
     return scene
@@ -12,4 +12,83 @@ class Settings:
     MAX_TOKENS = 8000 
     GRID_UNIT = 600.0
 
-settings = Settings()
\ No newline at end of file
+    # LLM transport (per worker)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+
+    # Blueprint the model writes: "json" (schema in SYSTEM_PROMPT) or "dsl" (app/llm/blueprint_dsl.py)
+    LLM_BLUEPRINT_FORMAT = os.getenv("LLM_BLUEPRINT_FORMAT", "json")
+    # /ai/instant?stream=: compile blueprint elements while the model is still writing them
+    LLM_STREAM_COMPILE = os.getenv("LLM_STREAM_COMPILE", "1") not in ("0", "false", "False")
+
+    # "openai", or "offline" (replayed/synthesized blueprints, no network; see app/llm/offline_client.py)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+    LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH")  # openai: append completions here for offline replay
+    LLM_OFFLINE_RECORDINGS = os.getenv("LLM_OFFLINE_RECORDINGS")  # unset = synthesize every blueprint
+    LLM_OFFLINE_LATENCY = os.getenv("LLM_OFFLINE_LATENCY", "lognormal:800,0.4")
+    LLM_OFFLINE_ERROR_RATE = float(os.getenv("LLM_OFFLINE_ERROR_RATE", "0"))
+    LLM_OFFLINE_TOKEN_MS = float(os.getenv("LLM_OFFLINE_TOKEN_MS", "0"))  # added per output token
+    LLM_OFFLINE_SEED = int(os.getenv("LLM_OFFLINE_SEED")) if os.getenv("LLM_OFFLINE_SEED") else None
+
+    # Prompt -> blueprint cache
+    BLUEPRINT_CACHE_ENTRIES = int(os.getenv("BLUEPRINT_CACHE_ENTRIES", "1024"))
+    BLUEPRINT_CACHE_MAX_BYTES = int(os.getenv("BLUEPRINT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    BLUEPRINT_CACHE_TTL = float(os.getenv("BLUEPRINT_CACHE_TTL", "3600"))
+    BLUEPRINT_CACHE_DIR = os.getenv("BLUEPRINT_CACHE_DIR")  # unset = memory only
+
+    # Local rule-based intent parser; below this confidence the LLM decides
+    LOCAL_INTENT_MIN_CONFIDENCE = float(os.getenv("LOCAL_INTENT_MIN_CONFIDENCE", "0.8"))
+
+    # Job state: "sqlite" is shared by all workers on the host, "memory" is per process
+    JOB_STORE = os.getenv("JOB_STORE", "sqlite")
+    JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", str(BASE_DIR / "jobs.sqlite3"))
+    JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+    JOB_UNFINISHED_TTL = float(os.getenv("JOB_UNFINISHED_TTL", "21600"))  # queued/running jobs a dead worker left
+    JOB_EVICT_INTERVAL = float(os.getenv("JOB_EVICT_INTERVAL", "30"))
+    JOB_MAX_RESULTS = int(os.getenv("JOB_MAX_RESULTS", "256"))
+    JOB_MAX_RESULT_BYTES = int(os.getenv("JOB_MAX_RESULT_BYTES", str(256 * 1024 * 1024)))
+    JOB_EVENTS_POLL = float(os.getenv("JOB_EVENTS_POLL", "0.5"))  # SSE re-check for other workers' jobs
+
+    # Job executor (per worker): queued jobs before 429, async LLM workers (of which INTERACTIVE_WORKERS
+    # never take batch jobs), compile processes (0 = thread)
+    EXECUTOR_MAX_QUEUE = int(os.getenv("EXECUTOR_MAX_QUEUE", "256"))
+    EXECUTOR_WORKERS = int(os.getenv("EXECUTOR_WORKERS", "32"))
+    EXECUTOR_INTERACTIVE_WORKERS = int(os.getenv("EXECUTOR_INTERACTIVE_WORKERS", "4"))
+    EXECUTOR_CPU_WORKERS = int(os.getenv("EXECUTOR_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # Admission control (per worker, app/middleware/admission.py): requests are priced in cost units,
+    # 1 + projected actors / ACTORS_PER_UNIT + LLM tokens / TOKENS_PER_UNIT, and refused with 429 +
+    # Retry-After past the in-flight budget or the client's token bucket
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") not in ("0", "false", "False")
+    ADMISSION_ACTORS_PER_UNIT = float(os.getenv("ADMISSION_ACTORS_PER_UNIT", "1000"))
+    ADMISSION_TOKENS_PER_UNIT = float(os.getenv("ADMISSION_TOKENS_PER_UNIT", "1000"))
+    ADMISSION_MAX_INFLIGHT = float(os.getenv("ADMISSION_MAX_INFLIGHT", "256"))
+    ADMISSION_CLIENT_RATE = float(os.getenv("ADMISSION_CLIENT_RATE", "50"))    # units/s refilled per client
+    ADMISSION_CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", "500"))  # bucket size per client
+    ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+
+    # slowapi request count per client over the generating routes (empty = off)
+    RATE_LIMIT = os.getenv("RATE_LIMIT", "6000/minute")
+    RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "memory://")  # redis://... shares counts between workers
+
+    # Job results are stored grouped into square tiles of this many GRID_UNIT cells
+    # (manifest and tile endpoints under /ai/result/{job_id}/tiles); 0 = untiled
+    SCENE_TILE_CELLS = int(os.getenv("SCENE_TILE_CELLS", "16"))
+
+    # Editable scenes kept deserialized per worker; stored ones are dropped after SCENE_TTL s without an edit
+    SCENE_CACHE_ENTRIES = int(os.getenv("SCENE_CACHE_ENTRIES", "64"))
+    SCENE_TTL = float(os.getenv("SCENE_TTL", "86400"))
+
+    # /ai/batch: prompts per request, LLM calls in flight per batch
+    BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "1000"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "16"))
+
+    # Scene exports (created on first export)
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+
+    # Stage timers, /metrics and Server-Timing headers (0 = no-op instrumentation)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+settings = Settings()
@@ -0,0 +1,141 @@
+# benchmarks/bench_dsl.py
+"""
+Output tokens and LLM latency: JSON blueprint schema vs the compact DSL.
+
+    python -m benchmarks.bench_dsl [--recordings llm.jsonl] [--token-ms 15] [--base-ms 300]
+
+Fixed prompt set: hand-written blueprints shaped like real "Complex Road" /
+"Roads Only" / city answers, plus synthesize_blueprint() answers for a fixed
+list of prompts (random piece order, so close to the DSL's worst case), plus
+any recorded {"text", "blueprint"} lines from LLM_RECORD_PATH. For each one
+the blueprint is rendered the way the model writes it in each format
+(indented JSON as with response_format=json_object, compact() for the DSL),
+tokens counted with count_tokens(), and expand(compact(b)) == b checked.
+Latency runs both formats through OfflineLLMClient with a fixed base latency
+plus --token-ms per output token (~15 ms/token is a typical hosted decode rate).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.llm.blueprint_dsl import _ENCODING, compact, count_tokens, expand
+from app.llm.offline_client import OfflineLLMClient, load_recordings, synthesize_blueprint
+from app.llm.openai_client import SYSTEM_PROMPT, SYSTEM_PROMPT_DSL
+
+
+def _bp(buildings, road, forest=0.1, time_=14.0, brightness=10.0):
+    return {
+        "layout": {"buildings": buildings, "road_sequence": road, "forest_density": forest},
+        "environment": {"time": time_, "brightness": brightness},
+    }
+
+
+HANDWRITTEN = {
+    "complex road at sunset": _bp(
+        [], ["straight"] * 4 + ["turn_90", "straight", "straight", "ramp_gentle", "bridge_start"]
+        + ["straight", "turn_slight"] * 4 + ["loop_360", "straight", "straight", "u_turn", "straight"] * 2,
+        0.2, 19.0, 5.0),
+    "roads only racing circuit": _bp(
+        [], (["straight"] * 3 + ["turn_90"]) * 4 + ["straight", "straight", "ramp_steep", "curve_sharp"] * 2,
+        0.0, 12.0, 10.0),
+    "downtown with a loop": _bp(
+        [5, 5, 5, 8, 8, 3, 3, 3, 3, 12], ["straight"] * 6 + ["turn_90"] + ["straight"] * 6 + ["loop_360"]
+        + ["straight"] * 6 + ["turn_90", "turn_90"], 0.1, 14.0, 10.0),
+    "mountain road with ramps": _bp(
+        [2, 1, 2], ["straight", "ramp_gentle", "curve_sharp", "ramp_gentle", "curve_sharp", "ramp_steep"]
+        + ["turn_slight", "straight", "turn_slight"] * 5 + ["bridge_start", "straight", "straight"], 0.4, 8.0, 7.5),
+    "small town circle": _bp(
+        [2, 3, 2, 3, 1, 1], ["straight", "turn_90"] * 4, 0.2, 15.0, 9.0),
+    "highway interchange": _bp(
+        [6, 6, 6, 6], ["straight"] * 8 + ["splitter", "turn_slight", "turn_slight", "mercedes"]
+        + ["straight"] * 8 + ["u_turn"] + ["straight"] * 4, 0.0, 22.0, 4.0),
+}
+
+SYNTH_PROMPTS = [
+    "complex road through a forest", "city at night", "roads only with a bridge",
+    "race track with loops", "suburb with many houses", "figure eight track",
+    "desert highway", "harbour district", "stunt park with ramps", "quiet village",
+]
+
+
+def prompt_set(recordings: str = None):
+    cases = [("hand", text, bp) for text, bp in HANDWRITTEN.items()]
+    cases += [("synth", text, synthesize_blueprint(text)) for text in SYNTH_PROMPTS]
+    if recordings:
+        cases += [("recorded", text, bp) for text, bp in load_recordings(recordings).items()]
+    return cases
+
+
+# ==============================================================================
+# TOKENS
+# ==============================================================================
+def tokens(cases):
+    json_client = OfflineLLMClient(fmt="json")
+    rows = []
+    for kind, text, bp in cases:
+        dsl = compact(bp)
+        assert expand(dsl) == bp, f"roundtrip mismatch for {text!r}"
+        rows.append((kind, text, len(bp["layout"]["road_sequence"]),
+                     count_tokens(json_client.render(bp)), count_tokens(dsl)))
+
+    counter = "tiktoken o200k_base" if _ENCODING is not None else "regex estimate, tiktoken not installed"
+    print(f"output tokens ({counter})")
+    print(f"  {'kind':<9}{'prompt':<32}{'pieces':>7}{'json':>7}{'dsl':>6}{'ratio':>7}")
+    for kind, text, pieces, j, d in rows:
+        print(f"  {kind:<9}{text[:31]:<32}{pieces:>7}{j:>7}{d:>6}{j / d:>6.1f}x")
+    for kind in sorted({r[0] for r in rows}):
+        sel = [r for r in rows if r[0] == kind]
+        j, d = sum(r[3] for r in sel), sum(r[4] for r in sel)
+        print(f"  {kind:<9} total json {j}, dsl {d} ({j / d:.1f}x, median dsl {statistics.median(r[4] for r in sel)})")
+    print(f"  system prompt: json {count_tokens(SYSTEM_PROMPT)}, dsl {count_tokens(SYSTEM_PROMPT_DSL)} input tokens")
+
+
+# ==============================================================================
+# LATENCY
+# ==============================================================================
+async def _run(client, texts):
+    out = []
+    for text in texts:
+        start = time.perf_counter()
+        await client.parse_intent(text)
+        out.append(time.perf_counter() - start)
+    return out
+
+
+def latency(cases, base_ms: float, token_ms: float):
+    recordings = {text: bp for _, text, bp in cases}
+    texts = list(recordings)
+    print(f"\nlatency (offline: fixed {base_ms:g} ms + {token_ms:g} ms/output token)")
+    result = {}
+    for fmt in ("json", "dsl"):
+        client = OfflineLLMClient(latency=f"fixed:{base_ms}", fmt=fmt, token_ms=token_ms)
+        client.recordings = recordings
+        result[fmt] = asyncio.run(_run(client, texts))
+        print(f"  {fmt:<5} median {statistics.median(result[fmt]) * 1000:7.0f} ms  "
+              f"max {max(result[fmt]) * 1000:7.0f} ms")
+    saved = [j - d for j, d in zip(result["json"], result["dsl"])]
+    print(f"  saved median {statistics.median(saved) * 1000:.0f} ms per call, max {max(saved) * 1000:.0f} ms")
+
+    bp = HANDWRITTEN["complex road at sunset"]
+    text, n = compact(bp), 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        expand(text)
+    print(f"  expand() {(time.perf_counter() - start) / n * 1e6:.1f} us for a {len(bp['layout']['road_sequence'])}-piece track")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recordings", help="JSONL of recorded {text, blueprint} answers")
+    parser.add_argument("--base-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    cases = prompt_set(args.recordings)
+    tokens(cases)
+    latency(cases, args.base_ms, args.token_ms)
+
+
+if __name__ == "__main__":
+    main()
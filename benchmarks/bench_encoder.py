@@ -0,0 +1,82 @@
+# benchmarks/bench_encoder.py
+"""
+Scene serialization: current JSONResponse path vs the template encoder.
+
+    python -m benchmarks.bench_encoder [--actors 10000] [--repeat 5]
+
+All variants encode the same seeded scene (~N actors, dense forest) and the
+outputs are checked to decode to the same document.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import orjson
+
+from app.core.actor_batch import materialize_scene
+from app.core.scene_compiler import compile_scene
+from app.core.scene_encoder import encode_scene
+
+
+def blueprint_for(actors: int) -> dict:
+    # 5 three-storey buildings + default road ~ 100 actors; the forest fills the rest at density 0.5.
+    cells = max(actors - 100, 0) / 0.5
+    extent = max(int((cells ** 0.5) / 2), 1)
+    return {"layout": {"buildings": [3] * 5, "forest_density": 0.5, "forest_extent": extent}}
+
+
+def _stdlib_response_body(scene: dict) -> bytes:
+    # Same call Starlette's JSONResponse.render makes
+    return json.dumps(scene, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--actors", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    blueprint = blueprint_for(args.actors)
+    compiled = compile_scene(blueprint, seed=args.seed)   # PlaceableAssets as ActorBatch
+    scene = materialize_scene(compiled)                    # the same scene as actor dicts
+
+    reference = json.loads(_stdlib_response_body(scene))
+    assert orjson.loads(encode_scene(scene)) == reference
+    assert orjson.loads(encode_scene(compiled)) == reference
+
+    groups = {
+        "serialization only": {
+            "json.dumps(dicts)  (JSONResponse)": lambda: _stdlib_response_body(scene),
+            "orjson(dicts)": lambda: encode_scene(scene),
+            "templates(ActorBatch)": lambda: encode_scene(compiled),
+        },
+        "compile + serialize": {
+            "dicts + json.dumps  (JSONResponse)": lambda: _stdlib_response_body(
+                materialize_scene(compile_scene(blueprint, seed=args.seed))
+            ),
+            "ActorBatch + templates": lambda: encode_scene(compile_scene(blueprint, seed=args.seed)),
+        },
+    }
+
+    print(f"scene: {len(compiled['PlaceableAssets'])} actors, {len(_stdlib_response_body(scene)) / 1e6:.2f} MB")
+    for group, cases in groups.items():
+        print(f"\n{group}")
+        baseline = None
+        for name, fn in cases.items():
+            elapsed = _time(fn, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name:<40} {elapsed * 1000:8.2f} ms  x{baseline / elapsed:5.1f}")
+
+if __name__ == "__main__":
+    main()
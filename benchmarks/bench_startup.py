@@ -0,0 +1,137 @@
+# benchmarks/bench_startup.py
+"""
+Worker cold start and per-worker memory, with and without preload.
+
+    python -m benchmarks.bench_startup [--workers 4] [--repeat 5] [--top 10]
+
+1. Cold import: `import app.main` in a fresh interpreter (median of --repeat),
+   plus the slowest imports from -X importtime.
+2. Fork model: the same master -> fork -> worker sequence gunicorn runs, done
+   here with os.fork() so no server is needed. "preload" imports the app and
+   runs app.core.preload.preload() in the master before forking; "no preload"
+   forks a bare interpreter and every worker imports the app itself. Each
+   worker then compiles and encodes a scene (a first request) and reports
+   its startup time; the parent reads Rss / Pss / Shared / Private from
+   /proc/<pid>/smaps_rollup while all workers are alive.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+WARM_BLUEPRINT = {
+    "layout": {"buildings": [3, 5, 2], "road_sequence": ["straight", "turn_90", "ramp_gentle"], "forest_density": 0.2},
+    "environment": {"time": 14.0, "brightness": 10.0},
+}
+
+
+# ==============================================================================
+# COLD IMPORT
+# ==============================================================================
+def cold_import(repeat: int, top: int):
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    times = [float(subprocess.check_output([sys.executable, "-c", code], text=True)) for _ in range(repeat)]
+    print(f"cold import app.main: median {statistics.median(times) * 1000:.0f} ms over {repeat} runs")
+
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if m and len(m.group(3)) <= 3:  # top-level packages only
+            rows.append((int(m.group(2)), m.group(4)))
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+# ==============================================================================
+# FORK MODEL
+# ==============================================================================
+def smaps(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def worker(ready_w: int, hold_r: int, preloaded: bool, forked_at: float):
+    if not preloaded:
+        import app.main  # noqa: F401
+    from app.core.preload import after_fork
+    from app.core.scene_compiler import compile_scene
+    from app.core.scene_encoder import encode_scene
+    after_fork()
+    encode_scene(compile_scene(WARM_BLUEPRINT, seed=1))
+    os.write(ready_w, f"{time.perf_counter() - forked_at:.6f}\n".encode())
+    os.read(hold_r, 1)  # stay alive until the parent has measured
+    os._exit(0)
+
+
+def fork_model(workers: int, preloaded: bool):
+    master_start = time.perf_counter()
+    if preloaded:
+        import app.main  # noqa: F401
+        from app.core.preload import preload
+        preload()
+    master_ready = time.perf_counter() - master_start
+
+    ready_r, ready_w = os.pipe()
+    hold_r, hold_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            worker(ready_w, hold_r, preloaded, forked_at)
+        pids.append(pid)
+
+    with os.fdopen(ready_r) as ready:
+        startup = [float(ready.readline()) for _ in pids]
+    mem = [smaps(pid) for pid in pids]
+    os.write(hold_w, b"x" * workers)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    label = "preload" if preloaded else "no preload"
+    print(f"\n{label}: master {master_ready * 1000:.0f} ms, {workers} workers")
+    print(f"  {'worker':<8}{'start ms':>10}{'rss MB':>10}{'pss MB':>10}{'shared MB':>11}{'private MB':>12}")
+    for n, (s, m) in enumerate(zip(startup, mem)):
+        print(f"  {n:<8}{s * 1000:>10.0f}{m['rss'] / 1024:>10.1f}{m['pss'] / 1024:>10.1f}"
+              f"{m['shared'] / 1024:>11.1f}{m['private'] / 1024:>12.1f}")
+    print(f"  total PSS {sum(m['pss'] for m in mem) / 1024:.1f} MB, "
+          f"median worker start {statistics.median(startup) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--mode", choices=["import", "fork", "all"], default="all")
+    parser.add_argument("--preload", choices=["on", "off", "both"], default="both")
+    args = parser.parse_args()
+
+    if args.mode in ("import", "all"):
+        cold_import(args.repeat, args.top)
+    if args.mode in ("fork", "all"):
+        # each variant in its own interpreter so the "no preload" master really is bare
+        variants = {"on": [True], "off": [False], "both": [False, True]}[args.preload]
+        for preloaded in variants:
+            subprocess.run([
+                sys.executable, "-c",
+                f"from benchmarks.bench_startup import fork_model; fork_model({args.workers}, {preloaded})",
+            ], check=True)
+
+
+if __name__ == "__main__":
+    main()
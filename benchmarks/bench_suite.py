@@ -0,0 +1,191 @@
+# benchmarks/bench_suite.py
+"""
+Compile / serialization benchmark suite.
+
+    python -m benchmarks.bench_suite [--quick] [--filter compile] [--save out.json] [--compare base.json]
+
+Synthetic, seeded blueprints are swept across building count, road length
+and forest_density. Every case reports median/min wall time over --repeat
+runs, then one extra run under tracemalloc for allocation count/bytes and
+peak memory. --save writes the results as a JSON baseline; --compare flags
+cases slower (or with a higher peak) than the baseline by more than
+--threshold and exits 1 when any regressed.
+"""
+import argparse
+import gc
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import numpy as np
+
+from app.core import road_logic
+from app.core.asset_registry import get_production_assets
+from app.core.exporter import export_scene
+from app.core.placement_rules import build_city_scene, generate_building
+from app.core.scene_binary import encode_binary
+from app.core.scene_compiler import ROAD_PLANNER, compile_scene, road_start
+from app.core.scene_encoder import encode_scene
+from app.settings import settings
+
+SEED = 1234
+ROAD_MIX = ["straight", "straight", "turn_90", "turn_slight", "ramp_gentle", "u_turn", "pin_t_junction"]
+
+FULL = {"buildings": [0, 10, 100], "roads": [10, 100, 1000], "density": [0.0, 0.1, 0.5]}
+QUICK = {"buildings": [10], "roads": [100], "density": [0.1]}
+
+
+def synthetic_blueprint(buildings: int, roads: int, density: float) -> dict:
+    rng = random.Random(SEED + buildings * 7 + roads)
+    return {
+        "layout": {
+            "buildings": [rng.randint(1, 6) for _ in range(buildings)],
+            "road_sequence": [rng.choice(ROAD_MIX) for _ in range(roads)],
+            "forest_density": density,
+        },
+        "environment": {"time": 14.0, "brightness": 10.0},
+    }
+
+
+# ==============================================================================
+# CASES
+# ==============================================================================
+def build_cases(sweep: Dict[str, list]) -> Dict[str, Callable[[], object]]:
+    cases: Dict[str, Callable[[], object]] = {}
+
+    for b, r, d in itertools.product(sweep["buildings"], sweep["roads"], sweep["density"]):
+        blueprint = synthetic_blueprint(b, r, d)
+        scene = compile_scene(blueprint, seed=SEED)
+        tag = f"b={b},r={r},f={d}"
+        cases[f"compile_scene[{tag}]"] = lambda bp=blueprint: compile_scene(bp, seed=SEED)
+        cases[f"encode_json[{tag}]"] = lambda s=scene: encode_scene(s)
+        cases[f"encode_cbx[{tag}]"] = lambda s=scene: encode_binary(s)
+
+    for r in sweep["roads"]:
+        intents = synthetic_blueprint(0, r, 0.0)["layout"]["road_sequence"]
+        cases[f"road_planner.plan[r={r}]"] = lambda i=intents: ROAD_PLANNER.plan(i, road_start([]))
+
+    # Export: largest swept scene, plain and compressed
+    big = compile_scene(
+        synthetic_blueprint(max(sweep["buildings"]), max(sweep["roads"]), max(sweep["density"])), seed=SEED
+    )
+    cases["export_scene[json]"] = lambda: export_scene(big, "json")
+    cases["export_scene[json+gzip]"] = lambda: export_scene(big, "json", "gzip")
+    cases["export_scene[cbx]"] = lambda: export_scene(big, "cbx")
+
+    for n in (5, 20):
+        intent = {"objects": [{"type": "building", "count": n}]}
+        cases[f"build_city_scene[n={n}]"] = lambda i=intent: build_city_scene(i)
+    cases["generate_building[floors=6]"] = lambda: generate_building(0, 0.0, 0.0, 6, True)
+
+    def resolve_many():
+        rng = random.Random(SEED)
+        for intent in ("straight", "turn", "ramp", "bridge", "unknown") * 200:
+            road_logic.resolve_next_asset(road_logic.TYPE_SOLID, intent, rng)
+    cases["road_logic.resolve_next_asset[x1000]"] = resolve_many
+    cases["get_production_assets"] = get_production_assets
+    return cases
+
+
+# ==============================================================================
+# MEASUREMENT
+# ==============================================================================
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    fn()  # warm-up (imports, caches)
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    grown = [s for s in after.compare_to(before, "filename") if s.count_diff > 0]
+    return {
+        "time_ms": round(statistics.median(samples) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4),
+        "allocs": sum(s.count_diff for s in grown),
+        "alloc_kb": round(sum(s.size_diff for s in grown) / 1024, 1),
+        "peak_kb": round((peak - base) / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose time_ms or peak_kb grew by more than `threshold` (fraction)."""
+    regressions = []
+    for name, now in results.items():
+        then = baseline.get(name)
+        if then is None:
+            continue
+        for metric in ("time_ms", "peak_kb"):
+            if then[metric] > 0 and now[metric] > then[metric] * (1 + threshold):
+                regressions.append((name, metric, then[metric], now[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="one point per sweep axis")
+    parser.add_argument("--filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results (baseline) to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, e.g. 0.10 = 10%%")
+    args = parser.parse_args()
+
+    # Exports go to a throwaway directory
+    settings.EXPORT_DIR = tempfile.mkdtemp(prefix="cobox-bench-")
+
+    cases = build_cases(QUICK if args.quick else FULL)
+    results = {}
+    for name, fn in cases.items():
+        if args.filter not in name:
+            continue
+        r = results[name] = measure(fn, args.repeat)
+        print(f"{name:<48} {r['time_ms']:10.3f} ms  {r['allocs']:>9} allocs  {r['alloc_kb']:>10.1f} KB  peak {r['peak_kb']:>10.1f} KB")
+
+    if args.save:
+        doc = {
+            "meta": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+        print(f"\nsaved {len(results)} cases to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%} vs {args.compare}")
+        for name, metric, then, now in regressions:
+            print(f"  REGRESSION {name} {metric}: {then} -> {now} ({now / then - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
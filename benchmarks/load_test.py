@@ -0,0 +1,213 @@
+# benchmarks/load_test.py
+"""
+Open-loop load generator for /ai/instant, /ai/command and /ai/result.
+
+    python -m benchmarks.load_test --spawn --rps 20 --duration 30 [--mix instant=0.7,command=0.3]
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rps 50
+
+Requests are started on a fixed schedule at --rps whatever the response
+times, so queueing shows up as latency (or 429s) rather than as a lower send
+rate. Each /ai/command job is followed via /ai/status until it finishes and
+then fetched from /ai/result. The report gives p50/p95/p99 latency, status
+codes and throughput per endpoint, and "command_e2e" from submit to result.
+
+--stream ndjson|json sends /ai/instant as a streamed scene and also reports
+"instant_first", the time to the first actor in the body.
+
+--spawn starts a local uvicorn with LLM_BACKEND=offline and an in-memory job
+store, so the whole run needs no network; offline latency, per-token time,
+blueprint format and error rate are passed through (--llm-latency,
+--llm-token-ms, --llm-format, --llm-error-rate).
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+# Mix of prompts the local rules resolve and ones that go to the LLM backend
+PROMPTS = [
+    "3 buildings with 4 floors",
+    "a simple road",
+    "five buildings and a forest",
+    "a twisting mountain circuit with bridges and a loop over a lake at dusk",
+    "downtown racing with tall towers, ramps and a hairpin near the harbour",
+    "an abandoned industrial park with a figure eight track",
+    "desert rally stage with dunes and a few huts",
+]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.codes: Dict[str, Counter] = defaultdict(Counter)
+        self.elapsed = 0.0
+
+    def add(self, endpoint: str, seconds: float, code):
+        self.codes[endpoint][code] += 1
+        if code == 200:
+            self.latency[endpoint].append(seconds)
+
+    def report(self):
+        elapsed = self.elapsed
+        print(f"\n{'endpoint':<14}{'ok':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  codes")
+        for endpoint in sorted(self.codes):
+            samples = self.latency[endpoint]
+            p50, p95, p99 = (percentile(samples, q) * 1000 for q in (50, 95, 99))
+            codes = " ".join(f"{c}:{n}" for c, n in sorted(self.codes[endpoint].items(), key=str))
+            print(f"{endpoint:<14}{len(samples):>7}{len(samples) / elapsed:>9.1f}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}  {codes}")
+
+
+async def timed(rec: Recorder, endpoint: str, call):
+    start = time.perf_counter()
+    try:
+        response = await call
+        code = response.status_code
+    except httpx.HTTPError as e:
+        response, code = None, type(e).__name__
+    rec.add(endpoint, time.perf_counter() - start, code)
+    return response
+
+
+async def instant(client: httpx.AsyncClient, rec: Recorder, text: str, stream=None):
+    if not stream:
+        await timed(rec, "instant", client.post("/ai/instant", json={"text": text}))
+        return
+    start = time.perf_counter()
+    first = None
+    marker = b'"type":"actor"' if stream == "ndjson" else b'"AssetClass"'
+    try:
+        async with client.stream("POST", f"/ai/instant?stream={stream}", json={"text": text}) as response:
+            async for chunk in response.aiter_raw():
+                if first is None and marker in chunk:
+                    first = time.perf_counter() - start
+            code = response.status_code
+    except httpx.HTTPError as e:
+        code = type(e).__name__
+    rec.add("instant", time.perf_counter() - start, code)
+    if first is not None:
+        rec.add("instant_first", first, code)
+
+
+async def command(client: httpx.AsyncClient, rec: Recorder, text: str, poll: float):
+    start = time.perf_counter()
+    response = await timed(rec, "command", client.post("/ai/command", json={"text": text}))
+    if response is None or response.status_code != 200:
+        return
+    job_id = response.json()["job_id"]
+    while True:
+        await asyncio.sleep(poll)
+        status = (await client.get(f"/ai/status/{job_id}")).json().get("status")
+        if status in ("done", "error", "cancelled", "unknown"):
+            break
+    if status != "done":
+        rec.add("command_e2e", 0.0, status)
+        return
+    result = await timed(rec, "result", client.get(f"/ai/result/{job_id}"))
+    if result is not None:
+        rec.add("command_e2e", time.perf_counter() - start, result.status_code)
+
+
+async def run(args) -> Recorder:
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(","))}
+    kinds, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    counter = itertools.count()
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        tasks = []
+        interval = 1.0 / args.rps
+        start = time.perf_counter()
+        for n in range(int(args.rps * args.duration)):
+            delay = start + n * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            text = rng.choice(PROMPTS)
+            if args.unique:
+                text += f" variant {next(counter)}"  # defeats the blueprint cache
+            if rng.choices(kinds, weights)[0] == "instant":
+                tasks.append(asyncio.create_task(instant(client, rec, text, args.stream)))
+            else:
+                tasks.append(asyncio.create_task(command(client, rec, text, args.poll)))
+        await asyncio.gather(*tasks)
+        rec.elapsed = time.perf_counter() - start
+    return rec
+
+
+def spawn_server(args) -> subprocess.Popen:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(
+        os.environ,
+        LLM_BACKEND="offline",
+        LLM_OFFLINE_LATENCY=args.llm_latency,
+        LLM_OFFLINE_ERROR_RATE=str(args.llm_error_rate),
+        LLM_OFFLINE_TOKEN_MS=str(args.llm_token_ms),
+        LLM_BLUEPRINT_FORMAT=args.llm_format,
+        JOB_STORE="memory",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=env
+    )
+    args.url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{args.url}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("spawned server did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a local offline server for the run")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of sending")
+    parser.add_argument("--mix", default="instant=0.7,command=0.3")
+    parser.add_argument("--unique", action="store_true", help="make every prompt distinct (no cache hits)")
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--poll", type=float, default=0.1, help="job status poll interval")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", default="lognormal:800,0.4", help="--spawn: offline LLM latency spec")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="--spawn: offline LLM failure rate")
+    parser.add_argument("--llm-token-ms", type=float, default=0.0, help="--spawn: offline time per output token")
+    parser.add_argument("--llm-format", choices=["json", "dsl"], default="json", help="--spawn: blueprint format")
+    parser.add_argument("--stream", choices=["ndjson", "json"], help="stream /ai/instant bodies")
+    args = parser.parse_args()
+
+    proc = spawn_server(args) if args.spawn else None
+    try:
+        rec = asyncio.run(run(args))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    print(f"target {args.rps:g} req/s for {args.duration:g}s against {args.url}")
+    rec.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,20 @@
+import os
+
 workers = 2
-timeout = 120
\ No newline at end of file
+timeout = 120
+
+# Import the app once in the master and fork the workers from it: immutable
+# tables are shared copy-on-write and a restarted worker is a fork, not a
+# fresh import. GUNICORN_PRELOAD=0 goes back to importing in every worker.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    if preload_app:
+        from app.core.preload import preload
+        server.log.info("Preloaded shared state in %.3fs", preload())
+
+
+def post_fork(server, worker):
+    from app.core.preload import after_fork
+    after_fork()
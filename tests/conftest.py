@@ -0,0 +1,23 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# No network, no shared files: set before app.settings is imported
+os.environ.setdefault("LLM_BACKEND", "offline")
+os.environ.setdefault("LLM_OFFLINE_LATENCY", "fixed:0")
+os.environ.setdefault("JOB_STORE", "memory")
+os.environ.setdefault("EXECUTOR_CPU_WORKERS", "0")
+os.environ.setdefault("EXPORT_DIR", tempfile.mkdtemp(prefix="cobox-exports-"))
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    """The app with its startup and shutdown hooks run."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
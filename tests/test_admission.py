@@ -0,0 +1,131 @@
+# tests/test_admission.py
+import asyncio
+
+import pytest
+from starlette.responses import StreamingResponse
+
+from app.middleware.admission import AdmissionControl, Overloaded
+
+SCOPE = {"type": "http", "asgi": {"spec_version": "2.3"}}
+
+
+async def _body(fail: bool = False, stall: bool = False):
+    if stall:
+        await asyncio.sleep(60)
+    yield b"scene"
+    if fail:
+        raise RuntimeError("compile failed")
+
+
+async def _send_body(response, disconnect: bool = False, cancel: bool = False):
+    """Runs `response` as Starlette would; the messages sent."""
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def receive():
+        if disconnect:
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(60)
+
+    task = asyncio.ensure_future(response(SCOPE, receive, send))
+    if cancel:
+        await asyncio.sleep(0)
+        task.cancel()
+    try:
+        await task
+    except (RuntimeError, asyncio.CancelledError):
+        pass
+    return sent
+
+
+@pytest.mark.parametrize("ending", [
+    {},                                         # body written
+    {"fail": True},                             # generator raises after the first chunk
+    {"stall": True, "disconnect": True},        # client gone before the body starts
+    {"stall": True, "cancel": True},            # request task cancelled
+])
+def test_streaming_lease_is_released_however_the_response_ends(ending):
+    control = AdmissionControl(max_inflight=10, client_rate=100, client_burst=100)
+
+    async def run():
+        with control.admit("client", 3) as lease:
+            response = lease.release_after_body(StreamingResponse(_body(ending.get("fail"), ending.get("stall"))))
+        assert (control.leases, control.inflight) == (1, 3)  # held past the with block
+        sent = await _send_body(response, ending.get("disconnect", False), ending.get("cancel", False))
+        return sent, response
+
+    sent, response = asyncio.run(run())
+    assert (control.leases, control.inflight) == (0, 0)
+    assert response.status_code == 200
+    if not ending:
+        assert [m["type"] for m in sent] == ["http.response.start", "http.response.body", "http.response.body"]
+    lease_again = control.admit("client", 3)
+    lease_again.release()
+    lease_again.release()  # idempotent
+    assert control.leases == 0
+
+
+def test_lease_is_released_when_the_with_block_raises():
+    control = AdmissionControl(max_inflight=10, client_rate=100, client_burst=100)
+    with pytest.raises(ValueError):
+        with control.admit("client", 3) as lease:
+            lease.release_after_body(StreamingResponse(_body()))
+            raise ValueError("bad prompt")
+    assert (control.leases, control.inflight) == (0, 0)
+    with control.admit("client", 3):
+        assert control.leases == 1
+    assert control.leases == 0
+
+
+@pytest.mark.parametrize("ending", ["result", "error", "cancelled"])
+def test_queued_job_holds_its_lease_until_it_is_done(ending):
+    control = AdmissionControl(max_inflight=10, client_rate=100, client_burst=100)
+
+    async def run():
+        job = control.admit("client", 2).release_when_done(asyncio.get_running_loop().create_future())
+        await asyncio.sleep(0)
+        assert control.leases == 1
+        if ending == "result":
+            job.set_result("done")
+        elif ending == "error":
+            job.set_exception(RuntimeError("job failed"))
+        else:
+            job.cancel()
+        await asyncio.sleep(0)  # done callbacks run on the next loop iteration
+        if not job.cancelled():
+            job.exception()  # retrieved, or asyncio logs it as never retrieved
+
+    asyncio.run(run())
+    assert (control.leases, control.inflight) == (0, 0)
+
+
+def test_busy_retry_after_stays_bounded():
+    control = AdmissionControl(max_inflight=10, client_rate=1000, client_burst=1000)
+    leases = [control.admit(f"client{i}", 1e-9) for i in range(3)]
+    control.inflight = 10.0  # budget taken, leases about to drain
+    with pytest.raises(Overloaded) as busy:
+        control.admit("other", 5)
+    assert busy.value.reason == "busy"
+    assert 0 < busy.value.retry_after <= control.hold_seconds
+    control.inflight = 1e-12  # rounded down while leases are still out
+    control.max_inflight = 1e-13
+    with pytest.raises(Overloaded) as busy:
+        control.admit("other", 5)
+    assert busy.value.retry_after <= control.hold_seconds
+    for lease in leases:
+        lease.release()
+    assert control.leases == 0 and control.counters["rejected_busy"] == 2
+
+
+def test_client_bucket_refuses_a_burst():
+    control = AdmissionControl(max_inflight=1000, client_rate=10, client_burst=20)
+    leases = [control.admit("client", 5) for _ in range(4)]
+    with pytest.raises(Overloaded) as refused:
+        control.admit("client", 5)
+    assert refused.value.reason == "client" and 0 < refused.value.retry_after <= 0.5
+    control.admit("someone else", 5).release()
+    for lease in leases:
+        lease.release()
+    assert control.stats()["inflight"] == 0 and control.counters["rejected_client"] == 1
@@ -0,0 +1,135 @@
+# tests/test_blueprint_cache.py
+import asyncio
+import os
+import time
+
+import orjson
+
+from app.llm.blueprint_cache import BlueprintCache, make_key
+
+BLUEPRINT = {"layout": {"buildings": [3, 3], "road_sequence": ["straight", "turn_90"]}}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _LLM:
+    """Loader counting its calls; answers after `delay` seconds, or raises `error`."""
+
+    def __init__(self, delay: float = 0.01, error: Exception = None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return BLUEPRINT
+
+
+def test_concurrent_misses_call_the_llm_once():
+    cache, llm = BlueprintCache(), _LLM()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("key", llm) for _ in range(20)))
+
+    results = asyncio.run(run())
+    assert llm.calls == 1 and results == [BLUEPRINT] * 20
+    results[0]["layout"]["buildings"].append(9)  # every caller gets its own copy
+    assert results[1] == BLUEPRINT
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["inflight"]) == (1, 19, 0)
+
+
+def test_leader_error_reaches_every_joiner_and_is_not_cached():
+    cache, llm = BlueprintCache(), _LLM(error=RuntimeError("rate limited"))
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("key", llm) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert llm.calls == 1
+    assert all(isinstance(r, RuntimeError) and str(r) == "rate limited" for r in results)
+    assert cache.stats()["entries"] == 0 and cache.stats()["inflight"] == 0
+    llm.error = None
+    assert asyncio.run(cache.get_or_load("key", llm)) == BLUEPRINT and llm.calls == 2
+
+
+def test_cancelled_leader_cancels_its_joiners():
+    cache = BlueprintCache()
+
+    async def run():
+        leader = asyncio.ensure_future(cache.get_or_load("key", _LLM(delay=10)))
+        await asyncio.sleep(0)
+        joiner = asyncio.ensure_future(cache.get_or_load("key", _LLM()))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.gather(leader, joiner, return_exceptions=True)
+
+    assert all(isinstance(r, asyncio.CancelledError) for r in asyncio.run(run()))
+    assert cache.stats()["inflight"] == 0
+
+
+def test_entries_expire_after_ttl():
+    clock = _Clock()
+    cache = BlueprintCache(ttl=60, clock=clock)
+    asyncio.run(cache.put("key", BLUEPRINT))
+    clock.now += 59
+    assert asyncio.run(cache.get("key")) == BLUEPRINT
+    clock.now += 2
+    assert asyncio.run(cache.get("key")) is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_go_past_the_caps():
+    payload = len(orjson.dumps(BLUEPRINT))
+    cache = BlueprintCache(max_entries=10, max_bytes=3 * payload)
+
+    async def run():
+        for key in "abc":
+            await cache.put(key, BLUEPRINT)
+        await cache.get("a")  # b is now the least recently used
+        await cache.put("d", BLUEPRINT)
+        return [key for key in "abcd" if await cache.get(key) is not None]
+
+    assert asyncio.run(run()) == ["a", "c", "d"]
+    assert cache.stats()["bytes"] == 3 * payload and cache.stats()["evictions"] == 1
+
+    small = BlueprintCache(max_entries=2)
+    for key in "xyz":
+        asyncio.run(small.put(key, BLUEPRINT))
+    assert small.stats()["entries"] == 2 and asyncio.run(small.get("x")) is None
+
+
+def test_oversized_payload_is_not_cached():
+    cache = BlueprintCache(max_bytes=10)
+    asyncio.run(cache.put("key", BLUEPRINT))
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    asyncio.run(BlueprintCache(disk_dir=str(tmp_path)).put("key", BLUEPRINT))
+    restarted = BlueprintCache(disk_dir=str(tmp_path))
+    assert asyncio.run(restarted.get("key")) == BLUEPRINT
+    assert restarted.stats()["disk_hits"] == 1 and restarted.stats()["entries"] == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["key.json"]  # no temp files left
+
+
+def test_disk_entries_expire_by_age(tmp_path):
+    asyncio.run(BlueprintCache(disk_dir=str(tmp_path)).put("key", BLUEPRINT))
+    old = time.time() - 120
+    os.utime(tmp_path / "key.json", (old, old))
+    assert asyncio.run(BlueprintCache(ttl=60, disk_dir=str(tmp_path)).get("key")) is None
+    assert not (tmp_path / "key.json").exists()
+
+
+def test_keys_separate_models_and_prompt_versions():
+    keys = {make_key("a city", "m1", "v1"), make_key("a city", "m2", "v1"), make_key("a city", "m1", "v2")}
+    assert len(keys) == 3 and make_key("a city", "m1", "v1") in keys
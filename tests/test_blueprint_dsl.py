@@ -0,0 +1,101 @@
+# tests/test_blueprint_dsl.py
+import random
+
+import pytest
+
+from app.llm.blueprint_dsl import (
+    DEFAULT_PIECE, MAX_BUILDINGS, MAX_FLOORS, MAX_ROAD_PIECES, PIECE_CODES, ROAD_NAMES, DSLError, compact, expand,
+    validate_blueprint,
+)
+
+
+def _blueprint(seed: int) -> dict:
+    rng = random.Random(seed)
+    names = sorted(ROAD_NAMES)
+    roads = []
+    while len(roads) < 60:
+        block = [rng.choice(names) for _ in range(rng.randint(1, 4))]
+        roads += block * rng.randint(1, 4)  # repeats for compact() to group
+    return {
+        "layout": {
+            "buildings": [rng.randint(1, 6) for _ in range(rng.randint(0, 12))],
+            "road_sequence": roads,
+            "forest_density": rng.choice([0.0, 0.05, 0.2, 1.0]),
+        },
+        "environment": {"time": rng.choice([0.0, 6.5, 14.0, 24.0]), "brightness": rng.choice([0.0, 2.0, 10.0])},
+    }
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compact_expand_round_trip(seed):
+    blueprint = _blueprint(seed)
+    assert expand(compact(blueprint)) == blueprint
+
+
+def test_compact_groups_repeats():
+    blueprint = _blueprint(0)
+    blueprint["layout"]["road_sequence"] = ["straight"] * 6 + ["turn_90", "straight", "straight"] * 3
+    text = compact(blueprint)
+    assert "R S*6 (T S*2)*3;" in text
+    assert expand(text)["layout"]["road_sequence"] == blueprint["layout"]["road_sequence"]
+
+
+def test_every_code_expands():
+    for code, name in PIECE_CODES.items():
+        assert expand(f"R {code}")["layout"]["road_sequence"] == [name]
+
+
+def test_unknown_road_names_compact_to_the_default_piece():
+    blueprint = _blueprint(1)
+    blueprint["layout"]["road_sequence"] = ["straight", "warp_drive", "turn_90", None]
+    roads = expand(compact(blueprint))["layout"]["road_sequence"]
+    assert roads == ["straight", DEFAULT_PIECE, "turn_90", DEFAULT_PIECE]
+
+
+@pytest.mark.parametrize("text", [
+    "B 3",                              # no road section
+    "R S*2; R T",                       # section twice
+    "R S (T",                           # unbalanced group
+    "R S T)",
+    "R WARP",                           # unknown piece
+    "B 0; R S",                         # floors out of range
+    "R S; F 1.5",                       # forest out of range
+    "R S; E 12",                        # E takes two numbers
+    f"R (S*{MAX_ROAD_PIECES})*2",       # too many pieces
+    "X 1; R S",
+])
+def test_malformed_text_is_rejected(text):
+    with pytest.raises(DSLError):
+        expand(text)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_expanded_blueprints_validate(seed):
+    blueprint = _blueprint(seed)
+    assert validate_blueprint(expand(compact(blueprint))) == blueprint
+
+
+@pytest.mark.parametrize("layout", [
+    {"buildings": ["3"]},
+    {"buildings": [MAX_FLOORS + 1]},
+    {"buildings": [10 ** 6]},
+    {"buildings": [0]},
+    {"buildings": [2.5]},
+    {"buildings": [True]},
+    {"buildings": [2] * (MAX_BUILDINGS + 1)},
+    {"buildings": 3},
+    {"road_sequence": ["straight"] * (MAX_ROAD_PIECES + 1)},
+    {"road_sequence": ["straight", 7]},
+    {"forest_density": "dense"},
+    {"forest_density": 1.5},
+])
+def test_json_blueprint_outside_the_dsl_limits_is_rejected(layout):
+    with pytest.raises(DSLError):
+        validate_blueprint({"layout": layout})
+
+
+def test_json_environment_and_shape_are_checked():
+    for blueprint in ([], {"layout": []}, {"environment": {"time": 25}}, {"environment": {"brightness": float("nan")}}):
+        with pytest.raises(DSLError):
+            validate_blueprint(blueprint)
+    assert validate_blueprint({"layout": {"road_sequence": None}}) == {"layout": {"road_sequence": None}}
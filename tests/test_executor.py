@@ -0,0 +1,130 @@
+# tests/test_executor.py
+import asyncio
+
+import pytest
+
+from app.core.executor import BATCH, INTERACTIVE, JobExecutor, QueueFull
+from app.middleware.admission import AdmissionControl
+
+
+def _run(scenario, **kwargs):
+    """Runs `scenario(executor)` on a started executor, stopping it afterwards."""
+    async def main():
+        executor = JobExecutor(cpu_workers=0, **kwargs)
+        await executor.start()
+        try:
+            return await scenario(executor)
+        finally:
+            await executor.stop()
+    return asyncio.run(main())
+
+
+def _blocker(gate: asyncio.Event, started: list, name):
+    async def job():
+        started.append(name)
+        await gate.wait()
+        return name
+    return job
+
+
+def test_full_queue_raises_queue_full():
+    async def scenario(executor):
+        gate, started = asyncio.Event(), []
+        running = executor.submit(_blocker(gate, started, "running"), BATCH)
+        await asyncio.sleep(0)  # the only worker takes it
+        queued = [executor.submit(_blocker(gate, started, n), BATCH) for n in range(3)]
+        with pytest.raises(QueueFull):
+            executor.submit(_blocker(gate, started, "one too many"), BATCH)
+        with pytest.raises(QueueFull):
+            executor.ensure_capacity(1)
+        gate.set()
+        assert await asyncio.gather(running, *queued) == ["running", 0, 1, 2]
+        executor.ensure_capacity(3)  # drained
+        return executor.stats()
+
+    stats = _run(scenario, max_queue=3, workers=1, interactive_workers=0)
+    assert stats["rejected"] == 2 and stats["completed"] == 4
+
+
+def test_interactive_jumps_queued_batch_work():
+    async def scenario(executor):
+        gate, started = asyncio.Event(), []
+        first = executor.submit(_blocker(gate, started, "first"), BATCH)
+        await asyncio.sleep(0)
+        jobs = [executor.submit(_blocker(gate, started, f"batch{n}"), BATCH) for n in range(2)]
+        jobs.append(executor.submit(_blocker(gate, started, "interactive"), INTERACTIVE))
+        gate.set()
+        await asyncio.gather(first, *jobs)
+        return started
+
+    assert _run(scenario, workers=1, interactive_workers=0) == ["first", "interactive", "batch0", "batch1"]
+
+
+def test_reserved_workers_never_take_batch_work():
+    async def scenario(executor):
+        gate, started = asyncio.Event(), []
+        batch = [executor.submit(_blocker(gate, started, f"batch{n}"), BATCH) for n in range(5)]
+        await asyncio.sleep(0.01)
+        assert sorted(started) == ["batch0", "batch1"] and executor.queued(BATCH) == 3
+        interactive = await asyncio.wait_for(executor.run(lambda: asyncio.sleep(0, "fast"), INTERACTIVE), 1.0)
+        gate.set()
+        await asyncio.gather(*batch)
+        return interactive
+
+    assert _run(scenario, workers=4, interactive_workers=2) == "fast"
+
+
+def test_reservation_leaves_one_batch_worker():
+    assert JobExecutor(workers=4, interactive_workers=10).interactive_workers == 3
+
+
+def test_cancelled_queued_job_never_runs_and_releases_its_lease():
+    control = AdmissionControl(max_inflight=10, client_rate=100, client_burst=100)
+
+    async def scenario(executor):
+        gate, started = asyncio.Event(), []
+        running = control.admit("client", 1).release_when_done(executor.submit(_blocker(gate, started, "running")))
+        await asyncio.sleep(0)
+        queued = control.admit("client", 1).release_when_done(executor.submit(_blocker(gate, started, "queued")))
+        queued.cancel()
+        running.cancel()  # cancels the running job too
+        await asyncio.sleep(0.01)
+        assert control.leases == 0
+        gate.set()
+        assert (await asyncio.gather(executor.submit(_blocker(gate, started, "next")))) == ["next"]
+        return started, executor.stats()
+
+    started, stats = _run(scenario, workers=1, interactive_workers=0)
+    assert started == ["running", "next"] and stats["cancelled"] == 1 and stats["completed"] == 1
+
+
+def test_stop_cancels_queued_jobs():
+    control = AdmissionControl(max_inflight=10, client_rate=100, client_burst=100)
+
+    async def main():
+        executor = JobExecutor(cpu_workers=0, workers=1, interactive_workers=0)
+        await executor.start()
+        gate, started = asyncio.Event(), []
+        jobs = [control.admit("client", 1).release_when_done(executor.submit(_blocker(gate, started, n))) for n in range(3)]
+        await asyncio.sleep(0)
+        await executor.stop()
+        await asyncio.sleep(0)
+        return jobs
+
+    jobs = asyncio.run(main())
+    assert all(job.cancelled() for job in jobs) and control.leases == 0
+
+
+def test_failures_reach_the_submitter_and_metrics_are_reported():
+    async def scenario(executor):
+        reported = []
+
+        async def fail():
+            raise ValueError("bad blueprint")
+
+        with pytest.raises(ValueError):
+            await executor.run(fail, BATCH, reported.append)
+        return reported, executor.stats()
+
+    reported, stats = _run(scenario, workers=2, interactive_workers=1)
+    assert stats["failed"] == 1 and set(reported[0]) == {"queue_wait_ms", "run_ms"}
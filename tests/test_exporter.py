@@ -0,0 +1,69 @@
+# tests/test_exporter.py
+import gzip
+import json
+import lzma
+import os
+
+import pytest
+
+from app.core import exporter
+from app.core.executor import compile_to_json
+from app.core.scene_binary import BinaryScene
+from app.core.scene_compiler import compile_scene
+from app.settings import settings
+
+BLUEPRINT = {"layout": {"buildings": [2, 4], "road_sequence": ["straight", "turn_90"] * 3, "forest_density": 0.2}}
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("fmt,compression", [("json", None), ("json", "gzip"), ("cbx", None), ("cbx", "lzma")])
+def test_reexport_is_a_no_op(export_dir, monkeypatch, fmt, compression):
+    scene = compile_scene(BLUEPRINT, seed=5)
+    path = exporter.export_scene(scene, fmt, compression)
+    mtime = os.stat(path).st_mtime_ns
+
+    def no_writes(*args, **kwargs):
+        raise AssertionError("re-export opened a temp file")
+
+    monkeypatch.setattr(exporter.tempfile, "mkstemp", no_writes)
+    assert exporter.export_scene(compile_scene(BLUEPRINT, seed=5), fmt, compression) == path
+    assert os.listdir(export_dir) == [os.path.basename(path)]
+    assert os.stat(path).st_mtime_ns == mtime
+    assert os.stat(path).st_mode & 0o777 == exporter.FILE_MODE
+
+
+def test_exported_files_decode_to_the_scene(export_dir):
+    scene = compile_scene(BLUEPRINT, seed=5)
+    expected = json.loads(compile_to_json(BLUEPRINT, 5))
+    with gzip.open(exporter.export_scene(scene, "json", "gzip")) as f:
+        assert json.load(f) == expected
+    with lzma.open(exporter.export_scene(scene, "cbx", "lzma")) as f:
+        assert BinaryScene(f.read()).to_scene() == expected
+
+
+def test_different_scenes_get_different_names(export_dir):
+    paths = {exporter.export_scene(compile_scene(BLUEPRINT, seed=seed)) for seed in range(4)}
+    paths.add(exporter.export_scene(compile_scene(BLUEPRINT, seed=0), "cbx"))
+    assert len(paths) == 5 and sorted(os.listdir(export_dir)) == sorted(os.path.basename(p) for p in paths)
+
+
+def test_failed_write_leaves_nothing_behind(export_dir, monkeypatch):
+    def fail(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(exporter.os, "fsync", fail)
+    with pytest.raises(OSError):
+        exporter.export_scene(compile_scene(BLUEPRINT, seed=5))
+    assert os.listdir(export_dir) == []
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        exporter.export_scene({}, "obj")
+    with pytest.raises(ValueError):
+        exporter.export_scene({}, "json", "zip")
@@ -0,0 +1,54 @@
+# tests/test_intent_parser.py
+import pytest
+
+from app.core.intent_parser import parse_edit, parse_local
+from app.llm.blueprint_dsl import MAX_BUILDINGS, MAX_ROAD_PIECES
+from app.settings import settings
+
+
+def _local(text):
+    blueprint, confidence = parse_local(text)
+    return blueprint is not None and confidence >= settings.LOCAL_INTENT_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", [
+    "complex road with loop and a dense forest",             # "complex" is not understood
+    "3 buildings with no roads",                             # negation no rule handles
+    "mountain race track with a tunnel and trees at night",
+    "a city but not a loop",
+])
+def test_partly_understood_prompts_go_to_the_llm(text):
+    assert not _local(text)
+
+
+@pytest.mark.parametrize("text", [
+    "3 buildings with 4 floors",
+    "roads only",
+    "a loop track at night",
+    "five buildings and a forest",
+    "a race track with no trees",                            # negation consumed by a rule
+])
+def test_fully_understood_prompts_stay_local(text):
+    assert _local(text)
+
+
+def test_confidence_ignores_filler_words():
+    # 4 meaningful words (complex, loop, dense, forest), 1 unknown
+    assert parse_local("complex road with loop and a dense forest")[1] == pytest.approx(0.75)
+
+
+def test_local_blueprint():
+    blueprint, _ = parse_local("3 buildings with 4 floors at night")
+    assert blueprint["layout"]["buildings"] == [4, 4, 4]
+    assert blueprint["environment"] == {"time": 22.0, "brightness": 2.0}
+
+
+def test_edit_phrases():
+    assert parse_edit("add two more buildings") == {"append": {"buildings": [3, 3]}}
+    assert parse_edit("remove the trees") == {"layout": {"forest_density": 0.0}}
+    assert parse_edit("add two more buildings but no roads") is None
+
+
+def test_edit_counts_are_capped():
+    assert parse_edit("add 50000 more buildings")["append"]["buildings"] == [3] * MAX_BUILDINGS
+    assert len(parse_edit("extend the track by 200000 segments")["append"]["road_sequence"]) == MAX_ROAD_PIECES
@@ -0,0 +1,39 @@
+# tests/test_job_store.py
+import pytest
+
+from app.core.job_store import MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    limits = dict(ttl=60.0, max_results=2, scene_ttl=60.0)
+    if request.param == "memory":
+        return MemoryJobStore(**limits)
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), **limits)
+
+
+def test_scenes_are_versioned_apart_from_jobs(store):
+    store.create_scene("s", b"v0", 0)
+    assert store.get("s") is None and store.get_result("s") is None
+    assert store.save_scene("s", b"v1", 1, expected=0)
+    assert not store.save_scene("s", b"v1'", 1, expected=0)  # another edit saved first
+    assert store.get_scene("s") == (1, b"v1") and store.get_scene_version("s") == 1
+    assert not store.save_scene("unknown", b"v1", 1, expected=0)
+    assert store.get_scene("unknown") is None and store.get_scene_version("unknown") is None
+
+
+def test_job_results_never_evict_scenes(store):
+    store.create_scene("s", b"record", 0)
+    for n in range(5):
+        store.create(f"job{n}")
+        store.set_result(f"job{n}", b"x" * 10)
+    store.evict()
+    assert len(store) == 2
+    assert store.get_scene("s") == (0, b"record")
+
+
+def test_idle_scenes_expire(store):
+    store.create_scene("s", b"record", 0)
+    store.scene_ttl = -1.0
+    store.evict()
+    assert store.get_scene("s") is None
@@ -0,0 +1,125 @@
+# tests/test_jobs_api.py
+import json
+import time
+
+import pytest
+
+from app.core.job_store import FINISHED, SQLiteJobStore
+
+LIMITS = dict(ttl=60.0, max_results=2)
+PROMPTS = ["3 buildings with 2 floors", "a track with a loop", "a dense forest at night"]
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    """The app's job store, an SQLite file the test can open a second connection to."""
+    from app.core import job_manager
+
+    shared = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), **LIMITS)
+    monkeypatch.setattr(job_manager, "STORE", shared)
+    return shared
+
+
+def _finished(client, job_id: str, timeout: float = 10.0) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/ai/status/{job_id}").json()["status"]
+        if status in FINISHED:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {status}")
+
+
+def _run(client, text: str) -> str:
+    job_id = client.post("/ai/command", json={"text": text}).json()["job_id"]
+    assert _finished(client, job_id) == "done"
+    return job_id
+
+
+# ==============================================================================
+# JOB STORE
+# ==============================================================================
+def test_jobs_are_visible_to_other_connections(store, client):
+    other = SQLiteJobStore(store.path, **LIMITS)  # another worker's connection
+    job_id = _run(client, PROMPTS[0])
+    assert other.get(job_id)["status"] == "done"
+    assert other.get_result(job_id) == store.get_result(job_id)
+
+    other.create("elsewhere")
+    other.append_log("elsewhere", "Queued")
+    assert client.get("/ai/status/elsewhere").json()["logs"] == ["Queued"]
+    other.set_result("elsewhere", store.get_result(job_id))
+    assert client.get("/ai/result/elsewhere").json() == client.get(f"/ai/result/{job_id}").json()
+
+
+def test_evicted_jobs_are_gone_for_every_worker(store, client):
+    jobs = [_run(client, text) for text in PROMPTS]
+    SQLiteJobStore(store.path, **LIMITS).evict()  # run by another worker
+
+    assert client.get(f"/ai/status/{jobs[0]}").json() == {"status": "unknown"}
+    assert client.get(f"/ai/result/{jobs[0]}").json() == {"status": "processing"}
+    for job_id in jobs[1:]:
+        assert "PlaceableAssets" in client.get(f"/ai/result/{job_id}").json()
+    assert len(store) == LIMITS["max_results"]
+
+
+# ==============================================================================
+# EVENTS
+# ==============================================================================
+def _events(client, job_id: str) -> list:
+    """(event, data) pairs of the job's SSE stream, heartbeats dropped."""
+    with client.stream("GET", f"/ai/events/{job_id}") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.read().decode()
+    frames = [frame for frame in body.split("\n\n") if frame and not frame.startswith(":")]
+    return [
+        (event[len("event: "):], json.loads(data[len("data: "):]))
+        for event, data in (frame.split("\n") for frame in frames)
+    ]
+
+
+def test_events_follow_the_job_to_its_result(store, client):
+    job_id = client.post("/ai/command", json={"text": PROMPTS[1]}).json()["job_id"]
+    events = _events(client, job_id)
+
+    statuses = [data["status"] for event, data in events if event == "status"]
+    assert statuses[-1] == "done" and len(statuses) == len(set(statuses))
+    assert set(statuses) <= {"queued", "running", "done"}
+    logs = [data["message"] for event, data in events if event == "log"]
+    assert logs == client.get(f"/ai/status/{job_id}").json()["logs"]
+    assert events[-1] == ("result", {"url": f"/ai/result/{job_id}"})
+    assert events[-2] == ("status", {"status": "done"})
+
+
+def test_events_of_an_unknown_job(client):
+    assert _events(client, "missing") == [("status", {"status": "unknown"})]
+
+
+# ==============================================================================
+# BATCHES
+# ==============================================================================
+def test_batch_reports_a_failing_prompt_beside_the_others(store, client, monkeypatch):
+    from app.api import routes
+
+    parse_intent = routes.parse_intent
+
+    async def failing_parse(text):
+        if text == "broken prompt":
+            raise RuntimeError("model unavailable")
+        return await parse_intent(text)
+
+    monkeypatch.setattr(routes, "parse_intent", failing_parse)
+    prompts = [PROMPTS[0], "broken prompt", PROMPTS[1], PROMPTS[0]]
+    batch = client.post("/ai/batch", json={"prompts": prompts}).json()
+    assert (batch["items"], batch["unique"]) == (4, 3)
+
+    deadline = time.monotonic() + 10.0
+    while (status := client.get(f"/ai/batch/{batch['batch_id']}").json())["status"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert status["counts"] == {"done": 2, "error": 1}
+    assert [item["status"] for item in status["items"]] == ["done", "error", "done", "done"]
+    failed = status["items"][1]["job_id"]
+    assert client.get(f"/ai/status/{failed}").json()["logs"][-1] == "Failed: RuntimeError"
+    assert client.get(f"/ai/result/{failed}").json() == {"status": "processing"}
+    assert "PlaceableAssets" in client.get(status["items"][2]["result"]).json()
@@ -0,0 +1,51 @@
+# tests/test_metrics.py
+import re
+
+TEXT = "3 buildings with 2 floors"
+SAMPLE = re.compile(r'^(cobox_\w+)(\{(\w+="[^"]*")(,\w+="[^"]*")*\})? (\S+)$')
+TIMING = re.compile(r'^(\w+);dur=\d+\.\d\d(;desc="(\d+) actors")?$')
+
+
+def _families(text: str) -> dict:
+    """name -> (type, [(sample name, labels, value), ...]) from Prometheus text format."""
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            current = line.split()[2]
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name == current  # TYPE follows its HELP line
+            families[name] = (kind, [])
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            assert match.group(1).startswith(current)
+            families[current][1].append((match.group(1), match.group(2) or "", float(match.group(5))))
+    return families
+
+
+def test_server_timing_lists_the_pipeline_stages(client):
+    response = client.post("/ai/instant", json={"text": TEXT})
+    entries = [TIMING.match(part) for part in response.headers["Server-Timing"].split(", ")]
+    assert all(entries), response.headers["Server-Timing"]
+    stages = {entry.group(1): int(entry.group(3) or 0) for entry in entries}
+    assert list(stages)[-1] == "total"
+    assert {"sanitize", "intent", "buildings", "roads", "serialize"} <= set(stages)
+    assert stages["buildings"] == 3 * (2 * 5 + 1)  # 5 parts per floor, then the ceiling
+
+
+def test_metrics_are_prometheus_text(client):
+    client.post("/ai/instant", json={"text": TEXT})
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert response.text.endswith("\n")
+    families = _families(response.text)
+
+    assert families["cobox_stage_actors_total"][0] == "counter"
+    assert families["cobox_admission_inflight_cost"] == ("gauge", [("cobox_admission_inflight_cost", "", 0.0)])
+    kind, samples = families["cobox_request_seconds"]
+    assert kind == "histogram"
+    instant = [(name, value) for name, labels, value in samples if 'route="/ai/instant"' in labels]
+    buckets = [value for name, value in instant if name.endswith("_bucket")]
+    assert buckets == sorted(buckets) and buckets[-1] >= 1  # cumulative, +Inf last
+    assert buckets[-1] == next(value for name, value in instant if name.endswith("_count"))
@@ -0,0 +1,40 @@
+# tests/test_openai_client.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm.blueprint_dsl import DSLError
+from app.llm.openai_client import OpenAIClient
+
+
+class _Completions:
+    def __init__(self, content: str):
+        self.content = content
+
+    async def create(self, **request):
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _client(content: str, fmt: str = "json") -> OpenAIClient:
+    client = OpenAIClient(fmt=fmt)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=_Completions(content)))
+    return client
+
+
+def test_json_completion_is_returned():
+    blueprint = {"layout": {"buildings": [2, 4], "road_sequence": ["straight", "turn_90"]}}
+    assert asyncio.run(_client(json.dumps(blueprint)).parse_intent("two buildings")) == blueprint
+
+
+@pytest.mark.parametrize("layout", [{"buildings": [10 ** 6]}, {"buildings": ["3"]}, {"buildings": [2] * 10 ** 6}])
+def test_json_completion_outside_the_limits_raises(layout):
+    with pytest.raises(DSLError):
+        asyncio.run(_client(json.dumps({"layout": layout})).parse_intent("a tower"))
+
+
+def test_dsl_completion_outside_the_limits_raises():
+    with pytest.raises(DSLError):
+        asyncio.run(_client("B 1000; R S", fmt="dsl").parse_intent("a tower"))
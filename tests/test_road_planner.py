@@ -0,0 +1,98 @@
+# tests/test_road_planner.py
+import time
+
+import pytest
+
+from app.core.scene_compiler import GRID_UNIT, ROAD_PLANNER, road_start
+
+START = road_start([])
+LOOPS = [["turn_90"] * 4, ["straight", "turn_90"] * 4, ["straight", "straight", "turn_90"] * 4]
+
+
+def _crossings(plan) -> int:
+    """Pieces sharing a cell at the same height with an earlier, non-adjacent piece (closing piece excepted)."""
+    last = len(plan.footprints) - 1
+    count = 0
+    for i, footprint in enumerate(plan.footprints):
+        earlier = {
+            cell: z for j, other in enumerate(plan.footprints[:max(0, i - 1)]) if not (i == last and j == 0)
+            for cell, z in other
+        }
+        count += any(cell in earlier and abs(z - earlier[cell]) < ROAD_PLANNER.clearance for cell, z in footprint)
+    return count
+
+
+def _node_bound(pieces: int) -> int:
+    """Candidate checks the planner's docstring allows for `pieces` pieces."""
+    widest = max(len(ROAD_PLANNER.candidates(key)) for key in ROAD_PLANNER.road_db)
+    return (
+        pieces * (widest + ROAD_PLANNER.search_per_piece) + ROAD_PLANNER.max_search + ROAD_PLANNER.max_nodes
+    )
+
+
+@pytest.mark.parametrize("intents", LOOPS)
+def test_closed_loop_is_kept_as_requested(intents):
+    plan = ROAD_PLANNER.plan(intents, START)
+    assert plan.keys == intents
+    assert plan.substituted == plan.unresolved == 0
+
+
+@pytest.mark.parametrize("intents", LOOPS)
+def test_loop_not_ending_at_the_start_is_repaired(intents):
+    elsewhere = (START[0] + 100 * GRID_UNIT, 0, 0, 0.0, START[4])
+    plan = ROAD_PLANNER.plan(intents, START, start=elsewhere)
+    assert plan.keys != intents and plan.substituted > 0
+    assert plan.unresolved == 0
+
+
+@pytest.mark.parametrize("intents", [["turn_90"] * 8, ["u_turn"] * 50])
+def test_self_crossing_track_is_repaired(intents):
+    plan = ROAD_PLANNER.plan(intents, START)
+    assert len(plan.keys) == len(intents) and plan.substituted > 0
+    assert plan.unresolved == _crossings(plan) == 0
+
+
+def test_static_obstacles_are_avoided():
+    x = int(START[0] / GRID_UNIT) + 4
+    wall = {(x, y) for y in range(-1, 2)}
+    plan = ROAD_PLANNER.plan(["straight"] * 10, START, blocked=lambda gx, gy: (gx, gy) in wall)
+    assert plan.unresolved == 0 and plan.substituted > 0
+    assert not any(cell in wall for footprint in plan.footprints for cell, _ in footprint)
+
+
+def test_dead_end_keeps_the_requested_pieces():
+    plan = ROAD_PLANNER.plan(["straight", "turn_90"] * 10, START, blocked=lambda gx, gy: True)
+    assert plan.keys == ["straight", "turn_90"] * 10
+    assert plan.unresolved == 20 and plan.substituted == 0
+    assert plan.nodes <= _node_bound(20)
+
+
+def test_boxed_in_track_plans_within_budget():
+    started = time.perf_counter()
+    plan = ROAD_PLANNER.plan(["turn_90"] * 1000, START)
+    assert time.perf_counter() - started < 5.0
+    assert len(plan.keys) == 1000
+    assert plan.nodes <= _node_bound(1000)
+    assert plan.unresolved == _crossings(plan) > 0
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 50])
+def test_session_in_chunks_matches_plan(size):
+    intents = (["straight", "turn_90", "u_turn", "turn_90", "straight"] * 30)[:120]
+    whole = ROAD_PLANNER.plan(intents, START)
+    session = ROAD_PLANNER.session(START)
+    settled = 0
+    for begin in range(0, len(intents), size):
+        final = session.extend(intents[begin:begin + size])
+        assert final >= settled
+        assert session.keys[:settled] == whole.keys[:settled]
+        settled = final
+    plan = session.finish()
+    assert plan.keys == whole.keys and plan.footprints == whole.footprints
+    assert (plan.substituted, plan.unresolved) == (whole.substituted, whole.unresolved)
+
+
+def test_unknown_pieces_plan_as_the_default():
+    plan = ROAD_PLANNER.plan(["warp_drive", "straight"], START)
+    assert plan.keys == [ROAD_PLANNER.default_key, "straight"]
+    assert plan.substituted == 0
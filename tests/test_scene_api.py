@@ -0,0 +1,40 @@
+# tests/test_scene_api.py
+import pytest
+
+from app.llm.blueprint_dsl import MAX_BUILDINGS, MAX_ROAD_PIECES
+
+
+def _scene(client, text: str = "3 buildings with 4 floors") -> str:
+    response = client.post("/ai/scenes", json={"text": text})
+    assert response.status_code == 200
+    return response.headers["X-Scene-Id"]
+
+
+def test_text_edit_adds_buildings(client):
+    scene_id = _scene(client)
+    response = client.post(f"/ai/scenes/{scene_id}/edit", json={"text": "add two more buildings"})
+    assert response.status_code == 200
+    assert response.json()["version"] == 1 and "buildings" in response.json()["stages"]
+
+
+@pytest.mark.parametrize("text", ["add 50000 more buildings", "extend the track by 200000 segments"])
+def test_oversized_text_edit_is_refused(client, text):
+    scene_id = _scene(client)
+    response = client.post(f"/ai/scenes/{scene_id}/edit", json={"text": text})
+    assert response.status_code == 422
+    assert client.get(f"/ai/scenes/{scene_id}").headers["X-Scene-Version"] == "0"
+
+
+def test_edits_can_not_grow_a_scene_past_the_limits(client):
+    scene_id = _scene(client)
+    delta = {"append": {"buildings": [2] * MAX_BUILDINGS}}
+    assert client.post(f"/ai/scenes/{scene_id}/edit", json={"delta": delta}).status_code == 422
+    delta = {"append": {"road_sequence": ["straight"] * (MAX_ROAD_PIECES + 1)}}
+    assert client.post(f"/ai/scenes/{scene_id}/edit", json={"delta": delta}).status_code == 422
+
+
+@pytest.mark.parametrize("path", ["", "/tiles", "/tiles/0/0", "/tiles/range"])
+def test_scene_ids_are_not_job_results(client, path):
+    scene_id = _scene(client)
+    response = client.get(f"/ai/result/{scene_id}{path}")
+    assert response.status_code == 200 and "PlaceableAssets" not in response.json()
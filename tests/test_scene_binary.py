@@ -0,0 +1,74 @@
+# tests/test_scene_binary.py
+import json
+
+import orjson
+import pytest
+
+from app.core.executor import compile_to_json
+from app.core.scene_binary import BinaryScene, binary_to_json, encode_binary, json_to_binary
+from app.core.scene_compiler import compile_scene
+
+BLUEPRINTS = [
+    {"layout": {}},
+    {"layout": {"buildings": [2, 5, 1], "road_sequence": ["straight", "turn_90", "loop_360", "u_turn"]}},
+    {
+        "layout": {"buildings": [3] * 12, "road_sequence": ["straight", "ramp_gentle"] * 20, "forest_density": 0.3},
+        "environment": {"time": 20.0, "brightness": 2.5},
+    },
+]
+
+
+@pytest.mark.parametrize("blueprint", BLUEPRINTS)
+def test_cbx_decodes_to_the_json_scene(blueprint):
+    scene = BinaryScene(encode_binary(compile_scene(blueprint, seed=11)))
+    assert scene.to_scene() == json.loads(compile_to_json(blueprint, 11))
+
+
+@pytest.mark.parametrize("blueprint", BLUEPRINTS)
+def test_range_reads_match_the_whole_buffer(blueprint):
+    payload = encode_binary(compile_scene(blueprint, seed=11))
+    reads = []
+
+    def read(offset, length):
+        reads.append(length)
+        return payload[offset:offset + length]
+
+    whole, ranged = BinaryScene(payload), BinaryScene.head(read)
+    assert ranged.meta == whole.meta and len(ranged) == len(whole)
+    assert sum(reads) < len(payload) or len(whole) == 0  # records are not read up front
+    assert ranged[2:9] == whole[2:9] and ranged[-1] == whole[-1]
+    assert list(ranged) == list(whole)
+    assert ranged.batch(1, 6).columns()["x"].tolist() == whole.batch(1, 6).columns()["x"].tolist()
+
+
+def test_batch_keeps_columns():
+    scene = compile_scene(BLUEPRINTS[2], seed=3)
+    batch = BinaryScene(encode_binary(scene)).batch()
+    original = scene["PlaceableAssets"]
+    for name in ("asset", "stage", "x", "y", "z", "yaw"):
+        assert batch.columns()[name].tolist() == original.columns()[name].tolist()
+
+
+def test_dict_actors_round_trip_losslessly(tmp_path):
+    actor = {
+        "AssetClass": "BP_Custom_C",
+        "AssetClassPath": "/Game/Custom/BP_Custom",
+        "Transform": {
+            "Location": {"X": 1.5, "Y": -2.0, "Z": 3.25},
+            "Rotation": {"Pitch": 10.0, "Yaw": 20.0, "Roll": 30.0},
+            "Scale": {"X": 2.0, "Y": 1.0, "Z": 0.5},
+        },
+        "OcaData": {"CollisionProfile": "NoCollision", "Physics": True, "Shadow": False},
+    }
+    doc = {"PlaceableAssets": [actor, actor], "GeometryAssets": []}
+    src = tmp_path / "scene.json"
+    src.write_bytes(orjson.dumps(doc))
+    json_to_binary(src, tmp_path / "scene.cbx")
+    binary_to_json(tmp_path / "scene.cbx", tmp_path / "back.json")
+    assert json.loads((tmp_path / "back.json").read_bytes()) == doc
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        BinaryScene(b"JUNK" + bytes(100))
+    assert BinaryScene.head(lambda offset, length: None) is None
@@ -0,0 +1,148 @@
+# tests/test_scene_compiler.py
+import math
+
+import numpy as np
+import pytest
+
+from app.core.actor_batch import STAGES, ActorBatch
+from app.core.occupancy import LotAllocator, OccupancyGrid
+from app.core.scene_compiler import (
+    BUILDING_RADIUS, FLOOR_HEIGHT, GRID_UNIT, ROAD_DB, TYPE_SOLID,
+    _building_stage, _forest_batch, compile_scene, road_start,
+)
+
+LIBRARY = "/WorldBuilder/Core/Actors/Placeable/Library"
+FOREST = {"layout": {"buildings": [3, 1, 2], "road_sequence": ["straight", "turn_90"], "forest_density": 0.3}}
+ROADS = ["straight", "straight", "turn_90", "pin_t_junction", "straight", "ramp_gentle", "turn_slight"]
+
+
+# ==============================================================================
+# BASELINE ACTOR DICTS (as the per-actor compiler built them)
+# ==============================================================================
+def _part(folder: str, name: str) -> dict:
+    return {"class": f"{name}_C", "path": f"{LIBRARY}/{folder}/{name}.{name}_C"}
+
+
+def _baseline_actor(asset, x, y, z, yaw=0.0) -> dict:
+    return {
+        "AssetClass": asset["class"],
+        "AssetClassPath": asset["path"],
+        "Transform": {
+            "Location": {"X": float(x), "Y": float(y), "Z": float(z)},
+            "Rotation": {"Pitch": 0.0, "Yaw": float(yaw), "Roll": 0.0},
+            "Scale": {"X": 1.0, "Y": 1.0, "Z": 1.0}
+        },
+        "OcaData": {"CollisionProfile": "BlockAllDynamic", "Physics": False, "Shadow": True}
+    }
+
+
+def _baseline_building(floors: int, lot_x: int, lot_y: int) -> list:
+    floor, wall = _part("Floor", "BP_FloorAsset_Wb_05"), _part("Wall", "BP_WallAsset_Wb_02")
+    bx, by = lot_x * GRID_UNIT, lot_y * GRID_UNIT
+    actors = []
+    for f in range(floors):
+        z = f * FLOOR_HEIGHT
+        actors.append(_baseline_actor(floor, bx, by, z))
+        actors.append(_baseline_actor(wall, bx + 300, by, z, 90))
+        actors.append(_baseline_actor(wall, bx - 300, by, z, 270))
+        actors.append(_baseline_actor(wall, bx, by + 300, z, 0))
+        actors.append(_baseline_actor(wall, bx, by - 300, z, 180))
+    actors.append(_baseline_actor(_part("Ceiling", "BP_CeilingAsset_Wb_01"), bx, by, floors * FLOOR_HEIGHT))
+    return actors
+
+
+def _baseline_roads(intents) -> list:
+    rx, ry, rz = 6 * GRID_UNIT, 0, 0
+    r_yaw, connector = 0.0, TYPE_SOLID
+    actors = []
+    for intent in intents:
+        target = ROAD_DB[intent]
+        if connector != target["type"]:
+            adapter = ROAD_DB["adapter_pin"]
+            actors.append(_baseline_actor(_part("Tracks", adapter["id"]), rx, ry, rz, r_yaw))
+            rx += math.cos(math.radians(r_yaw)) * adapter["len"]
+            ry += math.sin(math.radians(r_yaw)) * adapter["len"]
+        actors.append(_baseline_actor(_part("Tracks", target["id"]), rx, ry, rz, r_yaw))
+        rx += math.cos(math.radians(r_yaw)) * target["len"]
+        ry += math.sin(math.radians(r_yaw)) * target["len"]
+        rz += target["z"]
+        r_yaw += target["curve"]
+        connector = target["type"]
+    return actors
+
+
+def _stage(scene: dict, stage: str) -> ActorBatch:
+    batch = scene["PlaceableAssets"]
+    return batch.filter(batch.columns()["stage"] == STAGES.index(stage))
+
+
+# ==============================================================================
+# FOREST
+# ==============================================================================
+def test_forest_is_reproducible_from_the_seed():
+    first, again = compile_scene(FOREST, seed=11), compile_scene(FOREST, seed=11)
+    assert len(_stage(first, "forest")) > 0
+    assert first["PlaceableAssets"].to_actors() == again["PlaceableAssets"].to_actors()
+    other = compile_scene(FOREST, seed=12)
+    assert _stage(other, "forest").to_actors() != _stage(first, "forest").to_actors()
+
+
+def test_forest_skips_occupied_cells_without_moving_the_others():
+    empty, busy = OccupancyGrid(), OccupancyGrid()
+    busy.mark_rect(-5, -5, 5, 5)
+    open_field = _forest_batch(empty, 0.5, 20, np.random.default_rng(3))
+    cleared = _forest_batch(busy, 0.5, 20, np.random.default_rng(3))
+
+    def cells(batch):
+        cols = batch.columns()
+        return np.round(cols["x"] / GRID_UNIT).astype(int), np.round(cols["y"] / GRID_UNIT).astype(int)
+
+    gx, gy = cells(open_field)
+    outside = ~((-5 <= gx) & (gx < 5) & (-5 <= gy) & (gy < 5))
+    assert 0 < len(cleared) < len(open_field)
+    assert cleared.to_actors() == open_field.filter(outside).to_actors()
+
+
+# ==============================================================================
+# LOTS
+# ==============================================================================
+@pytest.mark.parametrize("count", [1, 5, 40, 300])
+def test_lots_do_not_overlap_and_avoid_taken_cells(count):
+    grid = OccupancyGrid()
+    grid.mark_rect(2, -3, 9, 6)  # e.g. a road already there
+    taken = grid.copy()
+    lots = LotAllocator.for_count(grid, count, radius=BUILDING_RADIUS).allocate(count)
+    assert len(set(lots)) == count
+
+    core = BUILDING_RADIUS - 1
+    for i, (gx, gy) in enumerate(lots):
+        assert gx >= 0 and gy >= 0  # the block grows away from the origin
+        assert taken.rect_free(gx - core, gy - core, gx + core + 1, gy + core + 1)
+        for ox, oy in lots[i + 1:]:
+            assert max(abs(gx - ox), abs(gy - oy)) >= 2 * BUILDING_RADIUS
+        assert not grid.is_free(gx + BUILDING_RADIUS, gy + BUILDING_RADIUS)
+
+
+def test_lots_resume_after_earlier_allocations():
+    grid = OccupancyGrid()
+    allocator = LotAllocator(grid, radius=BUILDING_RADIUS, per_row=4)
+    first, second = allocator.allocate(6), allocator.allocate(6)
+    assert not set(first) & set(second)
+    assert first + second == [allocator.lot_cell(i) for i in range(12)]
+
+
+# ==============================================================================
+# ACTOR DICTS
+# ==============================================================================
+def test_buildings_match_the_baseline_actor_dicts():
+    floors = [3, 1, 4, 2, 1, 5, 2]
+    lots = []
+    batch = ActorBatch.concat(_building_stage(floors, OccupancyGrid(), lots))
+    expected = [actor for n, (x, y) in zip(floors, lots) for actor in _baseline_building(n, x, y)]
+    assert batch.to_actors() == expected
+
+
+def test_roads_match_the_baseline_actor_dicts():
+    scene = compile_scene({"layout": {"road_sequence": ROADS, "forest_density": 0}}, seed=1)
+    assert road_start([])[0] == 6 * GRID_UNIT
+    assert scene["PlaceableAssets"].to_actors() == _baseline_roads(ROADS)
@@ -0,0 +1,55 @@
+# tests/test_scene_state.py
+import copy
+
+import pytest
+
+from app.core.scene_state import SceneState
+
+BLUEPRINT = {
+    "layout": {"buildings": [2, 3, 1], "road_sequence": ["straight", "turn_90", "straight"], "forest_density": 0.2},
+    "environment": {"time": 12.0},
+}
+
+
+def _snapshot(state: SceneState):
+    return (
+        state.version, copy.deepcopy(state.to_record()), state.blueprint,
+        state.actor_ids(), state.scene()["PlaceableAssets"].to_actors(),
+    )
+
+
+@pytest.mark.parametrize("delta", [
+    {"layout": {"buildings": [5, "x", 1]}},                  # first building rebuilt, then a bad one
+    {"append": {"buildings": [4, None]}},                    # fails while taking new lots
+    {"layout": {"road_sequence": ["u_turn"]}, "remove_buildings": "two"},
+])
+def test_bad_delta_leaves_the_scene_unchanged(delta):
+    state = SceneState(BLUEPRINT, seed=7)
+    state.apply({"append": {"road_sequence": ["u_turn"]}})
+    before = _snapshot(state)
+    with pytest.raises((TypeError, ValueError)):
+        state.apply(delta)
+    assert _snapshot(state) == before
+
+    diff = state.apply({"append": {"buildings": [2]}})
+    assert diff["version"] == before[0] + 1
+    assert _snapshot(SceneState.from_record(state.to_record())) == _snapshot(state)
+
+
+def test_edited_leaves_the_original_unchanged():
+    state = SceneState(BLUEPRINT, seed=7)
+    before = _snapshot(state)
+    draft, diff = state.edited({"layout": {"buildings": [6]}, "append": {"road_sequence": ["turn_90"]}})
+    assert _snapshot(state) == before
+    assert diff["removed"] and diff["added"] and draft.version == state.version + 1
+
+
+def test_replayed_record_matches_the_edited_scene():
+    state = SceneState(BLUEPRINT, seed=7)
+    for delta in (
+        {"append": {"buildings": [4, 4], "road_sequence": ["u_turn", "straight"]}},
+        {"remove_buildings": 3},
+        {"layout": {"forest_density": 0.05}, "environment": {"time": 20.0}},
+    ):
+        state.apply(delta)
+    assert _snapshot(SceneState.loads(state.dumps())) == _snapshot(state)
@@ -0,0 +1,49 @@
+# tests/test_scene_tiles.py
+import pytest
+
+from app.core.job_store import MemoryJobStore, SQLiteJobStore
+from app.core.scene_binary import BinaryScene, encode_binary
+from app.core.scene_compiler import compile_scene
+from app.core.scene_encoder import encode_batch
+from app.core.scene_tiles import find_tile, tile_scene
+
+BLUEPRINT = {"layout": {"buildings": [3] * 20, "road_sequence": ["straight", "turn_90"] * 30, "forest_density": 0.2}}
+
+
+@pytest.fixture(scope="module")
+def tiled():
+    return tile_scene(compile_scene(BLUEPRINT, seed=5), 8)
+
+
+def test_tiles_cover_the_scene_in_actor_order(tiled):
+    tiles = tiled["Tiles"]["tiles"]
+    assert len(tiles) > 1
+    assert [t["offset"] for t in tiles] == [0] + [t["offset"] + t["actors"] for t in tiles[:-1]]
+    assert sum(t["actors"] for t in tiles) == len(tiled["PlaceableAssets"]) == tiled["Tiles"]["count"]
+
+
+def test_tile_bytes_are_the_encoded_size(tiled):
+    batch = tiled["PlaceableAssets"]
+    for tile in tiled["Tiles"]["tiles"]:
+        assert tile["bytes"] == len(encode_batch(batch[tile["offset"]:tile["offset"] + tile["actors"]]))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_tiles_read_from_the_store_by_range(store, tiled):
+    payload = encode_binary(tiled)
+    store.create("job")
+    assert store.get_result_range("job", 0, 16) is None
+    store.set_result("job", payload)
+    assert store.get_result_range("job", 10, 32) == payload[10:42]
+    assert store.get_result_range("job", len(payload) - 4, 100) == payload[-4:]
+
+    scene = BinaryScene.head(lambda offset, length: store.get_result_range("job", offset, length))
+    tile = find_tile(scene.meta["Tiles"], 0, 0) or scene.meta["Tiles"]["tiles"][0]
+    stop = tile["offset"] + tile["actors"]
+    assert scene[tile["offset"]:stop] == BinaryScene(payload)[tile["offset"]:stop]
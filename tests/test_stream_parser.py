@@ -0,0 +1,114 @@
+# tests/test_stream_parser.py
+import json
+
+import pytest
+
+from app.llm.blueprint_dsl import compact
+from app.llm.stream_parser import DSLStreamParser, JSONStreamParser, StreamParseError
+
+BLUEPRINT = {
+    "layout": {
+        "buildings": [3, 12, 1],
+        "road_sequence": ["straight", "turn_90", "straight", "u_turn", "ramp_gentle"],
+        "forest_density": 0.25,
+    },
+    "environment": {"time": 21.5, "brightness": 3.0},
+}
+
+
+def _parse(parser, text: str, size: int):
+    """All events of `text` fed `size` characters at a time."""
+    events = []
+    for start in range(0, len(text), size):
+        events += parser.feed(text[start:start + size])
+    return events + parser.close()
+
+
+def _expected(blueprint: dict):
+    layout = blueprint["layout"]
+    return (
+        [("building", n) for n in layout["buildings"]] + [("buildings", layout["buildings"])]
+        + [("road", key) for key in layout["road_sequence"]] + [("road_sequence", layout["road_sequence"])]
+        + [("blueprint", blueprint)]
+    )
+
+
+JSON_TEXTS = [
+    json.dumps(BLUEPRINT),
+    json.dumps(BLUEPRINT, indent=2),
+    "Here is the blueprint:\n```json\n" + json.dumps(BLUEPRINT, indent=2) + "\n```\nEnjoy!",
+]
+
+
+@pytest.mark.parametrize("text", JSON_TEXTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, 10_000])
+def test_json_events_do_not_depend_on_chunk_boundaries(text, size):
+    parser = JSONStreamParser()
+    assert _parse(parser, text, size) == _expected(BLUEPRINT)
+    assert parser.complete
+
+
+def test_json_numbers_split_across_chunks():
+    parser = JSONStreamParser()
+    events = parser.feed('{"layout": {"buildings": [1') + parser.feed("2, 3") + parser.feed("]}}")
+    assert events[:3] == [("building", 12), ("building", 3), ("buildings", [12, 3])]
+
+
+def test_json_trailing_commas():
+    parser = JSONStreamParser()
+    events = _parse(parser, '{"layout": {"buildings": [2, 4,], "road_sequence": ["straight",],},}', 4)
+    assert events[-1] == ("blueprint", {"layout": {"buildings": [2, 4], "road_sequence": ["straight"]}})
+
+
+def test_json_truncated_completion_is_closed_but_not_complete():
+    text = json.dumps(BLUEPRINT)
+    cut = text.index('"u_turn"')
+    parser = JSONStreamParser()
+    events = _parse(parser, text[:cut], 7)
+    assert not parser.complete
+    assert events[-1][1]["layout"]["road_sequence"] == ["straight", "turn_90", "straight"]
+
+
+@pytest.mark.parametrize("text", [
+    '{"layout": {"buildings": [3, 1000000], "road_sequence": []}}',
+    '{"layout": {"buildings": ["3"]}}',
+    '{"layout": {"road_sequence": ["straight", 4]}}',
+    '{"layout": {"buildings": [' + ", ".join(["2"] * 201) + "]}}",
+    '{"layout": {"forest_density": 9}}',
+])
+def test_json_entries_outside_the_limits_fail_before_they_are_compiled(text):
+    parser = JSONStreamParser()
+    with pytest.raises(StreamParseError):
+        _parse(parser, text, 5)
+
+
+def test_json_without_an_object_fails():
+    parser = JSONStreamParser()
+    parser.feed("Sorry, I can not help with that.")
+    with pytest.raises(StreamParseError):
+        parser.close()
+
+
+DSL_TEXT = compact(BLUEPRINT)
+
+
+@pytest.mark.parametrize("text", [DSL_TEXT, DSL_TEXT.replace("; ", "\n"), "```\n" + DSL_TEXT + "\n```"])
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, 10_000])
+def test_dsl_events_do_not_depend_on_chunk_boundaries(text, size):
+    parser = DSLStreamParser()
+    assert _parse(parser, text, size) == _expected(BLUEPRINT)
+
+
+def test_dsl_road_groups_are_emitted_once_closed():
+    parser = DSLStreamParser()
+    events = parser.feed("B 2; R S (T S")
+    assert [e for e in events if e[0] == "road"] == [("road", "straight")]
+    events = parser.feed(")*2 U")
+    assert [e for e in events if e[0] == "road"] == [("road", key) for key in ["turn_90", "straight"] * 2]
+
+
+def test_dsl_road_before_buildings_means_no_buildings():
+    events = _parse(DSLStreamParser(), "R S T", 2)
+    assert events[0] == ("buildings", [])
+    with pytest.raises(StreamParseError):
+        _parse(DSLStreamParser(), "R S; B 3", 1)